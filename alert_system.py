@@ -25,15 +25,20 @@ class AlertSystem:
         self.alert_days = self.alerts_config['alert_days_before_delete']
         self.notification_method = self.alerts_config['notification_method']
 
-    def check_and_alert(self):
+    def check_and_alert(self, expiring_files=None):
         """
         Check for files nearing deletion and send alerts
 
+        Args:
+            expiring_files: Precomputed expiring list (e.g. from
+                RetentionPolicy.run_maintenance) to avoid another scan
+
         Returns:
             Number of alerts sent
         """
         # Get files expiring soon
-        expiring_files = self.retention.get_expiring_soon(self.alert_days)
+        if expiring_files is None:
+            expiring_files = self.retention.get_expiring_soon(self.alert_days)
 
         if not expiring_files:
             print("✅ No files nearing deletion")
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+DocuFlow - Archive Layout Module
+Flat or date-partitioned (Archive/YYYY/MM) archive folders
+"""
+
+import os
+import re
+from datetime import datetime
+from file_ops import move_file, remove_empty_parents
+from file_scanner import scan_dirs, walk_files
+from retention_rules import ExclusionMatcher, KEEP_SUFFIX
+
+
+ARCHIVE_CATEGORY = "Archive"
+
+YEAR_FOLDER = re.compile(r'^\d{4}$')
+MONTH_FOLDER = re.compile(r'^(0[1-9]|1[0-2])$')
+
+
+def partition_folders(archive_root):
+    """
+    Every YYYY/MM partition under an archive folder, oldest first
+
+    Returns:
+        List of (year, month, path)
+    """
+    partitions = []
+
+    for year_path in scan_dirs(archive_root):
+        if not YEAR_FOLDER.match(os.path.basename(year_path)):
+            continue
+        for month_path in scan_dirs(year_path):
+            if MONTH_FOLDER.match(os.path.basename(month_path)):
+                partitions.append((int(os.path.basename(year_path)),
+                                   int(os.path.basename(month_path)), month_path))
+
+    return sorted(partitions)
+
+
+def scan_category(base_path, department, category, excluded=None, skip_paths=()):
+    """
+    Yield a FileEntry for every file of a department's category
+
+    Walks the category folder recursively, so files in project subfolders
+    and in archive YYYY/MM partitions (whichever layout is configured)
+    are included.
+
+    Args:
+        base_path: DocuFlow documents root
+        department: Department folder
+        category: Category folder
+        excluded: Optional callable(folder name) → True to skip a subfolder
+                  (see ExclusionMatcher.folders_from_config)
+        skip_paths: Absolute subfolder paths to leave out
+    """
+    yield from walk_files(os.path.join(base_path, department, category), excluded, skip_paths)
+
+
+def subfolder_of(file_path, category_root):
+    """
+    Folder of a file relative to its category folder
+
+    Returns:
+        Relative folder ("" for files directly in the category folder)
+    """
+    rel = os.path.relpath(os.path.dirname(os.path.abspath(file_path)),
+                          os.path.abspath(category_root))
+    return "" if rel == os.curdir or rel.startswith(os.pardir) else rel
+
+
+def partition_end(year, month):
+    """First moment after a partition's month"""
+    return datetime(year + month // 12, month % 12 + 1, 1)
+
+
+def unique_path(folder, file_name, suffix=None):
+    """
+    Path for a file in a folder that does not clash with an existing file
+
+    Args:
+        folder: Destination folder
+        file_name: Preferred name
+        suffix: Text added before the extension on a clash
+                (default: _archived_YYYYMMDD)
+    """
+    dest_path = os.path.join(folder, file_name)
+    if not os.path.exists(dest_path):
+        return dest_path
+
+    base, ext = os.path.splitext(file_name)
+    suffix = suffix or f"_archived_{datetime.now().strftime('%Y%m%d')}"
+    dest_path = os.path.join(folder, f"{base}{suffix}{ext}")
+
+    counter = 2
+    while os.path.exists(dest_path):
+        dest_path = os.path.join(folder, f"{base}{suffix}_{counter}{ext}")
+        counter += 1
+
+    return dest_path
+
+
+class ArchiveLayout:
+    """Where archived files are filed"""
+
+    def __init__(self, base_path, partitioned=False, excluded=None):
+        """
+        Args:
+            base_path: DocuFlow documents root
+            partitioned: File archived documents under Archive/YYYY/MM
+                         (by modification month) instead of Archive/
+            excluded: Optional callable(folder name) → True for subfolders
+                      that migration leaves alone
+        """
+        self.base_path = base_path
+        self.partitioned = partitioned
+        self.excluded = excluded
+
+    @classmethod
+    def from_config(cls, config):
+        """Layout chosen by config['retention_policy']['archive_layout'] ('flat' or 'monthly')"""
+        layout = config.get('retention_policy', {}).get('archive_layout', 'flat')
+        return cls(config['base_path'], layout == 'monthly',
+                   ExclusionMatcher.folders_from_config(config))
+
+    def root(self, department):
+        """Department's archive folder"""
+        return os.path.join(self.base_path, department, ARCHIVE_CATEGORY)
+
+    def folder_for(self, department, mtime, subfolder=""):
+        """
+        Archive folder for a file
+
+        Args:
+            department: Department folder
+            mtime: File modification time (epoch seconds)
+            subfolder: Project subfolder the file came from, kept below
+                       the archive folder (or partition)
+        """
+        if not self.partitioned:
+            return os.path.join(self.root(department), subfolder)
+
+        moment = datetime.fromtimestamp(mtime)
+        return os.path.join(self.root(department), f"{moment.year:04d}", f"{moment.month:02d}",
+                            subfolder)
+
+    def expired_partitions(self, department, delete_threshold):
+        """
+        Partitions whose whole month is older than the deletion threshold
+
+        Only these can be dropped without looking at each file; the
+        partition holding the threshold itself is checked file by file.
+
+        Returns:
+            List of partition folder paths
+        """
+        return [path for year, month, path in partition_folders(self.root(department))
+                if partition_end(year, month) <= delete_threshold]
+
+    def migrate(self, department, limit=None, on_move=None, throttle=None):
+        """
+        Move files from a flat archive root into their partitions
+
+        Each file is moved on its own (a rename within the archive), so
+        the archive stays readable throughout and an interrupted run just
+        continues next time. Project subfolders are kept inside the
+        partition.
+
+        Args:
+            department: Department to migrate
+            limit: Max files to move in this call (None for all)
+            on_move: Optional callback(old_path, new_path) after each move
+            throttle: Optional IOThrottle pacing the moves
+
+        Returns:
+            Number of files moved
+        """
+        if not self.partitioned:
+            return 0
+
+        root = self.root(department)
+        partitions = {os.path.abspath(path) for path in scan_dirs(root)
+                      if YEAR_FOLDER.match(os.path.basename(path))}
+
+        # Pick this batch before moving anything, so files filed into new
+        # partitions are not walked again
+        batch = []
+        for entry in walk_files(root, self.excluded, partitions):
+            if limit is not None and len(batch) >= limit:
+                break
+            if entry.name.endswith(KEEP_SUFFIX) and os.path.exists(entry.path[:-len(KEEP_SUFFIX)]):
+                continue    # travels with its file
+            batch.append(entry)
+
+        moved = 0
+
+        for entry in batch:
+            folder = self.folder_for(department, entry.mtime, subfolder_of(entry.path, root))
+            os.makedirs(folder, exist_ok=True)
+            dest_path = unique_path(folder, entry.name)
+
+            moves = [(entry.path, dest_path)]
+            if os.path.exists(f"{entry.path}{KEEP_SUFFIX}"):
+                moves.append((f"{entry.path}{KEEP_SUFFIX}", f"{dest_path}{KEEP_SUFFIX}"))
+
+            for old_path, new_path in moves:
+                move_file(old_path, new_path, throttle)
+                if on_move:
+                    on_move(old_path, new_path)
+            moved += 1
+
+            # Drop the flat project folders this emptied
+            remove_empty_parents(os.path.dirname(entry.path), root, throttle)
+
+        return moved
+
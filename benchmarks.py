@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+DocuFlow - Benchmarks
+Compare version storage modes and time create_version on large files
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import tempfile
+import hashlib
+import argparse
+from contextlib import redirect_stdout
+
+from version_control import VersionControl
+
+
+def _dir_size(path):
+    """Bytes stored under a directory (hard links counted once)"""
+    total = 0
+    seen = set()
+
+    for root, _, files in os.walk(path):
+        for name in files:
+            st = os.stat(os.path.join(root, name))
+            if (st.st_dev, st.st_ino) not in seen:
+                seen.add((st.st_dev, st.st_ino))
+                total += st.st_size
+
+    return total
+
+
+def _make_config(workdir, storage, max_versions, track_metadata=True):
+    """Write a minimal config.json for one benchmark run"""
+    config_path = os.path.join(workdir, "config.json")
+    config = {
+        'client_name': "Benchmark",
+        'base_path': os.path.join(workdir, "Documents"),
+        'version_control': {
+            'enabled': True,
+            'version_dir': os.path.join(workdir, "versions"),
+            'max_versions': max_versions,
+            'track_metadata': track_metadata,
+            'storage': storage
+        }
+    }
+
+    with open(config_path, 'w') as f:
+        json.dump(config, f)
+
+    return config_path
+
+
+def bench_version_storage(size_mb=50, versions=10, edit_bytes=4096, storage_modes=None):
+    """
+    Version a large file repeatedly with small edits in each storage mode
+
+    Args:
+        size_mb: Size of the synthetic document
+        versions: Number of versions to create
+        edit_bytes: Bytes overwritten or inserted between versions
+        storage_modes: Modes to compare (default: full, blobs, chunks)
+
+    Returns:
+        List of result dictionaries, one per mode
+    """
+    storage_modes = storage_modes or ['full', 'blobs', 'chunks']
+    rnd = random.Random(42)
+    base = bytearray(rnd.randbytes(size_mb * 1024 * 1024))
+    results = []
+
+    for storage in storage_modes:
+        workdir = tempfile.mkdtemp(prefix="docuflow-bench-")
+        try:
+            config_path = _make_config(workdir, storage, versions + 1)
+            doc_path = os.path.join(workdir, "report.xlsx")
+            data = bytearray(base)
+            edits = random.Random(7)
+
+            with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                vc = VersionControl(config_path)
+
+                create_times = []
+                for i in range(versions):
+                    with open(doc_path, 'wb') as f:
+                        f.write(data)
+
+                    start = time.perf_counter()
+                    vc.create_version(doc_path, f"edit {i}")
+                    create_times.append(time.perf_counter() - start)
+
+                    # Small edit: alternate in-place overwrite and insertion
+                    pos = edits.randrange(len(data) - edit_bytes)
+                    patch = edits.randbytes(edit_bytes)
+                    if i % 2:
+                        data[pos:pos] = patch
+                    else:
+                        data[pos:pos + edit_bytes] = patch
+
+                history = vc.list_versions("report.xlsx")
+                restore_path = os.path.join(workdir, "restored.xlsx")
+
+                start = time.perf_counter()
+                vc.restore_version(history[-1]['path'], restore_path)
+                restore_time = time.perf_counter() - start
+
+            results.append({
+                'storage': storage,
+                'versions': len(history),
+                'bytes_on_disk': _dir_size(vc.version_dir),
+                'logical_bytes': sum(v['size'] for v in history),
+                'create_avg_s': sum(create_times) / len(create_times),
+                'restore_s': restore_time
+            })
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return results
+
+
+def _legacy_create_version(file_path, version_path):
+    """The original create_version I/O: copy, then re-read the copy in 4 KB blocks to hash it"""
+    shutil.copyfile(file_path, version_path)
+
+    sha256 = hashlib.sha256()
+    with open(version_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(4096), b""):
+            sha256.update(chunk)
+
+    return sha256.hexdigest()
+
+
+def bench_create_version(size_mb=1024, repeats=3):
+    """
+    Time version creation of one large file, before and after single-pass copy-and-hash
+
+    Args:
+        size_mb: Size of the file to version
+        repeats: Runs per variant (best time is reported)
+
+    Returns:
+        List of result dictionaries, one per variant
+    """
+    workdir = tempfile.mkdtemp(prefix="docuflow-bench-")
+    results = []
+
+    try:
+        doc_path = os.path.join(workdir, "large.bin")
+        block = random.Random(42).randbytes(8 * 1024 * 1024)
+        with open(doc_path, 'wb') as f:
+            for _ in range(max(1, size_mb // 8)):
+                f.write(block)
+
+        variants = [
+            ('before: copy + 4 KB rehash', None),
+            ('after: copy+hash, 1 pass', True),
+            ('after: kernel copy, no hash', False),
+        ]
+
+        for label, track_metadata in variants:
+            times = []
+            for i in range(repeats):
+                run_dir = os.path.join(workdir, f"run{i}")
+                os.makedirs(run_dir)
+
+                with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                    if track_metadata is None:
+                        start = time.perf_counter()
+                        _legacy_create_version(doc_path, os.path.join(run_dir, "large.bin.v1"))
+                    else:
+                        config_path = _make_config(run_dir, 'full', 100, track_metadata)
+                        vc = VersionControl(config_path)
+                        start = time.perf_counter()
+                        vc.create_version(doc_path)
+                    times.append(time.perf_counter() - start)
+
+                shutil.rmtree(run_dir, ignore_errors=True)
+
+            best = min(times)
+            results.append({
+                'variant': label,
+                'seconds': best,
+                'mb_per_sec': os.path.getsize(doc_path) / 1048576 / best
+            })
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return results
+
+
+def print_results(title, results):
+    """Print benchmark results as a table"""
+    print(f"\n{title}")
+    print("=" * 80)
+    print(f"{'storage':<10}{'versions':>10}{'on disk (MB)':>16}{'logical (MB)':>16}"
+          f"{'create (s)':>13}{'restore (s)':>13}")
+
+    for r in results:
+        print(f"{r['storage']:<10}{r['versions']:>10}{r['bytes_on_disk'] / 1048576:>16.1f}"
+              f"{r['logical_bytes'] / 1048576:>16.1f}{r['create_avg_s']:>13.3f}{r['restore_s']:>13.3f}")
+
+
+def main():
+    """Run the selected benchmarks"""
+    parser = argparse.ArgumentParser(description="DocuFlow benchmarks")
+    parser.add_argument('--size-mb', type=int, default=50, help="Document size in MB")
+    parser.add_argument('--versions', type=int, default=10, help="Versions to create")
+    parser.add_argument('--large-mb', type=int, default=1024,
+                        help="File size for the create_version timing benchmark")
+    parser.add_argument('--only', choices=['storage', 'create'],
+                        help="Run a single benchmark")
+    args = parser.parse_args()
+
+    if args.only in (None, 'storage'):
+        results = bench_version_storage(args.size_mb, args.versions)
+        print_results(f"Version storage: {args.size_mb} MB file, {args.versions} versions, small edits",
+                      results)
+
+    if args.only in (None, 'create'):
+        results = bench_create_version(args.large_mb)
+        print(f"\ncreate_version: {args.large_mb} MB file")
+        print("=" * 80)
+        for r in results:
+            print(f"{r['variant']:<32}{r['seconds']:>10.3f} s{r['mb_per_sec']:>12.1f} MB/s")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
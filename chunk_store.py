@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+DocuFlow - Chunk Store Module
+Content-defined chunking and deduplicated chunk storage for versions
+"""
+
+import os
+import re
+import json
+import random
+import sqlite3
+import hashlib
+import threading
+from file_ops import remove_file
+
+
+# Chunk size bounds (bytes)
+MIN_CHUNK = 4 * 1024
+MAX_CHUNK = 128 * 1024
+
+# Width of the rolling window; a boundary needs every byte in it to fall in
+# that position's byte class, so boundaries occur about every 2**WINDOW bytes
+WINDOW = 13
+
+READ_SIZE = 8 * 1024 * 1024
+
+MANIFEST_MAGIC = b"DOCUFLOW-CHUNKS\n"
+
+
+def _boundary_pattern(seed=0x646f6375):
+    """
+    Compile the rolling boundary test as a regex
+
+    Each window position gets a fixed random half of the 256 byte values.
+    The test depends only on the last WINDOW bytes, so boundaries move with
+    the content when bytes are inserted or removed, and the regex engine
+    evaluates it in C rather than in a per-byte Python loop.
+    """
+    rnd = random.Random(seed)
+    classes = []
+
+    for _ in range(WINDOW):
+        members = sorted(rnd.sample(range(256), 128))
+        classes.append(b"[" + b"".join(re.escape(bytes([b])) for b in members) + b"]")
+
+    return re.compile(b"".join(classes), re.DOTALL)
+
+
+BOUNDARY = _boundary_pattern()
+
+
+def iter_chunks(stream):
+    """
+    Split a binary stream into content-defined chunks
+
+    Args:
+        stream: File object opened in binary mode
+
+    Yields:
+        Chunk bytes, each between MIN_CHUNK and MAX_CHUNK (the last may be smaller)
+    """
+    buffer = b""
+    eof = False
+
+    while True:
+        if not eof and len(buffer) < MAX_CHUNK:
+            block = stream.read(READ_SIZE)
+            if block:
+                buffer += block
+            else:
+                eof = True
+
+        if not buffer:
+            return
+
+        start = 0
+        while True:
+            remaining = len(buffer) - start
+            if remaining < MAX_CHUNK and not eof:
+                break
+            if remaining == 0:
+                break
+
+            limit = min(start + MAX_CHUNK, len(buffer))
+            match = BOUNDARY.search(buffer, start + MIN_CHUNK, limit)
+            end = match.end() if match else limit
+
+            yield buffer[start:end]
+            start = end
+
+        buffer = buffer[start:]
+        if eof and not buffer:
+            return
+
+
+class ChunkStore:
+    """Deduplicated chunk storage: pack files plus a SQLite chunk index"""
+
+    def __init__(self, root, throttle=None):
+        """
+        Args:
+            root: Directory holding index.db and the packs/ folder
+            throttle: Optional IOThrottle pacing pack writes, restores and deletes
+        """
+        self.root = root
+        self.throttle = throttle
+        self.pack_dir = os.path.join(root, "packs")
+        os.makedirs(self.pack_dir, exist_ok=True)
+
+        self.conn = sqlite3.connect(os.path.join(root, "index.db"), check_same_thread=False)
+        self.lock = threading.RLock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                hash TEXT PRIMARY KEY,
+                pack TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                refs INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_chunks_pack ON chunks (pack);
+        """)
+        self.conn.commit()
+
+    def store(self, file_path):
+        """
+        Chunk a file and write only chunks the store has not seen
+
+        Args:
+            file_path: File to store
+
+        Returns:
+            Manifest dictionary: size, hash, chunks, new_bytes
+        """
+        file_hash = hashlib.sha256()
+        chunk_hashes = []
+        size = 0
+        new_bytes = 0
+
+        pack_name = f"{os.urandom(8).hex()}.pack"
+        pack_path = os.path.join(self.pack_dir, pack_name)
+        pack = None
+        offset = 0
+
+        with self.lock, open(file_path, 'rb') as src:
+            # Take the write lock before the first lookup: another process
+            # must not release a chunk between _has_chunk and _add_refs
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                for chunk in iter_chunks(src):
+                    file_hash.update(chunk)
+                    size += len(chunk)
+                    digest = hashlib.sha256(chunk).hexdigest()
+                    chunk_hashes.append(digest)
+
+                    if self._has_chunk(digest):
+                        continue
+
+                    if pack is None:
+                        if self.throttle:
+                            self.throttle.acquire()
+                        pack = open(pack_path, 'wb')
+                    pack.write(chunk)
+                    if self.throttle:
+                        self.throttle.acquire(len(chunk), ops=0)
+                    self.conn.execute(
+                        "INSERT INTO chunks (hash, pack, offset, length) VALUES (?, ?, ?, ?)",
+                        (digest, pack_name, offset, len(chunk)))
+                    offset += len(chunk)
+                    new_bytes += len(chunk)
+
+                if pack:
+                    pack.flush()
+                    os.fsync(pack.fileno())
+                    pack.close()
+
+                self._add_refs(chunk_hashes, 1)
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                if pack:
+                    pack.close()
+                    os.remove(pack_path)
+                raise
+
+        return {
+            'size': size,
+            'hash': file_hash.hexdigest(),
+            'chunks': chunk_hashes,
+            'new_bytes': new_bytes
+        }
+
+    def restore(self, manifest, destination):
+        """
+        Reassemble a file from its manifest by streaming chunks
+
+        Args:
+            manifest: Manifest returned by store()
+            destination: Path to write
+        """
+        packs = {}
+        if self.throttle:
+            self.throttle.acquire()
+
+        try:
+            with open(destination, 'wb') as dst:
+                for digest in manifest['chunks']:
+                    pack_name, offset, length = self._locate(digest)
+
+                    pack = packs.get(pack_name)
+                    if pack is None:
+                        pack = open(os.path.join(self.pack_dir, pack_name), 'rb')
+                        packs[pack_name] = pack
+
+                    pack.seek(offset)
+                    dst.write(pack.read(length))
+                    if self.throttle:
+                        self.throttle.acquire(length, ops=0)
+        finally:
+            for pack in packs.values():
+                pack.close()
+
+    def release(self, manifest):
+        """
+        Drop one reference to each chunk of a manifest
+
+        Packs whose chunks are all unreferenced are deleted.
+        """
+        with self.lock:
+            self._add_refs(manifest['chunks'], -1)
+
+            touched = {self._locate(digest)[0] for digest in set(manifest['chunks'])}
+            dead_packs = [pack_name for pack_name in touched if self.conn.execute(
+                "SELECT MAX(refs) FROM chunks WHERE pack = ?", (pack_name,)).fetchone()[0] <= 0]
+
+            for pack_name in dead_packs:
+                self.conn.execute("DELETE FROM chunks WHERE pack = ?", (pack_name,))
+            self.conn.commit()
+
+        for pack_name in dead_packs:
+            try:
+                remove_file(os.path.join(self.pack_dir, pack_name), self.throttle)
+            except FileNotFoundError:
+                pass
+
+    def _has_chunk(self, digest):
+        """Check the chunk index for a chunk hash"""
+        return self.conn.execute(
+            "SELECT 1 FROM chunks WHERE hash = ?", (digest,)).fetchone() is not None
+
+    def _locate(self, digest):
+        """Return (pack, offset, length) for a chunk"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT pack, offset, length FROM chunks WHERE hash = ?", (digest,)).fetchone()
+
+        if row is None:
+            raise FileNotFoundError(f"Chunk missing from store: {digest}")
+
+        return row
+
+    def _add_refs(self, chunk_hashes, delta):
+        """Adjust reference counts (a chunk used twice counts twice)"""
+        self.conn.executemany("UPDATE chunks SET refs = refs + ? WHERE hash = ?",
+                              [(delta, digest) for digest in chunk_hashes])
+
+
+def write_manifest(manifest, path):
+    """
+    Write a chunk manifest where a full version copy would normally go
+
+    Layout: magic line, JSON header line (size, hash), one chunk hash per line.
+    """
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        f.write(MANIFEST_MAGIC.decode('ascii'))
+        f.write(json.dumps({'size': manifest['size'], 'hash': manifest['hash']}) + "\n")
+        for digest in manifest['chunks']:
+            f.write(digest + "\n")
+
+
+def read_manifest(path, with_chunks=True):
+    """
+    Read a chunk manifest
+
+    Args:
+        path: Version file path
+        with_chunks: If False, only read the size/hash header
+
+    Returns:
+        Manifest dictionary, or None if the file is a plain version copy
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MANIFEST_MAGIC)) != MANIFEST_MAGIC:
+            return None
+
+        manifest = json.loads(f.readline().decode('utf-8'))
+        if with_chunks:
+            manifest['chunks'] = [line.strip().decode('ascii') for line in f if line.strip()]
+
+        return manifest
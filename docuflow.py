@@ -10,6 +10,9 @@ from document_organizer import DocumentOrganizer
 from version_control import VersionControl
 from retention_policy import RetentionPolicy
 from alert_system import AlertSystem
+from file_watcher import FileWatcher
+from duplicate_finder import DuplicateFinder, print_duplicates
+from search_query import parse_query
 
 
 class DocuFlow:
@@ -17,6 +20,7 @@ class DocuFlow:
 
     def __init__(self, config_path="config.json"):
         """Initialize all DocuFlow modules"""
+        self.config_path = config_path
         self.organizer = DocumentOrganizer(config_path)
         self.version_control = VersionControl(config_path)
         self.retention = RetentionPolicy(config_path)
@@ -46,12 +50,15 @@ class DocuFlow:
         print("  3. Batch organize folder")
         print("  4. List files")
         print("  5. Search files")
+        print("  21. Search document contents")
+        print("  22. Update content index")
 
         print("\n📝 VERSION CONTROL")
         print("  6. Create version")
         print("  7. List versions")
         print("  8. Restore version")
         print("  9. Version history")
+        print("  19. Watch Working folders (auto-version)")
 
         print("\n📦 RETENTION POLICY")
         print("  10. Run retention enforcement (dry run)")
@@ -66,6 +73,8 @@ class DocuFlow:
         print("\n⚙️  SYSTEM")
         print("  16. Quick setup (new client)")
         print("  17. Daily maintenance")
+        print("  18. Rebuild file catalog")
+        print("  20. Find duplicate documents")
         print("  q. Quit")
 
     def _handle_choice(self, choice):
@@ -105,6 +114,16 @@ class DocuFlow:
                 self._quick_setup()
             elif choice == '17':
                 self._daily_maintenance()
+            elif choice == '18':
+                self._rebuild_catalog()
+            elif choice == '19':
+                self._watch_folders()
+            elif choice == '20':
+                self._find_duplicates()
+            elif choice == '21':
+                self._search_content()
+            elif choice == '22':
+                self.organizer.update_content_index()
             else:
                 print("❌ Invalid choice")
 
@@ -149,9 +168,30 @@ class DocuFlow:
     def _search_files(self):
         """Search files"""
         print("\n--- Search Files ---")
+        if self.organizer.catalog:
+            print("Filters: dept:Finance cat:Archive ext:pdf size>10MB modified<30d \"text\"")
         query = input("Search term: ").strip()
 
-        self.organizer.search_files(query)
+        try:
+            filtered = self.organizer.catalog and parse_query(query).has_filters
+        except ValueError:
+            filtered = False
+
+        if not filtered:
+            self.organizer.search_files(query)
+            return
+
+        results, cursor = self.organizer.find_files(query, limit=20)
+        while cursor and input("\nEnter for more, q to stop: ").strip().lower() != 'q':
+            results, cursor = self.organizer.find_files(query, limit=20, cursor=cursor)
+
+    def _search_content(self):
+        """Search inside documents"""
+        print("\n--- Search Document Contents ---")
+        query = input("Words to find: ").strip()
+        dept = input("Department (or blank for all): ").strip() or None
+
+        self.organizer.search_content(query, dept)
 
     # Version control functions
     def _create_version(self):
@@ -201,6 +241,22 @@ class DocuFlow:
             if 'comment' in v:
                 print(f"   Comment: {v['comment']}")
 
+    def _watch_folders(self):
+        """Auto-version files in the Working folders until Ctrl+C"""
+        print("\n--- Watch Working Folders ---")
+        watcher = FileWatcher(self.config_path, self.version_control)
+        watched = watcher.start()
+        print(f"👁️  Watching {watched} folder(s), press Ctrl+C to stop")
+
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            watcher.shutdown()
+            print("\n✋ Watcher stopped")
+
+        print(f"📊 Versioned: {watcher.stats['versioned']}, "
+              f"unchanged: {watcher.stats['unchanged']}, errors: {watcher.stats['errors']}")
+
     # Retention functions
     def _retention_dry_run(self):
         """Run retention dry run"""
@@ -221,11 +277,18 @@ class DocuFlow:
             print("Cancelled")
             return
 
-        stats = self.retention.enforce_retention(dry_run=False)
+        plan = None
+        if self.retention.saved_plan() == 'ready':
+            reuse = input("Apply the plan from the last dry run instead of rescanning? (y/n): ")
+            if reuse.strip().lower() == 'y':
+                plan = self.retention.plan_file
+
+        stats = self.retention.enforce_retention(dry_run=False, plan=plan)
 
         print(f"\n✅ Enforcement Complete:")
         print(f"  Archived: {stats['archived']} files")
         print(f"  Deleted: {stats['deleted']} files")
+        print(f"  {self.retention.throttle.describe()}")
 
     def _find_expiring(self):
         """Find expiring files"""
@@ -304,14 +367,16 @@ class DocuFlow:
         print("DocuFlow - Daily Maintenance")
         print("=" * 80)
 
-        # 1. Enforce retention policy
+        # 1. Enforce retention policy (single scan also feeds the alerts)
         print("\n1️⃣  Enforcing retention policy...")
-        stats = self.retention.enforce_retention(dry_run=False)
+        maintenance = self.retention.run_maintenance(self.alerts.alert_days)
+        stats = maintenance['stats']
         print(f"   Archived: {stats['archived']}, Deleted: {stats['deleted']}")
+        print(f"   {self.retention.throttle.describe()}")
 
         # 2. Check for expiring files
         print("\n2️⃣  Checking for expiring files...")
-        alerts_sent = self.alerts.check_and_alert()
+        alerts_sent = self.alerts.check_and_alert(maintenance['expiring'])
         print(f"   Alerts sent: {alerts_sent}")
 
         # 3. Clean up old versions
@@ -319,6 +384,16 @@ class DocuFlow:
 
         print("\n✅ Daily maintenance complete!")
 
+    def _find_duplicates(self):
+        """Report identical documents across departments and versions"""
+        print("\n--- Find Duplicate Documents ---")
+        print_duplicates(DuplicateFinder(self.config_path).find())
+
+    def _rebuild_catalog(self):
+        """Re-index all department folders"""
+        print("\n--- Rebuild File Catalog ---")
+        self.organizer.rebuild_catalog()
+
 
 def main():
     """Main entry point"""
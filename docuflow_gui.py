@@ -835,7 +835,20 @@ Email: {alerts_config.get('email', {}).get('to_email', 'Not configured')}
                                           f"Organizing files from {folder}...\n\n")
 
             # This should be done in a thread to not block UI
-            self.organizer.batch_organize(folder, department)
+            summary = self.organizer.batch_organize(folder, department)
+
+            if summary:
+                for result in summary['results']:
+                    if result['error']:
+                        self.batch_results_text.insert(
+                            tk.END, f"✗ {os.path.basename(result['source'])}: {result['error']}\n")
+                    else:
+                        self.batch_results_text.insert(
+                            tk.END, f"✓ {os.path.basename(result['destination'])}\n")
+
+                self.batch_results_text.insert(tk.END,
+                    f"\nOrganized {summary['organized']}/{summary['total']} files "
+                    f"({summary['files_per_sec']:.1f} files/s, {summary['mb_per_sec']:.1f} MB/s)\n")
 
             self.batch_results_text.insert(tk.END, "\n✓ Batch organization complete!")
         except Exception as e:
@@ -1139,11 +1152,12 @@ Policy Settings:
                               "- Enforce retention policy\n" +
                               "- Send alerts for expiring files"):
             try:
-                # Run retention
-                stats = self.retention.enforce_retention(dry_run=False)
+                # Run retention (single scan also feeds the alerts)
+                maintenance = self.retention.run_maintenance(self.alerts.alert_days)
+                stats = maintenance['stats']
 
                 # Send alerts
-                alerts_sent = self.alerts.check_and_alert()
+                alerts_sent = self.alerts.check_and_alert(maintenance['expiring'])
 
                 messagebox.showinfo("Maintenance Complete",
                     f"Daily maintenance complete!\n\n" +
@@ -5,10 +5,21 @@ Main organizer module for automated file management
 """
 
 import os
-import shutil
 import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
+from archive_layout import ArchiveLayout, scan_category, subfolder_of, unique_path
+from duplicate_index import DuplicateIndex
+from file_catalog import FileCatalog
+from file_ops import IOThrottle, copy_file, link_or_copy, move_file, remove_file
+from fulltext_index import FullTextIndex
+from file_scanner import walk_files
+from naming import NameTemplate, VersionIndex
+from retention_rules import ExclusionMatcher
+from search_query import parse_query, compile_query
 
 
 class DocumentOrganizer:
@@ -22,6 +33,18 @@ class DocumentOrganizer:
         self.base_path = self.config['base_path']
         self.client_name = self.config['client_name']
         self.log_file = "organization_log.txt"
+        self._log_lock = threading.Lock()
+        self._claimed_sizes = set()     # sizes between duplicate check and index add
+        self._claims = threading.Condition()
+        self.name_template = NameTemplate.from_config(self.config)
+        self.catalog = FileCatalog.from_config(self.config, self.name_template)
+        self.duplicates = DuplicateIndex.from_config(self.config, self.catalog)
+        self.fulltext = FullTextIndex.from_config(self.config)
+        self.duplicate_action = self.config.get('duplicates', {}).get('action', 'skip')
+        self.version_index = VersionIndex(self.name_template, self.catalog)
+        self.archive_layout = ArchiveLayout.from_config(self.config)
+        self.throttle = IOThrottle.from_config(self.config, 'organize')
+        self.excluded_folders = ExclusionMatcher.folders_from_config(self.config)
 
     def setup_folder_structure(self, department=None):
         """
@@ -37,7 +60,7 @@ class DocumentOrganizer:
             for category in categories:
                 folder_path = os.path.join(self.base_path, dept, category)
                 os.makedirs(folder_path, exist_ok=True)
-                self._log(f"Created folder: {folder_path}")
+                self.log(f"Created folder: {folder_path}")
 
         print(f"✅ Folder structure created for {len(departments)} department(s)")
 
@@ -53,6 +76,11 @@ class DocumentOrganizer:
         Returns:
             Standardized filename
         """
+        return self.name_template.format(version=version,
+                                         **self._name_fields(original_name, project_name))
+
+    def _name_fields(self, original_name, project_name=""):
+        """Naming-convention fields for a file, except the version"""
         # Extract extension
         name, ext = os.path.splitext(original_name)
         ext = ext.lstrip('.')
@@ -60,19 +88,15 @@ class DocumentOrganizer:
         # Get date
         date_str = datetime.now().strftime(self.config['naming_convention']['date_format'])
 
-        # Build filename
-        pattern = self.config['naming_convention']['pattern']
-        new_name = pattern.format(
-            client=self.client_name.replace(' ', '_'),
-            project=project_name or name,
-            date=date_str,
-            version=version,
-            ext=ext
-        )
-
-        return new_name
+        return {
+            'client': self.client_name.replace(' ', '_'),
+            'project': project_name or name,
+            'date': date_str,
+            'ext': ext
+        }
 
-    def organize_file(self, file_path, department, category="Working", project_name=""):
+    def organize_file(self, file_path, department, category="Working", project_name="",
+                      subfolder=""):
         """
         Organize a file into the proper folder with standardized naming
 
@@ -81,42 +105,110 @@ class DocumentOrganizer:
             department: Target department folder
             category: Working, Final, or Archive
             project_name: Optional project name for filename
+            subfolder: Optional project subfolder inside the category folder
         """
         if not os.path.exists(file_path):
             print(f"❌ File not found: {file_path}")
             return False
 
-        # Generate new filename
-        original_name = os.path.basename(file_path)
-        new_name = self.generate_filename(original_name, project_name)
+        if not self.duplicates:
+            return self._organize_file(file_path, department, category, project_name, subfolder)
+
+        # The duplicate check and the index update are separate steps, so
+        # identical files organized in parallel (batch_organize) would both
+        # pass the check: files of the same size take turns until indexed
+        size = os.path.getsize(file_path)
+        with self._claims:
+            while size in self._claimed_sizes:
+                self._claims.wait()
+            self._claimed_sizes.add(size)
+
+        try:
+            return self._organize_file(file_path, department, category, project_name, subfolder)
+        finally:
+            with self._claims:
+                self._claimed_sizes.discard(size)
+                self._claims.notify_all()
+
+    def _organize_file(self, file_path, department, category, project_name, subfolder):
+        """Duplicate check, copy and indexing for organize_file"""
+        # Same bytes already organized?
+        existing, file_hash = None, None
+        if self.duplicates:
+            existing, file_hash = self.duplicates.check(file_path, department)
+            if existing and self.duplicate_action == 'skip':
+                self.log(f"Duplicate skipped: {file_path} (same as {existing})")
+                print(f"♻️  Already organized as {os.path.basename(existing)}, skipped")
+                return existing
 
         # Determine destination
-        dest_folder = os.path.join(self.base_path, department, category)
+        original_name = os.path.basename(file_path)
+        dest_folder = os.path.join(self.base_path, department, category, subfolder)
         os.makedirs(dest_folder, exist_ok=True)
 
-        dest_path = os.path.join(dest_folder, new_name)
-
-        # Handle existing file
-        if os.path.exists(dest_path):
-            # Auto-increment version if enabled
-            if self.config['naming_convention']['auto_version']:
-                version = 2
-                while os.path.exists(dest_path):
-                    new_name = self.generate_filename(original_name, project_name, version)
-                    dest_path = os.path.join(dest_folder, new_name)
-                    version += 1
-            else:
-                print(f"⚠️  File already exists: {dest_path}")
-                return False
+        dest_path = self.reserve_destination(dest_folder, original_name, project_name)
+        if dest_path is None:
+            return False
 
-        # Copy file
-        shutil.copy2(file_path, dest_path)
-        self._log(f"Organized: {file_path} → {dest_path}")
-        print(f"✅ Organized: {new_name}")
+        # Copy file over the reserved placeholder
+        try:
+            if existing and self.duplicate_action == 'link':
+                link_or_copy(existing, dest_path, self.throttle)
+            else:
+                copy_file(file_path, dest_path, self.throttle)
+        except OSError:
+            remove_file(dest_path, self.throttle)
+            raise
+
+        if self.catalog:
+            self.catalog.add_file(dest_path, department, category, file_hash)
+        if self.fulltext:
+            self.fulltext.index_file(dest_path, department, category)
+        if self.duplicates:
+            self.duplicates.add(os.path.getsize(dest_path), file_hash)
+        self.log(f"Organized: {file_path} → {dest_path}" +
+                  (f" (linked to duplicate {existing})" if existing and self.duplicate_action == 'link' else ""))
+        print(f"✅ Organized: {os.path.basename(dest_path)}")
 
         return dest_path
 
-    def batch_organize(self, source_folder, department, file_types=None):
+    def reserve_destination(self, dest_folder, original_name, project_name):
+        """
+        Claim a free destination filename
+
+        The name is claimed by creating an empty placeholder with O_EXCL, so
+        concurrent organizers (threads or processes) never pick the same name.
+
+        Returns:
+            Reserved destination path, or None if it exists and auto_version is off
+        """
+        fields = self._name_fields(original_name, project_name)
+        auto_version = (self.config['naming_convention']['auto_version']
+                        and self.name_template.has_version)
+
+        # Next free slot comes from the folder's version index, not from probing
+        version = self.version_index.next_version(dest_folder, fields) if auto_version else 1
+
+        while True:
+            new_name = self.name_template.format(version=version, **fields)
+            dest_path = os.path.join(dest_folder, new_name)
+
+            try:
+                fd = os.open(dest_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                # Auto-increment version if enabled
+                if not auto_version:
+                    print(f"⚠️  File already exists: {dest_path}")
+                    return None
+                # Index was stale (file added outside DocuFlow)
+                self.version_index.record(dest_folder, fields, version)
+                version = self.version_index.next_version(dest_folder, fields)
+                continue
+
+            os.close(fd)
+            return dest_path
+
+    def batch_organize(self, source_folder, department, file_types=None, workers=None):
         """
         Organize all files from a source folder
 
@@ -124,26 +216,87 @@ class DocumentOrganizer:
             source_folder: Folder containing files to organize
             department: Target department
             file_types: List of extensions to process (e.g., ['.pdf', '.docx'])
+            workers: Number of parallel copy workers (uses config if not specified)
+
+        Returns:
+            Dictionary with per-file results and throughput, or None if the
+            source folder does not exist
         """
         if not os.path.exists(source_folder):
             print(f"❌ Source folder not found: {source_folder}")
-            return
+            return None
 
-        # Get all files
-        files = [f for f in os.listdir(source_folder)
-                if os.path.isfile(os.path.join(source_folder, f))]
+        if workers is None:
+            workers = self.config.get('batch_organize', {}).get('workers', 1)
+
+        # Walk all files, subfolders included; organized files must not be
+        # walked again, so skip the documents tree (or list up front when
+        # the source is inside it)
+        entries = walk_files(source_folder, self.excluded_folders,
+                             {os.path.abspath(self.base_path)})
+        if os.path.abspath(source_folder).startswith(os.path.join(os.path.abspath(self.base_path), '')):
+            entries = list(entries)
 
         # Filter by type if specified
         if file_types:
-            files = [f for f in files if any(f.lower().endswith(ext) for ext in file_types)]
+            entries = (e for e in entries if any(e.name.lower().endswith(ext) for ext in file_types))
 
-        organized_count = 0
-        for file_name in files:
-            file_path = os.path.join(source_folder, file_name)
-            if self.organize_file(file_path, department):
-                organized_count += 1
+        start = time.perf_counter()
+        self.throttle.reset()
 
-        print(f"\n📊 Organized {organized_count}/{len(files)} files from {source_folder}")
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(
+                    lambda e: self._organize_entry(e, department, source_folder), entries))
+        else:
+            results = [self._organize_entry(e, department, source_folder) for e in entries]
+
+        elapsed = time.perf_counter() - start
+        organized = [r for r in results if r['destination']]
+        total_bytes = sum(r['size'] for r in organized)
+
+        summary = {
+            'organized': len(organized),
+            'total': len(results),
+            'failed': len(results) - len(organized),
+            'bytes': total_bytes,
+            'elapsed': elapsed,
+            'files_per_sec': len(organized) / elapsed if elapsed else 0.0,
+            'mb_per_sec': total_bytes / 1048576 / elapsed if elapsed else 0.0,
+            'workers': workers,
+            'io': self.throttle.throughput(),
+            'results': results
+        }
+
+        print(f"\n📊 Organized {summary['organized']}/{summary['total']} files from {source_folder}")
+        print(f"   {summary['files_per_sec']:.1f} files/s, {summary['mb_per_sec']:.1f} MB/s "
+              f"({workers} worker(s), {elapsed:.2f}s)")
+        print(f"   {self.throttle.describe()}")
+        self.log(f"Batch organized {summary['organized']}/{summary['total']} from {source_folder} "
+                  f"in {elapsed:.2f}s with {workers} worker(s)")
+
+        return summary
+
+    def _organize_entry(self, entry, department, source_folder):
+        """Organize one scanned file (keeping its subfolder) and record the outcome"""
+        start = time.perf_counter()
+        result = {'source': entry.path, 'destination': None, 'size': 0,
+                  'seconds': 0.0, 'error': None}
+
+        try:
+            result['size'] = entry.size
+            dest_path = self.organize_file(entry.path, department,
+                                           subfolder=subfolder_of(entry.path, source_folder))
+            if dest_path:
+                result['destination'] = dest_path
+            else:
+                result['error'] = "Not organized"
+        except OSError as e:
+            result['error'] = str(e)
+            print(f"❌ Failed to organize {entry.name}: {e}")
+
+        result['seconds'] = time.perf_counter() - start
+        return result
 
     def move_to_final(self, file_path, department):
         """
@@ -165,8 +318,12 @@ class DocumentOrganizer:
         dest_path = os.path.join(final_folder, file_name)
 
         # Move file
-        shutil.move(file_path, dest_path)
-        self._log(f"Finalized: {file_path} → {dest_path}")
+        move_file(file_path, dest_path, self.throttle)
+        if self.catalog:
+            self.catalog.move_file(file_path, dest_path, department, "Final")
+        if self.fulltext:
+            self.fulltext.move_file(file_path, dest_path, department, "Final")
+        self.log(f"Finalized: {file_path} → {dest_path}")
         print(f"✅ Moved to Final: {file_name}")
 
         return dest_path
@@ -175,6 +332,8 @@ class DocumentOrganizer:
         """
         Move files older than X days from Working to Archive
 
+        Files in project subfolders are archived into the same subfolder.
+
         Args:
             department: Department to process
             days: Age threshold (uses config if not specified)
@@ -183,30 +342,32 @@ class DocumentOrganizer:
             days = self.config['retention_policy']['archive_after_days']
 
         working_folder = os.path.join(self.base_path, department, "Working")
-        archive_folder = os.path.join(self.base_path, department, "Archive")
 
         if not os.path.exists(working_folder):
             print(f"⚠️  Working folder not found: {working_folder}")
             return
 
-        os.makedirs(archive_folder, exist_ok=True)
-
         now = datetime.now().timestamp()
         archived_count = 0
 
-        for file_name in os.listdir(working_folder):
-            file_path = os.path.join(working_folder, file_name)
-
-            if not os.path.isfile(file_path):
-                continue
+        for entry in scan_category(self.base_path, department, "Working", self.excluded_folders):
+            file_name = entry.name
+            file_path = entry.path
 
             # Check age
-            file_age_days = (now - os.path.getmtime(file_path)) / 86400
+            file_age_days = (now - entry.mtime) / 86400
 
             if file_age_days > days:
-                dest_path = os.path.join(archive_folder, file_name)
-                shutil.move(file_path, dest_path)
-                self._log(f"Archived: {file_path} → {dest_path}")
+                archive_folder = self.archive_layout.folder_for(
+                    department, entry.mtime, subfolder_of(file_path, working_folder))
+                os.makedirs(archive_folder, exist_ok=True)
+                dest_path = unique_path(archive_folder, file_name)
+                move_file(file_path, dest_path, self.throttle)
+                if self.catalog:
+                    self.catalog.move_file(file_path, dest_path, department, "Archive")
+                if self.fulltext:
+                    self.fulltext.move_file(file_path, dest_path, department, "Archive")
+                self.log(f"Archived: {file_path} → {dest_path}")
                 archived_count += 1
 
         print(f"📦 Archived {archived_count} file(s) older than {days} days from {department}")
@@ -219,69 +380,277 @@ class DocumentOrganizer:
             department: Department folder
             category: Optional category (Working/Final/Archive)
         """
-        if category:
-            folders = [os.path.join(self.base_path, department, category)]
-        else:
-            categories = self.config['folder_structure']['categories']
-            folders = [os.path.join(self.base_path, department, cat) for cat in categories]
+        categories = [category] if category else self.config['folder_structure']['categories']
 
         print(f"\n📁 Files in {department}" + (f"/{category}" if category else ""))
         print("=" * 80)
 
-        for folder in folders:
-            if not os.path.exists(folder):
-                continue
-
-            folder_name = os.path.basename(folder)
-            files = [f for f in os.listdir(folder) if os.path.isfile(os.path.join(folder, f))]
+        if self.catalog:
+            self._refresh_catalog([department], categories)
+            listing = self._list_from_catalog(department, category)
+        else:
+            listing = self._list_from_disk(department, categories)
 
+        for folder_name, files in listing:
             if files:
                 print(f"\n{folder_name}/ ({len(files)} files)")
-                for file_name in sorted(files):
-                    file_path = os.path.join(folder, file_name)
-                    file_size = os.path.getsize(file_path)
-                    mod_time = datetime.fromtimestamp(os.path.getmtime(file_path))
+                for file_name, file_size, mtime in sorted(files):
+                    mod_time = datetime.fromtimestamp(mtime)
                     print(f"  - {file_name}")
                     print(f"    Size: {file_size:,} bytes | Modified: {mod_time.strftime('%Y-%m-%d %H:%M')}")
 
-    def search_files(self, query, department=None):
+    def _list_from_catalog(self, department, category):
+        """Group catalog rows into (folder_name, [(relative path, size, mtime)]) pairs"""
+        categories = [category] if category else self.config['folder_structure']['categories']
+        rows = self.catalog.get_files(department, category)
+
+        for cat in categories:
+            folder = os.path.join(self.base_path, department, cat)
+            yield cat, [(os.path.relpath(row['path'], os.path.abspath(folder)),
+                         row['size'], row['mtime_ns'] / 1e9)
+                        for row in rows if row['category'] == cat]
+
+    def _list_from_disk(self, department, categories):
+        """Read (folder_name, [(relative path, size, mtime)]) pairs from disk"""
+        for cat in categories:
+            folder = os.path.join(self.base_path, department, cat)
+            files = [(os.path.relpath(entry.path, folder), entry.size, entry.mtime)
+                     for entry in scan_category(self.base_path, department, cat,
+                                                self.excluded_folders)]
+
+            yield cat, files
+
+    def search_files(self, query, department=None, limit=None, fuzzy=True):
         """
         Search for files by name across all departments
 
+        With the catalog enabled, results come ranked from its trigram name
+        index and include close matches for misspelled queries.
+
         Args:
             query: Search term
             department: Optional specific department
+            limit: Max results from the catalog (None: every match)
+            fuzzy: Include close (typo-tolerant) matches
+
+        Queries using fields (dept:, cat:, ext:, size, modified) are
+        handed to find_files; see search_query.parse_query for the syntax.
         """
+        if self.catalog:
+            try:
+                parsed = parse_query(query)
+            except ValueError as e:
+                print(f"❌ {e}")
+                return []
+            if parsed.has_filters:
+                if department:
+                    # The department argument narrows the query, never widens it
+                    if parsed.departments and department not in parsed.departments:
+                        print(f"❌ Query asks for dept:{','.join(parsed.departments)} "
+                              f"but the search is limited to {department}")
+                        return []
+                    parsed.departments = [department]
+                if limit is not None:
+                    return self.find_files(parsed, limit)[0]
+
+                results, cursor = self.find_files(parsed)
+                while cursor:
+                    page, cursor = self.find_files(parsed, cursor=cursor)
+                    results.extend(page)
+                return results
+
         departments = [department] if department else self.config['folder_structure']['departments']
         categories = self.config['folder_structure']['categories']
 
         results = []
-
-        for dept in departments:
-            for cat in categories:
-                folder = os.path.join(self.base_path, dept, cat)
-                if not os.path.exists(folder):
-                    continue
-
-                for file_name in os.listdir(folder):
-                    if query.lower() in file_name.lower():
-                        file_path = os.path.join(folder, file_name)
-                        results.append((dept, cat, file_name, file_path))
+        mtimes = {}
+        close_matches = set()
+
+        if self.catalog:
+            self._refresh_catalog(departments, categories)
+            for row, score, kind in self.catalog.search_names(query, [department] if department else None,
+                                                              limit, fuzzy):
+                results.append((row['department'], row['category'], row['name'], row['path']))
+                mtimes[row['path']] = row['mtime_ns'] / 1e9
+                if kind == 'fuzzy':
+                    close_matches.add(row['path'])
+        else:
+            for dept in departments:
+                for cat in categories:
+                    for entry in scan_category(self.base_path, dept, cat, self.excluded_folders):
+                        if query.lower() in entry.name.lower():
+                            results.append((dept, cat, entry.name, entry.path))
+                            mtimes[entry.path] = entry.mtime
 
         print(f"\n🔍 Search results for '{query}': {len(results)} found")
         print("=" * 80)
 
         for dept, cat, file_name, file_path in results:
-            print(f"\n{dept}/{cat}/{file_name}")
+            print(f"\n{dept}/{cat}/{file_name}" + ("  (close match)" if file_path in close_matches else ""))
             print(f"  Path: {file_path}")
-            mod_time = datetime.fromtimestamp(os.path.getmtime(file_path))
+            mod_time = datetime.fromtimestamp(mtimes[file_path])
             print(f"  Modified: {mod_time.strftime('%Y-%m-%d %H:%M')}")
 
         return results
 
-    def _log(self, message):
+    def find_files(self, query, limit=50, cursor=None, show=True):
+        """
+        Run a search query against the catalog, one page at a time
+
+        Args:
+            query: Query text (e.g. 'dept:Finance ext:pdf size>10MB modified<30d invoice')
+                   or a parsed SearchQuery
+            limit: Page size
+            cursor: Cursor returned with the previous page
+            show: Print the page
+
+        Returns:
+            (list of (dept, cat, name, path), cursor for the next page or None)
+        """
+        if not self.catalog:
+            print("❌ Query search needs the catalog (enable 'catalog' in config)")
+            return [], None
+
+        try:
+            parsed = parse_query(query) if isinstance(query, str) else query
+            where, params = compile_query(parsed, name_index=self.catalog.has_name_index)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return [], None
+
+        if cursor is None:
+            self._refresh_catalog(parsed.departments, parsed.categories)
+        rows, cursor = self.catalog.query(where, params, limit, cursor)
+        results = [(row['department'], row['category'], row['name'], row['path']) for row in rows]
+
+        if show:
+            print(f"\n🔍 {len(results)} result(s)" + (" (more available)" if cursor else ""))
+            print("=" * 80)
+            for row in rows:
+                print(f"\n{row['department']}/{row['category']}/{row['name']}")
+                print(f"  Path: {row['path']}")
+                print(f"  Size: {row['size'] / 1024:.1f} KB   Modified: "
+                      f"{datetime.fromtimestamp(row['mtime_ns'] / 1e9).strftime('%Y-%m-%d %H:%M')}")
+
+        return results, cursor
+
+    def iter_find(self, query):
+        """
+        Stream every catalog row matching a search query, newest first
+
+        Raises:
+            ValueError: If the query is malformed
+        """
+        if not self.catalog:
+            return iter(())
+
+        parsed = parse_query(query) if isinstance(query, str) else query
+        where, params = compile_query(parsed, name_index=self.catalog.has_name_index)
+        self._refresh_catalog(parsed.departments, parsed.categories)
+        return self.catalog.iter_query(where, params)
+
+    def _refresh_catalog(self, departments=None, categories=None):
+        """
+        Pick up files saved, edited or removed outside DocuFlow before
+        answering from the catalog
+
+        Does nothing unless catalog.refresh_interval is set; categories
+        refreshed within that many seconds are not re-checked.
+
+        Args:
+            departments: Departments to refresh (default: all)
+            categories: Categories to refresh (default: all)
+        """
+        if not self.catalog.refresh_interval:
+            return
+
+        for dept in self.config['folder_structure']['departments']:
+            if departments and dept not in departments:
+                continue
+            for cat in self.config['folder_structure']['categories']:
+                if categories and cat not in categories:
+                    continue
+                self.catalog.refresh(self.base_path, dept, cat, self.excluded_folders,
+                                     max_age=self.catalog.refresh_interval)
+
+    def search_content(self, query, department=None, limit=50):
+        """
+        Search inside documents, best matches first
+
+        Args:
+            query: Words that must all appear (word* matches prefixes)
+            department: Optional specific department
+            limit: Max results
+
+        Returns:
+            List of result rows, or None if the full-text index is disabled
+        """
+        if not self.fulltext:
+            print("⚠️  Full-text index is disabled in config")
+            return None
+
+        departments = [department] if department else None
+        results = [row for row in self.fulltext.search(query, departments, limit)
+                   if os.path.exists(row['path'])]
+
+        print(f"\n🔍 Content matches for '{query}': {len(results)} found")
+        print("=" * 80)
+
+        for row in results:
+            print(f"\n{row['department']}/{row['category']}/{os.path.basename(row['path'])}")
+            print(f"  Path: {row['path']}")
+            if row['snippet']:
+                print(f"  …{' '.join(row['snippet'].split())}…")
+
+        return results
+
+    def update_content_index(self):
+        """
+        Index new and changed documents for content search
+
+        Returns:
+            Dictionary of counts, or None if the full-text index is disabled
+        """
+        if not self.fulltext:
+            print("⚠️  Full-text index is disabled in config")
+            return None
+
+        start = time.perf_counter()
+        counts = self.fulltext.update(self.base_path,
+                                      self.config['folder_structure']['departments'],
+                                      self.config['folder_structure']['categories'],
+                                      excluded=self.excluded_folders)
+        elapsed = time.perf_counter() - start
+
+        self.log(f"Content index updated: {counts} in {elapsed:.2f}s")
+        print(f"✅ Content index: {counts['added']} added, {counts['updated']} updated, "
+              f"{counts['removed']} removed, {counts['unchanged']} unchanged ({elapsed:.1f}s)")
+
+        return counts
+
+    def rebuild_catalog(self):
+        """
+        Re-index all department folders into the file catalog
+
+        Returns:
+            Number of files indexed, or None if the catalog is disabled
+        """
+        if not self.catalog:
+            print("⚠️  File catalog is disabled in config")
+            return None
+
+        count = self.catalog.rebuild(self.base_path,
+                                     self.config['folder_structure']['departments'],
+                                     self.config['folder_structure']['categories'],
+                                     self.excluded_folders)
+        self.log(f"Catalog rebuilt: {count} files indexed")
+        print(f"✅ Catalog rebuilt: {count:,} files indexed")
+
+        return count
+
+    def log(self, message):
         """Write to log file"""
-        with open(self.log_file, 'a') as log:
+        with self._log_lock, open(self.log_file, 'a') as log:
             timestamp = datetime.now().isoformat()
             log.write(f"{timestamp} | {message}\n")
 
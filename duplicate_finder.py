@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+DocuFlow - Duplicate Finder Module
+Find identical documents across departments, categories and versions
+"""
+
+import os
+import json
+import time
+import hashlib
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from archive_layout import scan_category
+from file_ops import hash_file
+from hash_cache import HashCache
+from retention_rules import ExclusionMatcher
+from version_manifest import parse_version_name, version_files
+
+
+# Bytes read from each end of a file for the partial hash
+PARTIAL_BYTES = 64 * 1024
+
+# Set in each pool worker by _init_worker
+_worker_cache = None
+
+
+def _init_worker(cache_path):
+    """Open the shared hash cache once per worker process"""
+    global _worker_cache
+    _worker_cache = HashCache(cache_path) if cache_path else None
+
+
+def _partial_hash(job):
+    """
+    Hash the first and last PARTIAL_BYTES of a file
+
+    Files no larger than 2 * PARTIAL_BYTES are read whole, so their
+    partial hash is already their SHA256.
+
+    Returns:
+        (path, digest or None if unreadable)
+    """
+    path, size = job
+    digest = hashlib.sha256()
+
+    try:
+        with open(path, 'rb') as f:
+            if size <= 2 * PARTIAL_BYTES:
+                digest.update(f.read())
+            else:
+                digest.update(f.read(PARTIAL_BYTES))
+                f.seek(size - PARTIAL_BYTES)
+                digest.update(f.read(PARTIAL_BYTES))
+    except OSError:
+        return path, None
+
+    return path, digest.hexdigest()
+
+
+def _full_hash(path):
+    """
+    SHA256 of a whole file, reusing cached hashes of unchanged files
+
+    Returns:
+        (path, digest or None if unreadable)
+    """
+    try:
+        if _worker_cache:
+            return path, _worker_cache.hash(path)
+        return path, hash_file(path)
+    except OSError:
+        return path, None
+
+
+class DuplicateFinder:
+    """Staged duplicate search: size, then partial hash, then full hash"""
+
+    def __init__(self, config_path="config.json"):
+        """Load folder layout and version directory from the configuration"""
+        with open(config_path, 'r') as f:
+            self.config = json.load(f)
+
+        self.base_path = self.config['base_path']
+        self.departments = self.config['folder_structure']['departments']
+        self.excluded_folders = ExclusionMatcher.folders_from_config(self.config)
+        self.categories = self.config['folder_structure']['categories']
+
+        vc_config = self.config.get('version_control', {})
+        self.version_dir = vc_config.get('version_dir') if vc_config.get('enabled') else None
+
+    def _candidate_files(self):
+        """
+        Every file of the department/category folders (subfolders and archive
+        partitions included), then the versions directory
+
+        Yields:
+            (FileEntry, True if it is in the versions directory)
+        """
+        for dept in self.departments:
+            for cat in self.categories:
+                for entry in scan_category(self.base_path, dept, cat, self.excluded_folders):
+                    yield entry, False
+
+        if self.version_dir:
+            for entry in version_files(self.version_dir):
+                yield entry, True
+
+    def _collect(self):
+        """
+        List every file once per inode
+
+        Hard links (blob-stored versions, linked duplicates) share their
+        bytes already, so only one path per inode takes part in the search.
+
+        Returns:
+            (files by size, number of files seen, extra links per kept path)
+        """
+        by_size = defaultdict(list)
+        inodes = {}
+        links = defaultdict(list)
+        seen = 0
+
+        for entry, is_versions in self._candidate_files():
+            if is_versions and parse_version_name(entry.name) is None:
+                continue    # metadata, databases
+
+            seen += 1
+            if entry.size == 0:
+                continue
+
+            key = (entry.device, entry.inode)
+            if key in inodes:
+                links[inodes[key]].append(entry.path)
+                continue
+
+            inodes[key] = entry.path
+            by_size[entry.size].append(entry.path)
+
+        return by_size, seen, links
+
+    def find(self, workers=None):
+        """
+        Find groups of identical files
+
+        Args:
+            workers: Process pool size (default: CPU count)
+
+        Returns:
+            Dictionary with 'groups' (hash, size, paths; largest waste
+            first), 'reclaimable' bytes and per-stage counts
+        """
+        start = time.perf_counter()
+        by_size, seen, links = self._collect()
+
+        # Stage 1: only sizes shared by two or more files can hold duplicates
+        size_groups = {size: paths for size, paths in by_size.items() if len(paths) > 1}
+        jobs = [(path, size) for size, paths in size_groups.items() for path in paths]
+
+        cache_path = os.path.join(self.version_dir, "hash_cache.db") if self.version_dir else None
+        stats = {'files': seen, 'size_candidates': len(jobs)}
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(cache_path,)) as pool:
+            # Stage 2: head/tail hash within each size group
+            partial = dict(pool.map(_partial_hash, jobs, chunksize=64))
+
+            partial_groups = defaultdict(list)
+            for path, size in jobs:
+                if partial[path]:
+                    partial_groups[(size, partial[path])].append(path)
+
+            final = {}
+            to_hash = []
+            for (size, digest), paths in partial_groups.items():
+                if len(paths) < 2:
+                    continue
+                if size <= 2 * PARTIAL_BYTES:
+                    # Read whole already: the partial hash is the content hash
+                    final[(size, digest)] = paths
+                else:
+                    to_hash.extend(paths)
+
+            stats['partial_candidates'] = len(to_hash) + sum(len(p) for p in final.values())
+            stats['full_hashed'] = len(to_hash)
+            stats['full_hash_bytes'] = sum(os.path.getsize(p) for p in to_hash)
+
+            # Stage 3: full hash of what survived
+            sizes = {path: size for path, size in jobs}
+            for path, digest in pool.map(_full_hash, to_hash, chunksize=8):
+                if digest:
+                    final.setdefault((sizes[path], digest), []).append(path)
+
+        groups = []
+        for (size, digest), paths in final.items():
+            if len(paths) < 2:
+                continue
+            groups.append({
+                'hash': digest,
+                'size': size,
+                'paths': sorted(paths),
+                'links': sorted(link for path in paths for link in links.get(path, [])),
+                'reclaimable': size * (len(paths) - 1)
+            })
+
+        groups.sort(key=lambda g: g['reclaimable'], reverse=True)
+        stats['elapsed'] = time.perf_counter() - start
+
+        return {
+            'groups': groups,
+            'reclaimable': sum(g['reclaimable'] for g in groups),
+            'stats': stats
+        }
+
+
+def print_duplicates(result, limit=20):
+    """Print a duplicate report"""
+    stats = result['stats']
+
+    print(f"\n🔎 Scanned {stats['files']:,} files in {stats['elapsed']:.1f}s")
+    print(f"   Same size: {stats['size_candidates']:,}, "
+          f"same head/tail: {stats['partial_candidates']:,}, "
+          f"fully hashed: {stats['full_hashed']:,} ({stats['full_hash_bytes'] / 1048576:.1f} MB)")
+
+    print(f"\n📋 {len(result['groups'])} group(s) of duplicates")
+    for group in result['groups'][:limit]:
+        print(f"\n  {len(group['paths'])} copies × {group['size']:,} bytes "
+              f"(reclaimable {group['reclaimable'] / 1048576:.2f} MB)")
+        for path in group['paths']:
+            print(f"    {path}")
+
+    if len(result['groups']) > limit:
+        print(f"\n  ... and {len(result['groups']) - limit} more group(s)")
+
+    print(f"\n💾 Reclaimable: {result['reclaimable'] / 1048576:.2f} MB")
+
+
+def main():
+    """Find and report duplicates"""
+    print("=" * 80)
+    print("DocuFlow - Duplicate Finder")
+    print("=" * 80)
+
+    print_duplicates(DuplicateFinder().find())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+DocuFlow - Duplicate Index Module
+Ingest-time duplicate check: size buckets, a Bloom filter, then the catalog's hash index
+"""
+
+import os
+import math
+import threading
+from file_ops import hash_file
+
+
+class BloomFilter:
+    """Bloom filter over SHA256 hex digests"""
+
+    def __init__(self, capacity, error_rate=0.01):
+        """
+        Args:
+            capacity: Expected number of entries
+            error_rate: Target false-positive rate at capacity
+        """
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.bits = max(64, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        # Each probe uses 8 hex digits of the digest, so at most 8 probes
+        self.probes = min(8, max(1, round(self.bits / self.capacity * math.log(2))))
+        self.array = bytearray((self.bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, digest):
+        """Bit positions for a hex digest (already uniformly distributed)"""
+        return [int(digest[i * 8:i * 8 + 8], 16) % self.bits for i in range(self.probes)]
+
+    def add(self, digest):
+        """Insert a digest"""
+        for pos in self._positions(digest):
+            self.array[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, digest):
+        """False means definitely absent; True means probably present"""
+        return all(self.array[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(digest))
+
+
+class DuplicateIndex:
+    """Find organized files with the same content as an incoming file"""
+
+    def __init__(self, catalog, scope='all', capacity=100000):
+        """
+        Load size buckets and the Bloom filter from the catalog
+
+        Args:
+            catalog: FileCatalog holding sizes and content hashes
+            scope: 'all' to match any department, 'department' to match only the target one
+            capacity: Initial Bloom filter capacity (grown automatically)
+        """
+        self.catalog = catalog
+        self.scope = scope
+        self.lock = threading.Lock()
+        self.stats = {'checked': 0, 'size_rejects': 0, 'bloom_rejects': 0,
+                      'lookups': 0, 'duplicates': 0, 'backfilled': 0}
+        self._load(capacity)
+
+    @classmethod
+    def from_config(cls, config, catalog):
+        """
+        Build the index described by config['duplicates']
+
+        Returns:
+            DuplicateIndex, or None if disabled or the catalog is off
+        """
+        dup_config = config.get('duplicates', {})
+        if not catalog or not dup_config.get('enabled', False):
+            return None
+
+        return cls(catalog, dup_config.get('scope', 'all'),
+                   dup_config.get('expected_files', 100000))
+
+    def _load(self, capacity):
+        """Read every (size, hash) from the catalog in one query"""
+        rows = self.catalog.get_sizes_and_hashes()
+        hashes = [row['hash'] for row in rows if row['hash']]
+
+        self.sizes = {row['size'] for row in rows}
+        self.bloom = BloomFilter(max(capacity, 2 * len(hashes)))
+        for digest in hashes:
+            self.bloom.add(digest)
+
+    def check(self, file_path, department=None, st=None, file_hash=None):
+        """
+        Look for an organized file with identical content
+
+        The file is only hashed if some organized file has the same size,
+        and the catalog is only queried if the Bloom filter may hold the hash.
+
+        Args:
+            file_path: Incoming file
+            department: Target department (used when scope is 'department')
+            st: Stat of the incoming file, if already known
+            file_hash: SHA256 of the incoming file, if already known
+
+        Returns:
+            (path of the existing copy or None, SHA256 or None if never hashed)
+        """
+        size = (st or os.stat(file_path)).st_size
+
+        with self.lock:
+            self.stats['checked'] += 1
+            if size not in self.sizes:
+                self.stats['size_rejects'] += 1
+                return None, file_hash
+
+        # Same-size files indexed without a hash must be hashed before the
+        # Bloom filter can rule them out
+        self._backfill(size)
+
+        file_hash = file_hash or hash_file(file_path)
+
+        with self.lock:
+            if file_hash not in self.bloom:
+                self.stats['bloom_rejects'] += 1
+                return None, file_hash
+            self.stats['lookups'] += 1
+
+        department = department if self.scope == 'department' else None
+        for row in self.catalog.find_by_content(size, file_hash, department):
+            if os.path.abspath(row['path']) != os.path.abspath(file_path) and _unchanged(row):
+                with self.lock:
+                    self.stats['duplicates'] += 1
+                return row['path'], file_hash
+
+        return None, file_hash
+
+    def add(self, size, file_hash):
+        """Register a newly organized file"""
+        with self.lock:
+            self.sizes.add(size)
+            if file_hash:
+                self._add_hash(file_hash)
+
+    def _add_hash(self, file_hash):
+        """Insert into the Bloom filter, doubling it when it fills up"""
+        if self.bloom.count >= self.bloom.capacity:
+            self._load(2 * self.bloom.capacity)
+        self.bloom.add(file_hash)
+
+    def _backfill(self, size):
+        """Hash catalogued files of this size that have no hash yet"""
+        for row in self.catalog.find_by_content(size):
+            if not _unchanged(row):
+                continue
+            try:
+                file_hash = hash_file(row['path'])
+            except OSError:
+                continue
+
+            self.catalog.set_hash(row['path'], file_hash)
+            with self.lock:
+                self._add_hash(file_hash)
+                self.stats['backfilled'] += 1
+
+
+def _unchanged(row):
+    """True if a catalogued file still exists with the size and mtime on record"""
+    try:
+        st = os.stat(row['path'])
+    except OSError:
+        return False
+    return st.st_size == row['size'] and st.st_mtime_ns == row['mtime_ns']
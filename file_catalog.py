@@ -0,0 +1,981 @@
+#!/usr/bin/env python3
+"""
+DocuFlow - File Catalog Module
+Persistent SQLite index of organized documents shared by all modules
+"""
+
+import os
+import sqlite3
+import threading
+from collections import Counter
+from datetime import date, datetime
+from archive_layout import scan_category
+from naming import NameTemplate
+from retention_rules import ExclusionMatcher
+
+
+# Columns derived from the filename: its extension, plus the naming-convention
+# fields parsed back out of it (NULL for names that do not follow the pattern)
+DERIVED_COLUMNS = {'ext': 'TEXT', 'client': 'TEXT', 'project': 'TEXT',
+                   'doc_date': 'TEXT', 'version': 'INTEGER', 'doc_key': 'TEXT'}
+
+# Columns written for each file; expires_day is the deletion date of archived
+# files as a date ordinal, so the index on it is a day-bucketed expiry wheel
+FILE_COLUMNS = ('path', 'department', 'category', 'name', 'size', 'mtime_ns',
+                'inode', 'hash') + tuple(DERIVED_COLUMNS) + ('expires_day',)
+
+# Category whose files count down to deletion
+EXPIRING_CATEGORY = 'Archive'
+
+# Joins NameTemplate.version_key() parts into the doc_key column
+KEY_SEPARATOR = '\x1f'
+
+INSERT_FILE = (f"INSERT OR REPLACE INTO files ({', '.join(FILE_COLUMNS)}) "
+               f"VALUES ({', '.join('?' * len(FILE_COLUMNS))})")
+
+# Rows per page when streaming query results
+QUERY_PAGE = 500
+
+# Candidate rows fetched from the trigram index before ranking in Python
+NAME_CANDIDATES = 500
+
+# Trigrams in more names than this are too common to narrow a search
+COMMON_TRIGRAM = 2000
+
+# Informative trigrams intersected to find substring candidates
+SUBSTRING_TRIGRAMS = 4
+
+# Fuzzy matches may differ from the query by one edit per this many characters
+FUZZY_CHARS = 5
+
+# Longest query whose adjacent-transposition variants are also looked up
+FUZZY_VARIANT_CHARS = 32
+
+
+class FileCatalog:
+    """Persistent index of every file under the department folders"""
+
+    def __init__(self, db_path="docuflow_catalog.db", name_template=None, delete_days=None,
+                 refresh_interval=0):
+        """
+        Open (or create) the catalog database
+
+        Args:
+            db_path: SQLite file for the catalog
+            name_template: Optional NameTemplate used to parse client, project,
+                           date and version out of filenames
+            delete_days: Retention period of archived files, for the expiry
+                         index (None leaves it empty)
+            refresh_interval: Seconds after which listings and searches
+                              re-check a category against the disk (0: never;
+                              they trust DocuFlow's own updates and only
+                              retention passes and rebuilds re-check)
+        """
+        self.db_path = db_path
+        self.name_template = name_template
+        self.delete_days = delete_days
+        self.refresh_interval = refresh_interval
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.RLock()
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        # REPLACE must fire delete triggers so the name index drops old rows
+        self.conn.execute("PRAGMA recursive_triggers=ON")
+        self._create_schema()
+        self.has_name_index = self._create_name_index()
+        self._common_trigrams = set()
+
+    @classmethod
+    def from_config(cls, config, name_template=None):
+        """
+        Open the catalog described by a DocuFlow config
+
+        Args:
+            config: Loaded config.json dictionary
+            name_template: NameTemplate for parsing filenames (default: built
+                           from config['naming_convention'])
+
+        Returns:
+            FileCatalog, or None if the catalog is disabled
+        """
+        catalog_config = config.get('catalog', {})
+        if not catalog_config.get('enabled', False):
+            return None
+
+        catalog = cls(catalog_config.get('db_path', "docuflow_catalog.db"),
+                      name_template or NameTemplate.from_config(config),
+                      config.get('retention_policy', {}).get('delete_after_days'),
+                      catalog_config.get('refresh_interval', 0))
+
+        # First run: index what is already on disk
+        if not catalog.is_built():
+            catalog.rebuild(config['base_path'],
+                            config['folder_structure']['departments'],
+                            config['folder_structure']['categories'],
+                            ExclusionMatcher.folders_from_config(config))
+
+        return catalog
+
+    def _create_schema(self):
+        """Create tables and indexes if missing"""
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                department TEXT NOT NULL,
+                category TEXT NOT NULL,
+                name TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER,
+                hash TEXT,
+                ext TEXT,
+                client TEXT,
+                project TEXT,
+                doc_date TEXT,
+                version INTEGER,
+                doc_key TEXT,
+                expires_day INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS catalog_info (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+
+        # Catalogs from older versions lack some derived columns, and a changed
+        # naming convention invalidates the parsed ones: re-derive from names
+        columns = {row['name'] for row in self.conn.execute("PRAGMA table_info(files)")}
+        for column, sql_type in dict(DERIVED_COLUMNS, expires_day='INTEGER').items():
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE files ADD COLUMN {column} {sql_type}")
+
+        signature = self._template_signature()
+        row = self.conn.execute(
+            "SELECT value FROM catalog_info WHERE key = 'name_template'").fetchone()
+        if not set(DERIVED_COLUMNS) <= columns or (row['value'] if row else '') != signature:
+            self.conn.executemany(
+                f"UPDATE files SET {' = ?, '.join(DERIVED_COLUMNS)} = ? WHERE rowid = ?",
+                [self._derive(row['name']) + (row['rowid'],)
+                 for row in self.conn.execute("SELECT rowid, name FROM files").fetchall()])
+            self.conn.execute("INSERT OR REPLACE INTO catalog_info VALUES ('name_template', ?)",
+                              (signature,))
+
+        # Likewise the expiry index follows the retention period
+        row = self.conn.execute(
+            "SELECT value FROM catalog_info WHERE key = 'delete_days'").fetchone()
+        if 'expires_day' not in columns or (row['value'] if row else None) != str(self.delete_days):
+            self.conn.execute("UPDATE files SET expires_day = NULL")
+            self.conn.executemany("UPDATE files SET expires_day = ? WHERE rowid = ?", [
+                (self._expires_day(row['category'], row['mtime_ns']), row['rowid'])
+                for row in self.conn.execute(
+                    "SELECT rowid, category, mtime_ns FROM files WHERE category = ?",
+                    (EXPIRING_CATEGORY,)).fetchall()])
+            self.conn.execute("INSERT OR REPLACE INTO catalog_info VALUES ('delete_days', ?)",
+                              (str(self.delete_days),))
+
+        self.conn.executescript("""
+            CREATE INDEX IF NOT EXISTS idx_files_location
+                ON files (department, category, mtime_ns);
+            CREATE INDEX IF NOT EXISTS idx_files_name ON files (name);
+            CREATE INDEX IF NOT EXISTS idx_files_content ON files (size, hash);
+            CREATE INDEX IF NOT EXISTS idx_files_ext ON files (ext, mtime_ns);
+            CREATE INDEX IF NOT EXISTS idx_files_mtime ON files (mtime_ns);
+            CREATE INDEX IF NOT EXISTS idx_files_project ON files (project, version);
+            CREATE INDEX IF NOT EXISTS idx_files_client ON files (client, project);
+            CREATE INDEX IF NOT EXISTS idx_files_document ON files (doc_key, version);
+            CREATE INDEX IF NOT EXISTS idx_files_expiry ON files (expires_day)
+                WHERE expires_day IS NOT NULL;
+        """)
+        self.conn.commit()
+
+    def _create_name_index(self):
+        """
+        Create the trigram filename index, kept in sync with files by triggers
+
+        Returns:
+            False if this SQLite build has no FTS5 trigram tokenizer
+        """
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'name_index'").fetchone()
+
+        try:
+            self.conn.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS name_index USING fts5 (
+                    name, content = 'files', content_rowid = 'rowid', tokenize = 'trigram'
+                );
+                CREATE TRIGGER IF NOT EXISTS files_name_insert AFTER INSERT ON files BEGIN
+                    INSERT INTO name_index (rowid, name) VALUES (new.rowid, new.name);
+                END;
+                CREATE TRIGGER IF NOT EXISTS files_name_delete AFTER DELETE ON files BEGIN
+                    INSERT INTO name_index (name_index, rowid, name)
+                        VALUES ('delete', old.rowid, old.name);
+                END;
+                CREATE TRIGGER IF NOT EXISTS files_name_update AFTER UPDATE OF name ON files BEGIN
+                    INSERT INTO name_index (name_index, rowid, name)
+                        VALUES ('delete', old.rowid, old.name);
+                    INSERT INTO name_index (rowid, name) VALUES (new.rowid, new.name);
+                END;
+            """)
+        except sqlite3.OperationalError:
+            return False
+
+        if not exists:
+            # Catalog created before the index existed: index current rows
+            self.conn.execute("INSERT INTO name_index (name_index) VALUES ('rebuild')")
+        self.conn.commit()
+        return True
+
+    def is_built(self):
+        """Check whether the catalog has been populated from disk"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value FROM catalog_info WHERE key = 'built_at'").fetchone()
+        return row is not None
+
+    def rebuild(self, base_path, departments, categories, excluded=None):
+        """
+        Re-index every department/category folder from disk
+
+        Subfolders are walked recursively and rows are streamed straight
+        into the table, so memory stays flat however many files there are.
+
+        Args:
+            base_path: DocuFlow documents root
+            departments: Department folder names
+            categories: Category folder names
+            excluded: Optional callable(folder name) → True for subfolders
+                      to leave out (see ExclusionMatcher.folders_from_config)
+
+        Returns:
+            Number of files indexed
+        """
+        count = 0
+
+        def rows():
+            nonlocal count
+            for dept in departments:
+                for cat in categories:
+                    for entry in scan_category(base_path, dept, cat, excluded):
+                        count += 1
+                        yield ((os.path.abspath(entry.path), dept, cat, entry.name,
+                                entry.size, entry.mtime_ns, entry.inode, None)
+                               + self._derive(entry.name)
+                               + (self._expires_day(cat, entry.mtime_ns),))
+
+        started = datetime.now().isoformat()
+
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM files")
+            self.conn.executemany(INSERT_FILE, rows())
+            self.conn.execute(
+                "INSERT OR REPLACE INTO catalog_info VALUES ('built_at', ?)", (started,))
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO catalog_info VALUES (?, ?)",
+                [(f"refreshed:{dept}/{cat}", started) for dept in departments for cat in categories])
+
+        return count
+
+    def refresh(self, base_path, department, category, excluded=None, skip_paths=(),
+                max_age=None):
+        """
+        Bring one department/category up to date with the disk
+
+        Picks up files that were saved, edited or removed without DocuFlow
+        (e.g. directly over the share). Files whose size, mtime and inode
+        are unchanged keep their row and cached hash; only the rest are
+        written.
+
+        Args:
+            base_path: DocuFlow documents root
+            department: Department folder
+            category: Category folder
+            excluded: Optional callable(folder name) → True for subfolders
+                      to leave out
+            skip_paths: Absolute subfolder paths whose rows are left as they are
+            max_age: Skip the refresh if this category was refreshed fewer
+                     than this many seconds ago (None: always refresh)
+
+        Returns:
+            Dictionary with added, updated, removed and unchanged counts,
+            or None if the refresh was skipped
+        """
+        key = f"refreshed:{department}/{category}"
+        started = datetime.now()
+
+        with self.lock:
+            if max_age:
+                row = self.conn.execute(
+                    "SELECT value FROM catalog_info WHERE key = ?", (key,)).fetchone()
+                if row and (started - datetime.fromisoformat(row['value'])).total_seconds() < max_age:
+                    return None
+
+            skip = tuple(os.path.join(os.path.abspath(path), '') for path in skip_paths)
+            known = {row['path']: (row['size'], row['mtime_ns'], row['inode'])
+                     for row in self.conn.execute(
+                         "SELECT path, size, mtime_ns, inode FROM files "
+                         "WHERE department = ? AND category = ?", (department, category))
+                     if not row['path'].startswith(skip)}
+
+        counts = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+
+        def rows():
+            for entry in scan_category(base_path, department, category, excluded, skip_paths):
+                path = os.path.abspath(entry.path)
+                previous = known.pop(path, None)
+                if previous == (entry.size, entry.mtime_ns, entry.inode):
+                    counts['unchanged'] += 1
+                    continue
+
+                counts['updated' if previous else 'added'] += 1
+                yield ((path, department, category, entry.name,
+                        entry.size, entry.mtime_ns, entry.inode, None)
+                       + self._derive(entry.name)
+                       + (self._expires_day(category, entry.mtime_ns),))
+
+        with self.lock, self.conn:
+            self.conn.executemany(INSERT_FILE, rows())
+            # Whatever was not seen on disk is gone
+            self.conn.executemany("DELETE FROM files WHERE path = ?",
+                                  ((path,) for path in known))
+            self.conn.execute("INSERT OR REPLACE INTO catalog_info VALUES (?, ?)",
+                              (key, started.isoformat()))
+        counts['removed'] = len(known)
+
+        return counts
+
+    def add_file(self, file_path, department, category, file_hash=None):
+        """
+        Index (or re-index) a file after it was written
+
+        Args:
+            file_path: Path to the file on disk
+            department: Department folder
+            category: Working, Final, or Archive
+            file_hash: SHA256 of the content, if already known
+        """
+        st = os.stat(file_path)
+
+        with self.lock, self.conn:
+            name = os.path.basename(file_path)
+            self.conn.execute(INSERT_FILE, (
+                os.path.abspath(file_path), department, category, name,
+                st.st_size, st.st_mtime_ns, st.st_ino, file_hash) + self._derive(name)
+                + (self._expires_day(category, st.st_mtime_ns),))
+
+    def move_file(self, old_path, new_path, department, category):
+        """
+        Record that a file was moved (archive, finalize)
+
+        Args:
+            old_path: Previous location
+            new_path: New location on disk
+            department: Department folder of the new location
+            category: Category folder of the new location
+        """
+        with self.lock:
+            row = self.get_file(old_path)
+            file_hash = row['hash'] if row else None
+
+            with self.conn:
+                self.conn.execute("DELETE FROM files WHERE path = ?",
+                                  (os.path.abspath(old_path),))
+
+            self.add_file(new_path, department, category, file_hash)
+
+    def set_hash(self, file_path, file_hash):
+        """Store the content hash of an indexed file"""
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE files SET hash = ? WHERE path = ?",
+                              (file_hash, os.path.abspath(file_path)))
+
+    def get_sizes_and_hashes(self):
+        """Return (size, hash) for every indexed file; hash may be None"""
+        with self.lock:
+            return self.conn.execute("SELECT size, hash FROM files").fetchall()
+
+    def find_by_content(self, size, file_hash=None, department=None):
+        """
+        Files with a given size and content hash
+
+        Args:
+            size: File size in bytes
+            file_hash: SHA256, or None to return same-size files not yet hashed
+            department: Restrict to one department, or None for all
+
+        Returns:
+            List of rows
+        """
+        sql = "SELECT * FROM files WHERE size = ? AND hash IS ?"
+        params = [size, file_hash]
+
+        if department:
+            sql += " AND department = ?"
+            params.append(department)
+
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def remove_file(self, file_path):
+        """Drop a deleted file from the catalog"""
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM files WHERE path = ?",
+                              (os.path.abspath(file_path),))
+
+    def remove_folder(self, folder):
+        """
+        Drop every file under a folder (e.g. a deleted archive partition)
+
+        Returns:
+            Number of rows removed
+        """
+        with self.lock, self.conn:
+            return self.conn.execute("DELETE FROM files WHERE path >= ? AND path < ?",
+                                     _folder_range(folder)).rowcount
+
+    def get_file(self, file_path):
+        """Return the catalog row for a path, or None"""
+        with self.lock:
+            return self.conn.execute("SELECT * FROM files WHERE path = ?",
+                                     (os.path.abspath(file_path),)).fetchone()
+
+    def get_files(self, department=None, category=None,
+                  modified_before=None, modified_after=None):
+        """
+        Query indexed files
+
+        Args:
+            department: Department name or None for all
+            category: Category name or None for all
+            modified_before: Only files with mtime older than this datetime
+            modified_after: Only files with mtime at or after this datetime
+
+        Returns:
+            List of rows (path, department, category, name, size, mtime_ns, inode, hash)
+        """
+        clauses = []
+        params = []
+
+        if department:
+            clauses.append("department = ?")
+            params.append(department)
+        if category:
+            clauses.append("category = ?")
+            params.append(category)
+        if modified_before:
+            clauses.append("mtime_ns < ?")
+            params.append(_to_ns(modified_before))
+        if modified_after:
+            clauses.append("mtime_ns >= ?")
+            params.append(_to_ns(modified_after))
+
+        sql = "SELECT * FROM files"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY department, category, name"
+
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def search(self, query, departments=None):
+        """
+        Case-insensitive filename substring search
+
+        Args:
+            query: Search term
+            departments: Optional list of departments to restrict to
+
+        Returns:
+            List of matching rows
+        """
+        escaped = query.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        sql = "SELECT * FROM files WHERE lower(name) LIKE ? ESCAPE '\\'"
+        params = [f"%{escaped}%"]
+
+        if departments:
+            sql += f" AND department IN ({', '.join('?' * len(departments))})"
+            params.extend(departments)
+
+        sql += " ORDER BY department, category, name"
+
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def search_names(self, query, departments=None, limit=50, fuzzy=True):
+        """
+        Ranked filename search through the trigram index
+
+        Substring matches come first, best first: a match at the start of
+        a word beats one inside a word, then shorter names win. If there
+        are fewer than limit of those and fuzzy is on, close matches follow:
+        names containing the query with up to one typo (wrong, missing or
+        extra letter, or two letters swapped) per FUZZY_CHARS characters,
+        fewest edits and most shared trigrams first.
+
+        Args:
+            query: Search term (case-insensitive)
+            departments: Optional list of departments to restrict to
+            limit: Max results (None: every match)
+            fuzzy: Also return approximate matches
+
+        Returns:
+            List of (row, score, kind) with kind 'substring' or 'fuzzy'
+        """
+        needle = query.lower().strip()
+        if not needle:
+            return []
+
+        if not self.has_name_index or len(needle) < 3:
+            return [(row, 1.0, 'substring') for row in self._like_names(needle, departments, limit)]
+
+        # Posting lists of the informative trigrams; a handful pins a substring down
+        trigrams = sorted(_trigrams(needle))
+        postings = self._trigram_postings(trigrams, {}, enough=SUBSTRING_TRIGRAMS)
+        rare = sorted((p for p in postings.values() if p is not None), key=len)
+
+        if rare:
+            # A name containing needle contains every one of its trigrams
+            rowids = sorted(set.intersection(*rare))
+            if limit is not None:
+                rowids = rowids[:NAME_CANDIDATES * 4]
+            candidates = self._rows_by_rowid(rowids, departments)
+        else:
+            candidates = self._substring_candidates(needle, departments, limit is not None)
+
+        results = []
+        for row in candidates:
+            name = row['name'].lower()
+            pos = name.find(needle)
+            if pos < 0:
+                continue
+            boundary = pos == 0 or not name[pos - 1].isalnum()
+            results.append((row, (2.0 if boundary else 1.0) - len(name) / 1000, 'substring'))
+
+        results.sort(key=lambda r: -r[1])
+
+        if fuzzy and (limit is None or len(results) < limit):
+            # A swap of two letters breaks up to four trigrams, which can be
+            # all of a short query's: the swapped-back spellings' trigrams
+            # find those names
+            variants = _transpositions(needle) if len(needle) <= FUZZY_VARIANT_CHARS else []
+            fuzzy_trigrams = sorted(set(trigrams).union(*map(_trigrams, variants)))
+            postings = self._trigram_postings(fuzzy_trigrams, postings)
+            rare = [p for p in postings.values() if p is not None]
+            found = {row['path'] for row, _, _ in results}
+            if rare:
+                results.extend(r for r in self._fuzzy_matches(needle, rare, departments)
+                               if r[0]['path'] not in found)
+
+        return results if limit is None else results[:limit]
+
+    def _like_names(self, needle, departments, limit):
+        """Unranked LIKE scan for queries too short for trigrams; stops at limit (None: never)"""
+        escaped = needle.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        sql = "SELECT * FROM files WHERE lower(name) LIKE ? ESCAPE '\\'"
+        params = [f"%{escaped}%"]
+
+        if departments:
+            sql += f" AND department IN ({', '.join('?' * len(departments))})"
+            params.extend(departments)
+
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def _substring_candidates(self, needle, departments, capped=True):
+        """Rows whose name contains needle, straight from the trigram index (capped unless told not to)"""
+        # The index is walked first; rows are only looked up for its matches
+        if capped:
+            sql = ("SELECT f.* FROM (SELECT rowid FROM name_index WHERE name_index MATCH ? LIMIT ?) n "
+                   "CROSS JOIN files f ON f.rowid = n.rowid")
+            params = [_phrase(needle), NAME_CANDIDATES * (4 if departments else 1)]
+        else:
+            sql = ("SELECT f.* FROM (SELECT rowid FROM name_index WHERE name_index MATCH ?) n "
+                   "CROSS JOIN files f ON f.rowid = n.rowid")
+            params = [_phrase(needle)]
+
+        if departments:
+            sql += f" WHERE +f.department IN ({', '.join('?' * len(departments))})"
+            params.extend(departments)
+
+        if capped:
+            sql += " LIMIT ?"
+            params.append(NAME_CANDIDATES)
+
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def _trigram_postings(self, trigrams, postings, enough=None):
+        """
+        Rowids of the names containing each trigram
+
+        Trigrams found in more than COMMON_TRIGRAM names (client name,
+        extensions, version suffixes) say little and cost a lot to walk,
+        so their lookup stops early, they map to None, and they are
+        remembered so later queries skip them.
+
+        Args:
+            trigrams: Trigrams to look up
+            postings: Lookups already done (filled in and returned)
+            enough: Stop once this many informative trigrams are known
+
+        Returns:
+            Dictionary trigram → set of rowids, or None if too common
+        """
+        with self.lock:
+            for trigram in trigrams:
+                if enough and sum(p is not None for p in postings.values()) >= enough:
+                    break
+                if trigram in postings:
+                    continue
+                if trigram in self._common_trigrams:
+                    postings[trigram] = None
+                    continue
+
+                rowids = self.conn.execute(
+                    "SELECT rowid FROM name_index WHERE name_index MATCH ? LIMIT ?",
+                    (_phrase(trigram), COMMON_TRIGRAM + 1)).fetchall()
+
+                if len(rowids) > COMMON_TRIGRAM:
+                    self._common_trigrams.add(trigram)
+                    postings[trigram] = None
+                else:
+                    postings[trigram] = {rowid for (rowid,) in rowids}
+
+        return postings
+
+    def _rows_by_rowid(self, rowids, departments=None):
+        """Fetch catalog rows (with rowid) by rowid"""
+        if not rowids:
+            return []
+
+        sql = f"SELECT rowid, * FROM files WHERE rowid IN ({', '.join('?' * len(rowids))})"
+        params = list(rowids)
+        if departments:
+            # Unary + keeps SQLite on the rowid lookup instead of the department index
+            sql += f" AND +department IN ({', '.join('?' * len(departments))})"
+            params.extend(departments)
+
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def _fuzzy_matches(self, needle, postings, departments):
+        """
+        Names containing the query up to a few typos
+
+        The names sharing the most informative trigrams with the query
+        (or its transposition variants) are candidates; each is then
+        checked by edit distance, so a name sharing only a trigram or two
+        is not returned unless it really is a close spelling.
+
+        Args:
+            needle: Lowercase query
+            postings: Posting sets of the informative trigrams
+            departments: Optional list of departments to restrict to
+
+        Returns:
+            List of (row, score, 'fuzzy'), best first (scores stay below
+            those of substring matches)
+        """
+        counts = Counter()
+        for rowids in postings:
+            counts.update(rowids)
+
+        max_edits = max(1, len(needle) // FUZZY_CHARS)
+        best = [rowid for rowid, _ in counts.most_common(NAME_CANDIDATES)]
+
+        matches = []
+        for row in self._rows_by_rowid(best, departments):
+            edits = _substring_distance(needle, row['name'].lower(), max_edits)
+            if edits is None:
+                continue
+            overlap = counts[row['rowid']] / len(postings)
+            matches.append((row, (1.0 + overlap) / (2 + edits) - len(row['name']) / 1000, 'fuzzy'))
+
+        matches.sort(key=lambda r: -r[1])
+        return matches
+
+    def get_project_files(self, project, client=None, department=None):
+        """
+        Files of one project, as parsed from their names
+
+        Args:
+            project: Project field of the naming convention
+            client: Optional client to restrict to
+            department: Optional department to restrict to
+
+        Returns:
+            List of rows, newest version first
+        """
+        sql = "SELECT * FROM files WHERE project = ?"
+        params = [project]
+
+        if client:
+            sql += " AND client = ?"
+            params.append(client)
+        if department:
+            sql += " AND department = ?"
+            params.append(department)
+
+        sql += " ORDER BY version DESC, path"
+
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def latest_versions(self, project=None, department=None):
+        """
+        Newest version of every document
+
+        A document is every naming field except the version (client,
+        project, date, extension), wherever it is filed.
+
+        Args:
+            project: Optional project to restrict to
+            department: Optional department to restrict to
+
+        Returns:
+            List of rows, one per document
+        """
+        # SQLite returns the other columns from the row holding MAX(version)
+        sql = "SELECT *, MAX(version) FROM files WHERE doc_key IS NOT NULL"
+        params = []
+
+        if project:
+            sql += " AND project = ?"
+            params.append(project)
+        if department:
+            sql += " AND department = ?"
+            params.append(department)
+
+        sql += " GROUP BY doc_key ORDER BY project, doc_key"
+
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def highest_versions(self, folder):
+        """
+        Highest version per document in one folder (for naming.VersionIndex)
+
+        Only files directly in the folder count, not those in subfolders.
+
+        Returns:
+            Dictionary of NameTemplate.version_key() → version
+        """
+        low, high = _folder_range(folder)
+
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT doc_key, MAX(version) AS version FROM files "
+                "WHERE path >= ? AND path < ? AND doc_key IS NOT NULL "
+                "AND instr(substr(path, ?), ?) = 0 GROUP BY doc_key",
+                (low, high, len(low) + 1, os.sep)).fetchall()
+
+        return {tuple(row['doc_key'].split(KEY_SEPARATOR)): row['version'] for row in rows}
+
+    def get_expiring(self, first_day, last_day, departments=None):
+        """
+        Archived files whose deletion date falls in a range of days
+
+        Reads only the matching buckets of the expiry index, however
+        large the archive is.
+
+        Args:
+            first_day: First deletion date (date)
+            last_day: Last deletion date (date), inclusive
+            departments: Optional list of departments to restrict to
+
+        Returns:
+            List of rows, soonest deletion first
+        """
+        sql = "SELECT * FROM files WHERE expires_day BETWEEN ? AND ?"
+        params = [first_day.toordinal(), last_day.toordinal()]
+
+        if departments:
+            sql += f" AND +department IN ({', '.join('?' * len(departments))})"
+            params.extend(departments)
+
+        sql += " ORDER BY expires_day, mtime_ns"
+
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def query(self, where, params, limit=50, after=None):
+        """
+        One page of files matching a compiled search, newest first
+
+        Pages are keyed on (mtime_ns, path) rather than OFFSET, so every
+        page costs the same however deep it is.
+
+        Args:
+            where: WHERE clause from search_query.compile_query
+            params: Its parameters
+            limit: Page size
+            after: Cursor returned with the previous page, or None
+
+        Returns:
+            (rows, cursor for the next page or None when done)
+        """
+        sql = f"SELECT * FROM files WHERE ({where})"
+        params = list(params)
+
+        if after:
+            sql += " AND (mtime_ns < ? OR (mtime_ns = ? AND path > ?))"
+            params.extend([after[0], after[0], after[1]])
+
+        sql += " ORDER BY mtime_ns DESC, path LIMIT ?"
+        params.append(limit + 1)
+
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+
+        if len(rows) <= limit:
+            return rows, None
+
+        rows = rows[:limit]
+        return rows, (rows[-1]['mtime_ns'], rows[-1]['path'])
+
+    def iter_query(self, where, params, page_size=QUERY_PAGE):
+        """
+        Stream every file matching a compiled search, newest first
+
+        Fetches one page at a time, so the catalog lock is never held
+        while the caller works through results.
+        """
+        cursor = None
+
+        while True:
+            rows, cursor = self.query(where, params, page_size, cursor)
+            yield from rows
+            if cursor is None:
+                return
+
+    def _derive(self, name):
+        """Values of DERIVED_COLUMNS for a filename"""
+        fields = self.name_template.parse(name) if self.name_template else None
+        if fields is None:
+            return (_extension(name), None, None, None, None, None)
+
+        doc_date = fields.get('date')
+        parsed = self.name_template.parse_date(doc_date)
+        if parsed:
+            doc_date = parsed.strftime('%Y-%m-%d')
+
+        doc_key = (KEY_SEPARATOR.join(self.name_template.version_key(fields))
+                   if 'version' in fields else None)
+
+        return (_extension(name), fields.get('client'), fields.get('project'),
+                doc_date, fields.get('version'), doc_key)
+
+    def _expires_day(self, category, mtime_ns):
+        """Deletion date ordinal of a file, or None if it is not counting down"""
+        if category != EXPIRING_CATEGORY or self.delete_days is None:
+            return None
+        return date.fromtimestamp(mtime_ns / 1e9).toordinal() + self.delete_days
+
+    def _template_signature(self):
+        """Identifies the naming convention the derived columns were parsed with"""
+        if not self.name_template:
+            return ''
+        return f"{self.name_template.regex.pattern}|{self.name_template.date_format}"
+
+    def get_stats(self, department, now, archive_days, delete_days):
+        """
+        Aggregate per-category counts and sizes for the retention report
+
+        Args:
+            department: Department name
+            now: Reference datetime
+            archive_days: Working files older than this are ready to archive
+            delete_days: Archive files expire after this many days
+
+        Returns:
+            Dictionary keyed by category name
+        """
+        archive_ns = _to_ns(now) - archive_days * 86400 * 10**9
+        expiring_ns = _to_ns(now) - (delete_days - 7) * 86400 * 10**9
+
+        with self.lock:
+            rows = self.conn.execute("""
+                SELECT category,
+                       COUNT(*) AS count,
+                       COALESCE(SUM(size), 0) AS total_size,
+                       COALESCE(SUM(mtime_ns < ?), 0) AS old_files,
+                       COALESCE(SUM(mtime_ns < ?), 0) AS expiring
+                FROM files WHERE department = ? GROUP BY category
+            """, (archive_ns, expiring_ns, department)).fetchall()
+
+        return {row['category']: row for row in rows}
+
+    def count(self):
+        """Total number of indexed files"""
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
+
+
+def _extension(name):
+    """Lower-case extension without the dot ('' if none)"""
+    return os.path.splitext(name)[1].lower().lstrip('.')
+
+
+def _folder_range(folder):
+    """(low, high) bounds on path for every file under a folder"""
+    folder = os.path.join(os.path.abspath(folder), '')
+
+    # Paths under the folder sort between "folder/" and "folder0" ('0' follows '/')
+    return folder, folder[:-1] + chr(ord(os.sep) + 1)
+
+
+def _trigrams(text):
+    """Set of 3-character substrings"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _transpositions(text):
+    """Spellings of text with two adjacent characters swapped"""
+    return [text[:i] + text[i + 1] + text[i] + text[i + 2:]
+            for i in range(len(text) - 1) if text[i] != text[i + 1]]
+
+
+def _substring_distance(needle, text, max_edits):
+    """
+    Fewest edits (insert, delete, substitute, swap two adjacent characters)
+    turning needle into some substring of text
+
+    Returns:
+        Number of edits, or None if more than max_edits
+    """
+    # Columns of the edit-distance table over text; row 0 is free, so the
+    # match may start anywhere in text
+    before = None
+    previous = list(range(len(needle) + 1))
+    best = previous[-1]
+
+    for j, char in enumerate(text):
+        current = [0] * (len(needle) + 1)
+        for i in range(1, len(needle) + 1):
+            current[i] = min(previous[i] + 1, current[i - 1] + 1,
+                             previous[i - 1] + (needle[i - 1] != char))
+            if (i > 1 and j > 0 and needle[i - 1] == text[j - 1]
+                    and needle[i - 2] == char):
+                current[i] = min(current[i], before[i - 2] + 1)
+        best = min(best, current[-1])
+        before, previous = previous, current
+
+    return best if best <= max_edits else None
+
+
+def _phrase(text):
+    """Quote text as an FTS5 phrase"""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _to_ns(moment):
+    """Convert a datetime to epoch nanoseconds"""
+    return int(moment.timestamp() * 10**9)
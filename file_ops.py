@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+DocuFlow - File Operations Module
+Shared copy, move and hash primitives with large buffers, kernel-side
+copies and optional I/O throttling
+"""
+
+import os
+import time
+import errno
+import shutil
+import hashlib
+import threading
+from datetime import datetime
+
+
+# Read/write buffer for streaming copies and hashing
+BUFFER_SIZE = 1024 * 1024
+
+# Largest kernel-side copy between throttle checks
+THROTTLE_CHUNK = 8 * 1024 * 1024
+
+
+class TokenBucket:
+    """Tokens refilled at a steady rate, up to one second's worth"""
+
+    def __init__(self, rate):
+        """
+        Args:
+            rate: Tokens per second
+        """
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self, amount):
+        """
+        Spend tokens, sleeping while the bucket is in debt
+
+        Requests larger than the bucket are let through and paid back
+        afterwards, so a big file is slowed down rather than refused.
+
+        Returns:
+            Seconds slept
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+        if delay:
+            time.sleep(delay)
+        return delay
+
+
+class IOThrottle:
+    """
+    Bytes/s and ops/s limits for one kind of file operation
+
+    Every move, copy and delete of that kind passes through acquire(),
+    which also counts them, so throughput() reports the actual rate even
+    when no limit is set.
+    """
+
+    def __init__(self, operation, mb_per_sec=None, ops_per_sec=None, active_hours=None):
+        """
+        Args:
+            operation: Name shown in reports (organize, retention, ingest, versioning)
+            mb_per_sec: Data limit in MB/s (None for unlimited)
+            ops_per_sec: File operation limit (None for unlimited)
+            active_hours: "HH:MM-HH:MM" window the limits apply in (None for always)
+        """
+        self.operation = operation
+        self.mb_per_sec = mb_per_sec
+        self.ops_per_sec = ops_per_sec
+        self.byte_bucket = TokenBucket(mb_per_sec * 1024 * 1024) if mb_per_sec else None
+        self.op_bucket = TokenBucket(ops_per_sec) if ops_per_sec else None
+        self.active_hours = _parse_hours(active_hours) if active_hours else None
+        self.lock = threading.Lock()
+        self.reset()
+
+    @classmethod
+    def from_config(cls, config, operation):
+        """
+        Throttle for config['io_throttle'][operation]
+
+        Operations without limits get an unlimited throttle that still
+        measures throughput.
+        """
+        throttle_config = config.get('io_throttle', {})
+        limits = throttle_config.get(operation) or {}
+        return cls(operation, limits.get('mb_per_sec'), limits.get('ops_per_sec'),
+                   throttle_config.get('active_hours'))
+
+    @property
+    def limited(self):
+        """True if a limit applies right now"""
+        if not (self.byte_bucket or self.op_bucket):
+            return False
+        if self.active_hours is None:
+            return True
+
+        start, end = self.active_hours
+        now = datetime.now().time()
+        return start <= now < end if start <= end else (now >= start or now < end)
+
+    def acquire(self, nbytes=0, ops=1):
+        """
+        Account for I/O about to happen (or just done), waiting as the limits require
+
+        Args:
+            nbytes: Bytes read or written
+            ops: File operations (open/rename/unlink)
+        """
+        waited = 0.0
+        if self.limited:
+            if ops and self.op_bucket:
+                waited += self.op_bucket.take(ops)
+            if nbytes and self.byte_bucket:
+                waited += self.byte_bucket.take(nbytes)
+
+        with self.lock:
+            self.ops += ops
+            self.bytes += nbytes
+            self.waited += waited
+
+    def reset(self):
+        """Restart the throughput counters (e.g. at the start of a run)"""
+        with self.lock:
+            self.started = time.monotonic()
+            self.ops = 0
+            self.bytes = 0
+            self.waited = 0.0
+
+    def throughput(self):
+        """
+        Rates since the last reset
+
+        Returns:
+            Dictionary with operation, ops, bytes, seconds, ops_per_sec,
+            mb_per_sec, throttled_seconds and the configured limits
+        """
+        with self.lock:
+            elapsed = time.monotonic() - self.started
+            ops, nbytes, waited = self.ops, self.bytes, self.waited
+
+        return {
+            'operation': self.operation,
+            'ops': ops,
+            'bytes': nbytes,
+            'seconds': elapsed,
+            'ops_per_sec': ops / elapsed if elapsed else 0.0,
+            'mb_per_sec': nbytes / 1048576 / elapsed if elapsed else 0.0,
+            'throttled_seconds': waited,
+            'limits': {'mb_per_sec': self.mb_per_sec, 'ops_per_sec': self.ops_per_sec}
+        }
+
+    def describe(self):
+        """One-line throughput summary for reports"""
+        rate = self.throughput()
+        text = (f"I/O ({self.operation}): {rate['mb_per_sec']:.1f} MB/s, "
+                f"{rate['ops_per_sec']:.1f} ops/s")
+        if rate['throttled_seconds']:
+            text += f", throttled {rate['throttled_seconds']:.1f}s"
+        return text
+
+
+def hash_file(file_path, buffer_size=BUFFER_SIZE):
+    """
+    Calculate the SHA256 of a file
+
+    Args:
+        file_path: File to hash
+        buffer_size: Read size in bytes
+
+    Returns:
+        Hex digest
+    """
+    sha256 = hashlib.sha256()
+    buf = bytearray(buffer_size)
+    view = memoryview(buf)
+
+    with open(file_path, 'rb', buffering=0) as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            sha256.update(view[:n])
+
+    return sha256.hexdigest()
+
+
+def copy_and_hash(source_path, dest_path, buffer_size=BUFFER_SIZE, throttle=None):
+    """
+    Copy a file and hash it in the same pass
+
+    Args:
+        source_path: File to copy
+        dest_path: Destination (overwritten)
+        buffer_size: Read/write size in bytes
+        throttle: Optional IOThrottle to pace the copy
+
+    Returns:
+        SHA256 hex digest of the bytes written
+    """
+    sha256 = hashlib.sha256()
+    buf = bytearray(buffer_size)
+    view = memoryview(buf)
+
+    if throttle:
+        throttle.acquire()
+
+    with open(source_path, 'rb', buffering=0) as src, open(dest_path, 'wb', buffering=0) as dst:
+        while True:
+            n = src.readinto(buf)
+            if not n:
+                break
+            chunk = view[:n]
+            sha256.update(chunk)
+            dst.write(chunk)
+            if throttle:
+                throttle.acquire(n, ops=0)
+
+    return sha256.hexdigest()
+
+
+def fast_copy(source_path, dest_path, throttle=None):
+    """
+    Copy file contents without passing them through Python
+
+    Uses copy_file_range (same-filesystem copies, reflinks on supporting
+    filesystems), then sendfile, then a plain buffered copy.
+
+    Args:
+        source_path: File to copy
+        dest_path: Destination (overwritten)
+        throttle: Optional IOThrottle; the copy then runs in
+                  THROTTLE_CHUNK pieces paced by it
+
+    Raises:
+        OSError: If fewer bytes than the source's size were written
+    """
+    if throttle:
+        throttle.acquire()
+
+    with open(source_path, 'rb') as src, open(dest_path, 'wb') as dst:
+        size = os.fstat(src.fileno()).st_size
+
+        for kernel_copy in (getattr(os, 'copy_file_range', None), getattr(os, 'sendfile', None)):
+            if kernel_copy is None:
+                continue
+            try:
+                copied = _kernel_copy_loop(kernel_copy, src.fileno(), dst.fileno(), size, throttle)
+            except OSError:
+                copied = None
+            if copied == size:
+                return
+
+            # Not supported for this pair of files, or it stopped short
+            # (some filesystems copy nothing): rewind and try the next method
+            src.seek(0)
+            dst.seek(0)
+            dst.truncate()
+
+        if not throttle:
+            shutil.copyfileobj(src, dst, BUFFER_SIZE)
+        else:
+            while True:
+                block = src.read(BUFFER_SIZE)
+                if not block:
+                    break
+                dst.write(block)
+                throttle.acquire(len(block), ops=0)
+
+        if dst.tell() != size:
+            raise OSError(errno.EIO, f"Short copy: {dst.tell():,} of {size:,} bytes written",
+                          dest_path)
+
+
+def copy_file(source_path, dest_path, throttle=None):
+    """
+    Copy a file with its permissions and timestamps (like shutil.copy2)
+
+    Args:
+        source_path: File to copy
+        dest_path: Destination (overwritten)
+        throttle: Optional IOThrottle to pace the copy
+    """
+    fast_copy(source_path, dest_path, throttle)
+    shutil.copystat(source_path, dest_path)
+
+
+def move_file(source_path, dest_path, throttle=None):
+    """
+    Move a file to a new path
+
+    A rename costs one operation; across filesystems the file is copied
+    (paced by the throttle) and the original removed only once the copy
+    is complete.
+
+    Args:
+        source_path: File to move
+        dest_path: Full destination path
+        throttle: Optional IOThrottle
+
+    Raises:
+        OSError: If the copy failed or came out short (the original is
+                 kept and the partial copy removed)
+    """
+    if throttle:
+        throttle.acquire()
+
+    try:
+        os.rename(source_path, dest_path)
+        return
+    except OSError:
+        if not os.path.isfile(source_path):
+            raise
+
+    # Another filesystem (or a rename the platform refuses): copy, then unlink
+    before = os.stat(source_path)
+    try:
+        copy_file(source_path, dest_path, throttle)
+        after = os.stat(source_path)
+        if (os.path.getsize(dest_path) != after.st_size
+                or (after.st_size, after.st_mtime_ns) != (before.st_size, before.st_mtime_ns)):
+            raise OSError(errno.EIO, "Source changed or copy incomplete; original kept",
+                          source_path)
+    except OSError:
+        try:
+            os.remove(dest_path)
+        except OSError:
+            pass
+        raise
+
+    os.remove(source_path)
+
+
+def remove_file(file_path, throttle=None):
+    """Delete a file, counted as one operation by the throttle"""
+    if throttle:
+        throttle.acquire()
+    os.remove(file_path)
+
+
+def remove_empty_dirs(folder, throttle=None):
+    """
+    Remove a folder and the folders under it that hold no files, deepest first
+
+    Folders still holding files (and their parents) are left in place.
+
+    Returns:
+        True if the folder itself was removed
+    """
+    folders = []
+    pending = [folder]
+
+    while pending:
+        current = pending.pop()
+        folders.append(current)
+        try:
+            with os.scandir(current) as entries:
+                pending.extend(entry.path for entry in entries
+                               if entry.is_dir(follow_symlinks=False))
+        except OSError:
+            continue
+
+    for path in reversed(folders):
+        if throttle:
+            throttle.acquire()
+        try:
+            os.rmdir(path)
+        except OSError:
+            pass    # not empty
+
+    return not os.path.exists(folder)
+
+
+def remove_empty_parents(folder, stop, throttle=None):
+    """
+    Remove a folder if empty, then its parents while they are empty, up to
+    (not including) stop
+    """
+    folder = os.path.abspath(folder)
+    stop = os.path.abspath(stop)
+
+    while folder != stop and folder.startswith(os.path.join(stop, '')):
+        if throttle:
+            throttle.acquire()
+        try:
+            os.rmdir(folder)
+        except OSError:
+            return      # not empty
+        folder = os.path.dirname(folder)
+
+
+def link_or_copy(source_path, dest_path, throttle=None):
+    """
+    Hard-link a file to a new name, copying it if linking is not possible
+
+    The destination is replaced atomically, so it may already exist (for
+    example as a reserved placeholder).
+
+    Returns:
+        True if linked, False if copied
+    """
+    if throttle:
+        throttle.acquire()
+
+    link_path = f"{dest_path}.link"
+    try:
+        os.link(source_path, link_path)
+        os.replace(link_path, dest_path)
+        return True
+    except OSError:
+        # Different filesystem or no hard-link support
+        copy_file(source_path, dest_path, throttle)
+        return False
+
+
+def _kernel_copy_loop(kernel_copy, src_fd, dst_fd, size, throttle=None):
+    """
+    Run copy_file_range/sendfile until the whole file is copied
+
+    Returns:
+        Bytes copied; less than size if the kernel stopped early
+    """
+    offset = 0
+    step = THROTTLE_CHUNK if throttle else size
+
+    while offset < size:
+        count = min(step, size - offset)
+        if kernel_copy is os.sendfile:
+            sent = os.sendfile(dst_fd, src_fd, offset, count)
+        else:
+            sent = kernel_copy(src_fd, dst_fd, count, offset, offset)
+        if sent == 0:
+            break
+        offset += sent
+        if throttle:
+            throttle.acquire(sent, ops=0)
+
+    return offset
+
+
+def _parse_hours(window):
+    """'08:00-18:00' → (time, time)"""
+    try:
+        start, end = (datetime.strptime(part.strip(), "%H:%M").time()
+                      for part in window.split('-'))
+    except ValueError:
+        raise ValueError(f"Bad active_hours '{window}' (e.g. 08:00-18:00)")
+    return start, end
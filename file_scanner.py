@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+DocuFlow - File Scanner Module
+Shared directory listing and recursive walks with at most one stat call per file
+"""
+
+import os
+
+
+class ScanStats:
+    """Counters for directory listings and stat calls made by DocuFlow scans"""
+
+    def __init__(self):
+        """Start all counters at zero"""
+        self.reset()
+
+    def reset(self):
+        """Zero all counters"""
+        self.listings = 0
+        self.entries = 0
+        self.stat_calls = 0
+
+    def snapshot(self):
+        """Return the current counters as a dictionary"""
+        return {
+            'listings': self.listings,
+            'entries': self.entries,
+            'stat_calls': self.stat_calls
+        }
+
+    def since(self, snapshot):
+        """
+        Counters accumulated since an earlier snapshot
+
+        Args:
+            snapshot: Dictionary returned by snapshot()
+
+        Returns:
+            Dictionary with the differences
+        """
+        current = self.snapshot()
+        return {key: current[key] - snapshot[key] for key in current}
+
+
+# Process-wide counters, shared by every module that scans folders
+scan_stats = ScanStats()
+
+
+class FileEntry:
+    """A file found by a scan; stats the file at most once"""
+
+    __slots__ = ('name', 'path', '_entry', '_stat')
+
+    def __init__(self, entry):
+        """Wrap an os.DirEntry"""
+        self.name = entry.name
+        self.path = entry.path
+        self._entry = entry
+        self._stat = None
+
+    def stat(self):
+        """Return the stat result, calling the OS only the first time"""
+        if self._stat is None:
+            self._stat = self._entry.stat()
+            scan_stats.stat_calls += 1
+        return self._stat
+
+    @property
+    def size(self):
+        """File size in bytes"""
+        return self.stat().st_size
+
+    @property
+    def mtime(self):
+        """Modification time as epoch seconds"""
+        return self.stat().st_mtime
+
+    @property
+    def mtime_ns(self):
+        """Modification time as epoch nanoseconds"""
+        return self.stat().st_mtime_ns
+
+    @property
+    def ctime(self):
+        """Metadata change (or creation) time as epoch seconds"""
+        return self.stat().st_ctime
+
+    @property
+    def inode(self):
+        """Inode number"""
+        return self.stat().st_ino
+
+    @property
+    def device(self):
+        """Device the file lives on"""
+        return self.stat().st_dev
+
+
+def scan_files(folder):
+    """
+    Yield a FileEntry for each regular file directly inside a folder
+
+    Uses os.scandir so file-type checks come from the directory listing
+    itself; nothing is stat'ed until a caller asks for size or times.
+
+    Args:
+        folder: Folder to list
+
+    Yields:
+        FileEntry objects (a missing folder yields nothing)
+    """
+    try:
+        entries = os.scandir(folder)
+    except (FileNotFoundError, NotADirectoryError):
+        return
+
+    scan_stats.listings += 1
+
+    with entries:
+        for entry in entries:
+            scan_stats.entries += 1
+            if entry.is_file():
+                yield FileEntry(entry)
+
+
+def scan_dirs(folder):
+    """
+    Yield the path of each subdirectory directly inside a folder
+
+    Args:
+        folder: Folder to list
+
+    Yields:
+        Subdirectory paths (a missing folder yields nothing)
+    """
+    try:
+        entries = os.scandir(folder)
+    except (FileNotFoundError, NotADirectoryError):
+        return
+
+    scan_stats.listings += 1
+
+    with entries:
+        for entry in entries:
+            scan_stats.entries += 1
+            if entry.is_dir():
+                yield entry.path
+
+
+def walk_files(folder, excluded=None, skip_paths=()):
+    """
+    Yield a FileEntry for every regular file under a folder, at any depth
+
+    Iterative and streaming: each folder is listed once with os.scandir
+    and its files are yielded as they are read, so memory holds only the
+    subfolders still to visit, never the files. Symlinked folders are
+    not followed.
+
+    Args:
+        folder: Folder to walk (a missing folder yields nothing)
+        excluded: Optional callable(name) → True for subfolder names to
+                  skip (e.g. exclusions.folders); the folder itself is
+                  always walked
+        skip_paths: Absolute paths of subfolders to leave out
+
+    Yields:
+        FileEntry objects
+    """
+    pending = [folder]
+
+    while pending:
+        try:
+            entries = os.scandir(pending.pop())
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            continue
+
+        scan_stats.listings += 1
+        subfolders = []
+
+        with entries:
+            for entry in entries:
+                scan_stats.entries += 1
+                if entry.is_file():
+                    yield FileEntry(entry)
+                elif entry.is_dir(follow_symlinks=False):
+                    if excluded and excluded(entry.name):
+                        continue
+                    if skip_paths and os.path.abspath(entry.path) in skip_paths:
+                        continue
+                    subfolders.append(entry.path)
+
+        # Reversed so subfolders are visited in listing order
+        pending.extend(reversed(subfolders))
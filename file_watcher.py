@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+DocuFlow - File Watcher Module
+inotify-based auto-versioning of every file in the departments' Working folders
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+from file_scanner import walk_files
+from retention_rules import ExclusionMatcher
+from version_control import VersionControl
+
+
+# inotify event masks (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_CREATE |
+              IN_DELETE | IN_DELETE_SELF)
+
+# On the nearest existing parent of a Working folder that does not exist yet
+WAIT_MASK = IN_CREATE | IN_MOVED_TO
+
+# struct inotify_event { int wd; uint32_t mask, cookie, len; char name[]; }
+EVENT_HEADER = struct.Struct("iIII")
+
+READ_SIZE = 64 * 1024
+
+
+class Inotify:
+    """Minimal ctypes binding for Linux inotify"""
+
+    def __init__(self):
+        """Create a non-blocking inotify instance"""
+        if not sys.platform.startswith('linux'):
+            raise OSError("inotify is only available on Linux")
+
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+    def add_watch(self, path, mask=WATCH_MASK):
+        """Watch a directory; returns the watch descriptor"""
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), ctypes.c_uint32(mask))
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), path)
+        return wd
+
+    def read_events(self):
+        """
+        Read all queued events without blocking
+
+        Returns:
+            List of (wd, mask, cookie, name) tuples
+        """
+        events = []
+
+        while True:
+            try:
+                data = os.read(self.fd, READ_SIZE)
+            except BlockingIOError:
+                return events
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                events.append((wd, mask, cookie, name))
+
+    def close(self):
+        """Close the inotify descriptor (drops all watches)"""
+        os.close(self.fd)
+
+
+class FileWatcher:
+    """Watch the Working folders and version files shortly after they are saved"""
+
+    def __init__(self, config_path="config.json", version_control=None):
+        """
+        Args:
+            config_path: DocuFlow configuration file
+            version_control: VersionControl to version with (created if omitted)
+        """
+        with open(config_path, 'r') as f:
+            self.config = json.load(f)
+
+        watcher_config = self.config.get('watcher', {})
+        self.base_path = self.config['base_path']
+        self.category = watcher_config.get('category', 'Working')
+        self.debounce = watcher_config.get('debounce_seconds', 2.0)
+        self.workers = max(1, watcher_config.get('workers', 2))
+        self.excluded = ExclusionMatcher.from_config(self.config)
+        self.excluded_folders = ExclusionMatcher.folders_from_config(self.config)
+        self.version_control = version_control or VersionControl(config_path)
+
+        self.inotify = None
+        self._watches = {}
+        self._waiting = {}
+        self._pending = {}
+        self._queues = [queue.Queue() for _ in range(self.workers)]
+        self._threads = []
+        self._stop = threading.Event()
+        self._wake_r, self._wake_w = os.pipe()
+
+        self.stats = {'events': 0, 'queued': 0, 'versioned': 0, 'unchanged': 0, 'errors': 0}
+        self._stats_lock = threading.Lock()
+
+    def watched_folders(self):
+        """The Working folder of every department"""
+        return [os.path.join(self.base_path, dept, self.category)
+                for dept in self.config['folder_structure']['departments']]
+
+    def start(self):
+        """
+        Install watches and start the versioning workers
+
+        A Working folder that does not exist yet is watched as soon as it
+        is created.
+
+        Returns:
+            Number of directories watched
+        """
+        self.inotify = Inotify()
+        self._watch_missing()
+
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, args=(self._queues[i],),
+                                      name=f"docuflow-version-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        return len(self._watches)
+
+    def run(self):
+        """
+        Process events until stop() is called
+
+        Blocks in select() while nothing is pending, so an idle watcher
+        uses no CPU; debounced files are handed to the workers once they
+        have been quiet for debounce_seconds.
+        """
+        if self.inotify is None:
+            self.start()
+
+        while not self._stop.is_set():
+            timeout = None
+            if self._pending:
+                timeout = max(0.0, min(self._pending.values()) - time.monotonic())
+
+            readable, _, _ = select.select([self.inotify.fd, self._wake_r], [], [], timeout)
+
+            if self.inotify.fd in readable:
+                self._handle_events(self.inotify.read_events())
+            if self._wake_r in readable:
+                os.read(self._wake_r, 64)
+
+            self._flush_due()
+
+        self.shutdown()
+
+    def stop(self):
+        """Ask run() to return (safe to call from any thread or signal handler)"""
+        self._stop.set()
+        if self._wake_w is not None:
+            os.write(self._wake_w, b"x")
+
+    def _handle_events(self, events):
+        """Update watches and the debounce table from a batch of events"""
+        now = time.monotonic()
+
+        for wd, mask, cookie, name in events:
+            self._count('events')
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped: treat every watched file as touched
+                self._watch_missing(now)
+                for folder in self.watched_folders():
+                    self._rescan(folder, now)
+                continue
+
+            if wd in self._waiting:
+                # A folder appeared (or vanished) above a missing Working folder
+                if mask & IN_IGNORED:
+                    del self._waiting[wd]
+                if mask & (IN_ISDIR | IN_IGNORED):
+                    self._watch_missing(now)
+                continue
+
+            folder = self._watches.get(wd)
+            if folder is None:
+                continue
+
+            if mask & (IN_IGNORED | IN_DELETE_SELF):
+                self._watches.pop(wd, None)
+                if mask & IN_DELETE_SELF and folder in self.watched_folders():
+                    self._watch_missing(now)
+                continue
+
+            path = os.path.join(folder, name)
+
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and not self.excluded_folders(name):
+                    self._watch_tree(path)
+                    self._rescan(path, now)
+                continue
+
+            if mask & (IN_DELETE | IN_MOVED_FROM):
+                self._pending.pop(path, None)
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO) and self._wanted(name):
+                # Each new write pushes the deadline back
+                self._pending[path] = now + self.debounce
+
+    def _flush_due(self):
+        """Queue every file whose debounce period has passed"""
+        now = time.monotonic()
+        due = [path for path, deadline in self._pending.items() if deadline <= now]
+
+        for path in due:
+            del self._pending[path]
+            # Same version key → same worker, so version names never race
+            worker = hash(self._version_key(path)) % self.workers
+            self._queues[worker].put(path)
+            self._count('queued')
+
+    def _worker(self, work):
+        """Version queued files until a None sentinel arrives"""
+        while True:
+            path = work.get()
+            if path is None:
+                return
+
+            try:
+                if not os.path.isfile(path):
+                    continue
+
+                key = self._version_key(path)
+                latest = self.version_control.manifest.get_versions(key, 1)
+                version_path = self.version_control.create_version(
+                    path, "Auto-version (file changed)", skip_unchanged=True, key=key)
+
+                if version_path and latest and version_path == latest[0]['path']:
+                    self._count('unchanged')
+                elif version_path:
+                    self._count('versioned')
+            except Exception as e:
+                self._count('errors')
+                print(f"❌ Auto-version failed for {path}: {e}")
+
+    def _version_key(self, path):
+        """Versions are filed by path below base_path, so same-named files keep separate histories"""
+        return os.path.relpath(path, self.base_path)
+
+    def _watch_missing(self, now=None):
+        """
+        Watch Working folders that have appeared since they were last looked for
+
+        Folders that still do not exist are waited for on their nearest
+        existing parent. Newly watched folders are rescanned when now is
+        given (not at start-up, when nothing has changed yet).
+        """
+        watched = set(self._watches.values())
+
+        for folder in self.watched_folders():
+            if folder in watched:
+                continue
+
+            if os.path.isdir(folder):
+                self._watch_tree(folder)
+                if now is not None:
+                    self._rescan(folder, now)
+                continue
+
+            parent = os.path.dirname(folder)
+            while not os.path.isdir(parent) and os.path.dirname(parent) != parent:
+                parent = os.path.dirname(parent)
+            try:
+                self._waiting[self.inotify.add_watch(parent, WAIT_MASK)] = parent
+            except OSError as e:
+                print(f"⚠️  Cannot watch {parent}: {e}")
+
+    def _watch_tree(self, folder):
+        """Watch a folder and every subfolder below it, skipping exclusions.folders"""
+        stack = [folder]
+
+        while stack:
+            current = stack.pop()
+            try:
+                wd = self.inotify.add_watch(current)
+            except OSError as e:
+                print(f"⚠️  Cannot watch {current}: {e}")
+                continue
+
+            self._watches[wd] = current
+
+            try:
+                with os.scandir(current) as entries:
+                    stack.extend(entry.path for entry in entries
+                                 if entry.is_dir(follow_symlinks=False)
+                                 and not self.excluded_folders(entry.name))
+            except OSError:
+                pass
+
+    def _rescan(self, folder, now):
+        """Mark every file under a folder as changed (after overflow or a moved-in tree)"""
+        for entry in walk_files(folder, self.excluded_folders):
+            if self._wanted(entry.name):
+                self._pending[entry.path] = now + self.debounce
+
+    def _wanted(self, name):
+        """Skip excluded names and editor lock/temp files"""
+        return (not self.excluded(name) and not name.startswith(('~$', '.~lock'))
+                and not name.endswith(('.tmp', '.swp')))
+
+    def _count(self, key):
+        """Increment a stats counter"""
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def shutdown(self):
+        """
+        Flush pending work, stop the workers and close inotify and the wake pipe
+
+        run() does this when it returns; call it directly only if run()
+        was interrupted (e.g. by KeyboardInterrupt).
+        """
+        for path in self._pending:
+            self._queues[hash(self._version_key(path)) % self.workers].put(path)
+        self._pending.clear()
+
+        for work in self._queues:
+            work.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads.clear()
+
+        if self.inotify is not None:
+            self.inotify.close()
+            self.inotify = None
+        self._watches.clear()
+        self._waiting.clear()
+
+        if self._wake_w is not None:
+            os.close(self._wake_r)
+            os.close(self._wake_w)
+            self._wake_r = self._wake_w = None
+
+
+def main():
+    """Watch the Working folders until interrupted"""
+    print("=" * 80)
+    print("DocuFlow - File Watcher")
+    print("=" * 80)
+
+    watcher = FileWatcher()
+    watched = watcher.start()
+
+    print(f"\n👁️  Watching {watched} folder(s) under {watcher.category}/")
+    print(f"   Debounce: {watcher.debounce}s, workers: {watcher.workers}")
+    print("   (Press Ctrl+C to stop)")
+
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        watcher.shutdown()
+        print("\n✋ Watcher stopped")
+
+    print(f"\n📊 Versioned: {watcher.stats['versioned']}, "
+          f"unchanged: {watcher.stats['unchanged']}, errors: {watcher.stats['errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+DocuFlow - Full-Text Index Module
+Incremental, ranked content search over text and Office documents
+"""
+
+import os
+import re
+import html
+import sqlite3
+import zlib
+import zipfile
+import threading
+from archive_layout import scan_category
+
+
+# Office Open XML parts that hold document text
+OFFICE_PARTS = {
+    '.docx': re.compile(r'^word/(document|header\d*|footer\d*|footnotes|endnotes)\.xml$'),
+    '.xlsx': re.compile(r'^xl/(sharedStrings|worksheets/sheet\d+)\.xml$'),
+    '.pptx': re.compile(r'^ppt/(slides/slide\d+|notesSlides/notesSlide\d+)\.xml$'),
+}
+
+PLAIN_TEXT = ('.txt', '.csv')
+
+# Closing tags that end a paragraph, cell or string: become whitespace.
+# Every other tag is dropped without a space, so words split across runs stay whole.
+BLOCK_END = re.compile(rb'</(?:w:p|w:tab|w:br|a:p|si|c|row|text:p)>|<(?:w:tab|w:br|a:br)/>')
+ANY_TAG = re.compile(rb'<[^>]*>')
+
+# Cells holding numbers (<v>) rather than text are not worth indexing
+XLSX_VALUE = re.compile(rb'<v>[^<]*</v>')
+
+
+def extract_text(file_path, max_bytes=5 * 1024 * 1024):
+    """
+    Extract searchable text from a supported document
+
+    Args:
+        file_path: .txt, .csv, .docx, .xlsx or .pptx file
+        max_bytes: Stop after this much raw text/XML
+
+    Returns:
+        Text string, or None if the type is unsupported or unreadable
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+
+    try:
+        if ext in PLAIN_TEXT:
+            with open(file_path, 'rb') as f:
+                return f.read(max_bytes).decode('utf-8', errors='replace')
+
+        parts = OFFICE_PARTS.get(ext)
+        if parts is None:
+            return None
+
+        chunks = []
+        remaining = max_bytes
+        with zipfile.ZipFile(file_path) as archive:
+            for name in sorted(archive.namelist()):
+                if remaining <= 0 or not parts.match(name):
+                    continue
+                with archive.open(name) as part:
+                    xml = part.read(remaining)
+                remaining -= len(xml)
+
+                if ext == '.xlsx':
+                    xml = XLSX_VALUE.sub(b' ', xml)
+                xml = ANY_TAG.sub(b'', BLOCK_END.sub(b' ', xml))
+                chunks.append(html.unescape(xml.decode('utf-8', errors='replace')))
+
+        return "\n".join(chunks)
+    except (OSError, EOFError, KeyError, zlib.error, zipfile.BadZipFile, zipfile.LargeZipFile,
+            RuntimeError, NotImplementedError):
+        # Unreadable, corrupt, encrypted or unsupported compression: index the name only
+        return None
+
+
+def supported(name):
+    """True if extract_text can read this file type"""
+    ext = os.path.splitext(name)[1].lower()
+    return ext in PLAIN_TEXT or ext in OFFICE_PARTS
+
+
+class FullTextIndex:
+    """Inverted index of document contents, stored with SQLite FTS5"""
+
+    def __init__(self, db_path="docuflow_fulltext.db", max_text_bytes=5 * 1024 * 1024):
+        """
+        Open (or create) the index
+
+        Args:
+            db_path: SQLite file for the index
+            max_text_bytes: Per-document cap on extracted text
+
+        Raises:
+            RuntimeError: If this SQLite build lacks FTS5
+        """
+        self.db_path = db_path
+        self.max_text_bytes = max_text_bytes
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.RLock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+        try:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS docs (
+                    id INTEGER PRIMARY KEY,
+                    path TEXT UNIQUE NOT NULL,
+                    department TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL
+                );
+                CREATE VIRTUAL TABLE IF NOT EXISTS content USING fts5 (
+                    name, body, tokenize = 'unicode61 remove_diacritics 2'
+                );
+            """)
+        except sqlite3.OperationalError as e:
+            raise RuntimeError(f"Full-text search needs SQLite with FTS5: {e}")
+        self.conn.commit()
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Open the index described by config['fulltext']
+
+        Returns:
+            FullTextIndex, or None if disabled or unsupported
+        """
+        fulltext_config = config.get('fulltext', {})
+        if not fulltext_config.get('enabled', False):
+            return None
+
+        try:
+            return cls(fulltext_config.get('db_path', "docuflow_fulltext.db"),
+                       fulltext_config.get('max_text_bytes', 5 * 1024 * 1024))
+        except RuntimeError as e:
+            print(f"⚠️  {e}")
+            return None
+
+    def update(self, base_path, departments, categories, batch_size=500, excluded=None):
+        """
+        Bring the index up to date with the department folders
+
+        Only new files and files whose size or mtime changed are re-read;
+        files that disappeared are dropped. Subfolders are included, except
+        those matched by excluded (callable on the folder name).
+
+        Returns:
+            Dictionary with added, updated, removed and unchanged counts
+        """
+        with self.lock:
+            known = {row['path']: (row['id'], row['size'], row['mtime_ns'])
+                     for row in self.conn.execute("SELECT id, path, size, mtime_ns FROM docs")}
+
+        counts = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+        pending = 0
+
+        for dept in departments:
+            for cat in categories:
+                for entry in scan_category(base_path, dept, cat, excluded):
+                    if not supported(entry.name):
+                        continue
+
+                    path = os.path.abspath(entry.path)
+                    previous = known.pop(path, None)
+                    if previous and previous[1:] == (entry.size, entry.mtime_ns):
+                        counts['unchanged'] += 1
+                        continue
+
+                    self._index(path, dept, cat, entry.size, entry.mtime_ns,
+                                previous[0] if previous else None)
+                    counts['updated' if previous else 'added'] += 1
+
+                    pending += 1
+                    if pending >= batch_size:
+                        with self.lock:
+                            self.conn.commit()
+                        pending = 0
+
+        # Whatever was not seen on disk is gone
+        with self.lock:
+            for doc_id, _, _ in known.values():
+                self._delete(doc_id)
+            self.conn.commit()
+        counts['removed'] = len(known)
+
+        return counts
+
+    def index_file(self, file_path, department, category):
+        """Index (or re-index) one file, e.g. right after it was organized"""
+        if not supported(file_path):
+            return
+
+        path = os.path.abspath(file_path)
+        st = os.stat(path)
+
+        with self.lock:
+            row = self.conn.execute("SELECT id FROM docs WHERE path = ?", (path,)).fetchone()
+            self._index(path, department, category, st.st_size, st.st_mtime_ns,
+                        row['id'] if row else None)
+            self.conn.commit()
+
+    def move_file(self, old_path, new_path, department, category):
+        """
+        Record that a file was moved (archived, finalized), keeping its
+        extracted text; files not indexed yet are indexed now
+        """
+        if not supported(new_path):
+            return
+
+        new_path = os.path.abspath(new_path)
+
+        with self.lock:
+            row = self.conn.execute("SELECT id FROM docs WHERE path = ?",
+                                    (os.path.abspath(old_path),)).fetchone()
+            if row is None:
+                self.index_file(new_path, department, category)
+                return
+
+            clash = self.conn.execute("SELECT id FROM docs WHERE path = ?", (new_path,)).fetchone()
+            if clash:
+                self._delete(clash['id'])
+
+            self.conn.execute("UPDATE docs SET path = ?, department = ?, category = ? WHERE id = ?",
+                              (new_path, department, category, row['id']))
+            self.conn.execute("UPDATE content SET name = ? WHERE rowid = ?",
+                              (_display_name(new_path), row['id']))
+            self.conn.commit()
+
+    def remove_file(self, file_path):
+        """Drop a file from the index"""
+        with self.lock:
+            row = self.conn.execute("SELECT id FROM docs WHERE path = ?",
+                                    (os.path.abspath(file_path),)).fetchone()
+            if row:
+                self._delete(row['id'])
+                self.conn.commit()
+
+    def search(self, query, departments=None, limit=50):
+        """
+        Ranked content search
+
+        Every word must appear (in the body or the filename); a trailing *
+        on a word matches prefixes. Results are ordered by BM25 relevance,
+        with filename hits weighted above body hits.
+
+        Args:
+            query: Words to look for
+            departments: Optional list of departments to restrict to
+            limit: Max results
+
+        Returns:
+            List of rows: path, department, category, size, mtime_ns, score, snippet
+        """
+        match = _match_expression(query)
+        if not match:
+            return []
+
+        sql = """
+            SELECT d.path, d.department, d.category, d.size, d.mtime_ns,
+                   bm25(content, 4.0, 1.0) AS score,
+                   snippet(content, 1, '[', ']', ' … ', 12) AS snippet
+            FROM content JOIN docs d ON d.id = content.rowid
+            WHERE content MATCH ?
+        """
+        params = [match]
+
+        if departments:
+            sql += f" AND d.department IN ({', '.join('?' * len(departments))})"
+            params.extend(departments)
+
+        sql += " ORDER BY score LIMIT ?"
+        params.append(limit)
+
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def count(self):
+        """Number of indexed documents"""
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def close(self):
+        """Close the database connection"""
+        with self.lock:
+            self.conn.close()
+
+    def _index(self, path, department, category, size, mtime_ns, doc_id):
+        """Extract and store one document (caller commits)"""
+        text = extract_text(path, self.max_text_bytes) or ""
+        name = _display_name(path)
+
+        with self.lock:
+            if doc_id is not None:
+                self.conn.execute("DELETE FROM content WHERE rowid = ?", (doc_id,))
+                self.conn.execute(
+                    "UPDATE docs SET department = ?, category = ?, size = ?, mtime_ns = ? "
+                    "WHERE id = ?", (department, category, size, mtime_ns, doc_id))
+            else:
+                doc_id = self.conn.execute(
+                    "INSERT INTO docs (path, department, category, size, mtime_ns) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (path, department, category, size, mtime_ns)).lastrowid
+
+            self.conn.execute("INSERT INTO content (rowid, name, body) VALUES (?, ?, ?)",
+                              (doc_id, name, text))
+
+    def _delete(self, doc_id):
+        """Remove one document (caller commits)"""
+        self.conn.execute("DELETE FROM content WHERE rowid = ?", (doc_id,))
+        self.conn.execute("DELETE FROM docs WHERE id = ?", (doc_id,))
+
+
+def _display_name(path):
+    """Filename as indexed: no extension, underscores as spaces"""
+    return os.path.splitext(os.path.basename(path))[0].replace('_', ' ')
+
+
+def _match_expression(query):
+    """Turn free text into an FTS5 query: every word quoted, trailing * kept as prefix"""
+    terms = []
+
+    for word in re.findall(r'[\w*]+', query):
+        prefix = word.endswith('*')
+        word = word.strip('*')
+        if word:
+            terms.append(f'"{word}"' + ('*' if prefix else ''))
+
+    return " ".join(terms)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+DocuFlow - Hash Cache Module
+SHA256 cache keyed by file identity and stat, so unchanged files are never re-read
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from file_ops import hash_file
+
+
+# A file modified this recently may change again within the same mtime tick
+# without its stat changing, so its hash is not cached yet
+RACY_WINDOW_NS = 2 * 1000 * 1000 * 1000
+
+
+class HashCache:
+    """Persistent (device, inode, size, mtime_ns) → SHA256 cache"""
+
+    def __init__(self, db_path):
+        """
+        Open (or create) the cache database
+
+        Args:
+            db_path: SQLite file to keep hashes in
+        """
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.RLock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS hashes (
+                device INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                hash TEXT NOT NULL,
+                PRIMARY KEY (device, inode)
+            );
+        """)
+        self.conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, file_path, st=None):
+        """
+        Return the cached hash of a file if its stat has not changed
+
+        Args:
+            file_path: File to look up
+            st: Stat result for the file, if the caller already has one
+
+        Returns:
+            Hex digest, or None if unknown or stale
+        """
+        st = st or os.stat(file_path)
+
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT size, mtime_ns, hash FROM hashes WHERE device = ? AND inode = ?",
+                (st.st_dev, st.st_ino)).fetchone()
+
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return row[2]
+        return None
+
+    def put(self, st, file_hash):
+        """
+        Remember the hash of a file as of a stat result
+
+        Args:
+            st: Stat result taken before the content was hashed
+            file_hash: SHA256 of the content
+        """
+        if time.time_ns() - st.st_mtime_ns < RACY_WINDOW_NS:
+            return
+
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?)",
+                (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, file_hash))
+
+    def hash(self, file_path, st=None):
+        """
+        Hash a file, reading it only if the cache has no current entry
+
+        Args:
+            file_path: File to hash
+            st: Stat result for the file, if the caller already has one
+
+        Returns:
+            Hex digest
+        """
+        st = st or os.stat(file_path)
+
+        file_hash = self.get(file_path, st)
+        if file_hash is not None:
+            self.hits += 1
+            return file_hash
+
+        self.misses += 1
+        file_hash = hash_file(file_path)
+
+        # Only cache the result if the file did not change while being read
+        if _same_stat(st, os.stat(file_path)):
+            self.put(st, file_hash)
+
+        return file_hash
+
+    def record_copy(self, st, file_path, file_hash):
+        """
+        Cache a hash computed while copying a file
+
+        Args:
+            st: Stat of the source taken before the copy
+            file_path: The source file
+            file_hash: Hash of the bytes copied
+        """
+        try:
+            if _same_stat(st, os.stat(file_path)):
+                self.put(st, file_hash)
+        except FileNotFoundError:
+            pass
+
+    def forget(self, file_path):
+        """Drop the cache entry for a file"""
+        try:
+            st = os.stat(file_path)
+        except FileNotFoundError:
+            return
+
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM hashes WHERE device = ? AND inode = ?",
+                              (st.st_dev, st.st_ino))
+
+    def close(self):
+        """Close the database connection"""
+        with self.lock:
+            self.conn.close()
+
+
+def _same_stat(a, b):
+    """True if two stat results describe the same, unmodified file"""
+    return ((a.st_dev, a.st_ino, a.st_size, a.st_mtime_ns) ==
+            (b.st_dev, b.st_ino, b.st_size, b.st_mtime_ns))
@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+"""
+DocuFlow - Ingest Daemon Module
+Continuous hot-folder ingestion through a staged, bounded-queue pipeline
+"""
+
+import os
+import json
+import time
+import queue
+import select
+import stat
+import threading
+from datetime import datetime
+from document_organizer import DocumentOrganizer
+from file_ops import IOThrottle, copy_file, hash_file, link_or_copy, move_file, remove_file
+from file_scanner import scan_files
+from file_watcher import Inotify, IN_CLOSE_WRITE, IN_MOVED_TO
+from retention_rules import ExclusionMatcher
+
+
+class _Stage:
+    """One pipeline stage: a worker pool reading a bounded queue"""
+
+    def __init__(self, name, func, workers, inbox, outbox, on_error):
+        """
+        Args:
+            name: Stage name (for stats and thread names)
+            func: Called with each item; returns the item to pass on, or None to drop it
+            workers: Number of worker threads
+            inbox: Queue this stage reads
+            outbox: Queue for the next stage, or None for the last stage
+            on_error: Called with (item, exception) when func raises; the
+                      item is dropped and the worker carries on
+        """
+        self.name = name
+        self.func = func
+        self.on_error = on_error
+        self.workers = workers
+        self.inbox = inbox
+        self.outbox = outbox
+        self.next_workers = 0
+        self.processed = 0
+        self.busy_seconds = 0.0
+        self._running = workers
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self, next_workers):
+        """Start the workers; next_workers is how many sentinels to pass on"""
+        self.next_workers = next_workers
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"docuflow-{self.name}-{i}",
+                                      daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def join(self):
+        """Wait for every worker to exit"""
+        for thread in self._threads:
+            thread.join()
+
+    def _work(self):
+        """Process items until a None sentinel arrives"""
+        try:
+            while True:
+                item = self.inbox.get()
+                if item is None:
+                    break
+
+                start = time.perf_counter()
+                try:
+                    result = self.func(item)
+                except Exception as e:
+                    # e.g. sqlite3 "database is locked": fail the item, not the worker
+                    result = None
+                    self.on_error(item, e)
+                with self._lock:
+                    self.processed += 1
+                    self.busy_seconds += time.perf_counter() - start
+
+                if result is not None and self.outbox is not None:
+                    self.outbox.put(result)
+        finally:
+            # The last worker out shuts the next stage down
+            with self._lock:
+                self._running -= 1
+                last = self._running == 0
+            if last and self.outbox is not None:
+                for _ in range(self.next_workers):
+                    self.outbox.put(None)
+
+
+class IngestDaemon:
+    """Watch drop folders and organize files once they stop changing"""
+
+    def __init__(self, config_path="config.json", organizer=None):
+        """
+        Args:
+            config_path: DocuFlow configuration file
+            organizer: DocumentOrganizer to file documents with (created if omitted)
+        """
+        with open(config_path, 'r') as f:
+            self.config = json.load(f)
+
+        ingest_config = self.config.get('ingest', {})
+        self.drop_folders = ingest_config.get('drop_folders', {})
+        self.category = ingest_config.get('category', 'Working')
+        self.quiet_seconds = ingest_config.get('quiet_seconds', 5.0)
+        self.poll_seconds = ingest_config.get('poll_seconds', 30.0)
+        self.processed_folder = ingest_config.get('processed_folder', 'Processed')
+        self.duplicates_folder = ingest_config.get('duplicates_folder', 'Duplicates')
+        queue_size = ingest_config.get('queue_size', 100)
+        workers = ingest_config.get('workers', {})
+        self.excluded = ExclusionMatcher.from_config(self.config)
+        self.organizer = organizer or DocumentOrganizer(config_path)
+        self.throttle = IOThrottle.from_config(self.config, 'ingest')
+
+        hash_queue = queue.Queue(queue_size)
+        name_queue = queue.Queue(queue_size)
+        copy_queue = queue.Queue(queue_size)
+        self.stages = [
+            _Stage('hash', self._hash_stage, workers.get('hash', 2), hash_queue, name_queue,
+                   self._fail),
+            _Stage('name', self._name_stage, 1, name_queue, copy_queue, self._fail),
+            _Stage('copy', self._copy_stage, workers.get('copy', 4), copy_queue, None,
+                   self._fail),
+        ]
+
+        self.inotify = None
+        self._watches = {}
+        self._pending = {}
+        self._in_flight = set()
+        self._failed = {}
+        self._hashing = {}      # content hash → source of the file being ingested with it
+        self._lock = threading.Lock()
+        self._hash_released = threading.Condition(self._lock)
+        self._stop = threading.Event()
+        self._wake_r, self._wake_w = os.pipe()
+
+        self.stats = {'detected': 0, 'ingested': 0, 'duplicates': 0, 'failed': 0,
+                      'bytes': 0, 'latency_total': 0.0, 'latency_max': 0.0}
+
+    def start(self):
+        """
+        Create the drop folders, install watches and start the pipeline
+
+        Returns:
+            Number of drop folders watched
+        """
+        try:
+            self.inotify = Inotify()
+        except OSError as e:
+            # Polling alone still works, just with poll_seconds of extra latency
+            print(f"⚠️  inotify unavailable ({e}), polling every {self.poll_seconds}s")
+
+        for department, folder in self.drop_folders.items():
+            os.makedirs(folder, exist_ok=True)
+            if self.inotify:
+                self._watches[self.inotify.add_watch(folder, IN_CLOSE_WRITE | IN_MOVED_TO)] = \
+                    (department, folder)
+
+        for i, stage in enumerate(self.stages):
+            following = self.stages[i + 1].workers if i + 1 < len(self.stages) else 0
+            stage.start(following)
+
+        return len(self.drop_folders)
+
+    def run(self):
+        """
+        Detect files until stop() is called, then drain the pipeline
+
+        The detect loop sleeps in select() until an inotify event, the next
+        quiescence deadline or the next poll (drop folders on network shares
+        do not raise inotify events for remote writes).
+        """
+        if not self.stages[0]._threads:
+            self.start()
+
+        next_poll = time.monotonic()
+
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if now >= next_poll:
+                self._poll()
+                next_poll = now + self.poll_seconds
+
+            deadline = min([next_poll] + [p['deadline'] for p in self._pending.values()])
+            fds = [self._wake_r] + ([self.inotify.fd] if self.inotify else [])
+            readable, _, _ = select.select(fds, [], [], max(0.0, deadline - time.monotonic()))
+
+            if self.inotify and self.inotify.fd in readable:
+                self._handle_events(self.inotify.read_events())
+            if self._wake_r in readable:
+                os.read(self._wake_r, 64)
+
+            self._release_quiet()
+
+        self.shutdown()
+
+    def stop(self):
+        """Ask run() to finish in-flight files and return"""
+        self._stop.set()
+        if self._wake_w is not None:
+            os.write(self._wake_w, b"x")
+
+    # Detect stage
+
+    def _handle_events(self, events):
+        """Arm quiescence timers for files written or moved into a drop folder"""
+        for wd, mask, cookie, name in events:
+            watch = self._watches.get(wd)
+            if watch:
+                self._arm(watch[0], os.path.join(watch[1], name))
+
+    def _poll(self):
+        """Rescan every drop folder (first run, and files inotify cannot see)"""
+        for department, folder in self.drop_folders.items():
+            for entry in scan_files(folder):
+                if entry.path not in self._pending:
+                    self._arm(department, entry.path)
+
+    def _arm(self, department, path):
+        """Start (or restart) waiting for a file to stop changing"""
+        name = os.path.basename(path)
+        if self.excluded(name) or name.startswith(('.', '~$')):
+            return
+
+        with self._lock:
+            if path in self._in_flight:
+                return
+
+        self._pending[path] = {'department': department, 'stat': None,
+                               'deadline': time.monotonic() + self.quiet_seconds}
+
+    def _release_quiet(self):
+        """Send files whose size and mtime held still for quiet_seconds to the pipeline"""
+        now = time.monotonic()
+
+        for path, pending in list(self._pending.items()):
+            if pending['deadline'] > now:
+                continue
+
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                del self._pending[path]
+                continue
+
+            if not stat.S_ISREG(st.st_mode):
+                del self._pending[path]
+                continue
+
+            key = (st.st_size, st.st_mtime_ns)
+            if key != pending['stat']:
+                # Still being written: check again after another quiet period
+                pending['stat'] = key
+                pending['deadline'] = now + self.quiet_seconds
+                continue
+
+            del self._pending[path]
+            if self._failed.get(path) == key:
+                continue
+
+            with self._lock:
+                self._in_flight.add(path)
+                self.stats['detected'] += 1
+
+            # Blocks when the pipeline is full, which throttles detection
+            self.stages[0].inbox.put({
+                'source': path,
+                'department': pending['department'],
+                'stat': key,
+                'detected': now,
+                'hash': None,
+                'destination': None,
+                'link_to': None
+            })
+
+    # Pipeline stages
+
+    def _hash_stage(self, item):
+        """Hash the file and drop content that is already organized"""
+        try:
+            item['hash'] = hash_file(item['source'])
+        except OSError as e:
+            return self._fail(item, e)
+
+        if not self.organizer.duplicates:
+            return item
+
+        # A file with the same bytes still in the pipeline is not in the
+        # duplicate index yet: wait until it is ingested (or failed)
+        with self._hash_released:
+            while item['hash'] in self._hashing:
+                self._hash_released.wait()
+            self._hashing[item['hash']] = item['source']
+
+        try:
+            duplicate_of, _ = self.organizer.duplicates.check(
+                item['source'], item['department'], file_hash=item['hash'])
+        except OSError as e:
+            return self._fail(item, e)
+
+        if duplicate_of and self.organizer.duplicate_action == 'link':
+            item['link_to'] = duplicate_of
+            duplicate_of = None
+        elif self.organizer.duplicate_action != 'skip':
+            duplicate_of = None
+
+        if duplicate_of:
+            self._finish(item, self.duplicates_folder)
+            self.organizer.log(f"Ingest duplicate: {item['source']} (same as {duplicate_of})")
+            with self._lock:
+                self.stats['duplicates'] += 1
+            return None
+
+        return item
+
+    def _name_stage(self, item):
+        """Reserve the standardized destination name"""
+        dest_folder = os.path.join(self.organizer.base_path, item['department'], self.category)
+
+        try:
+            os.makedirs(dest_folder, exist_ok=True)
+            item['destination'] = self.organizer.reserve_destination(
+                dest_folder, os.path.basename(item['source']), "")
+        except OSError as e:
+            return self._fail(item, e)
+
+        if item['destination'] is None:
+            return self._fail(item, "destination exists")
+        return item
+
+    def _copy_stage(self, item):
+        """Copy into the reserved name, catalog and log it, then set the original aside"""
+        try:
+            if item['link_to']:
+                link_or_copy(item['link_to'], item['destination'], self.throttle)
+            else:
+                copy_file(item['source'], item['destination'], self.throttle)
+        except OSError as e:
+            if os.path.exists(item['destination']):
+                remove_file(item['destination'], self.throttle)
+            return self._fail(item, e)
+
+        if self.organizer.catalog:
+            self.organizer.catalog.add_file(item['destination'], item['department'],
+                                            self.category, item['hash'])
+        if self.organizer.fulltext:
+            self.organizer.fulltext.index_file(item['destination'], item['department'],
+                                               self.category)
+        if self.organizer.duplicates:
+            self.organizer.duplicates.add(item['stat'][0], item['hash'])
+        self.organizer.log(f"Ingested: {item['source']} → {item['destination']}")
+        print(f"✅ Ingested: {os.path.basename(item['destination'])}")
+
+        self._finish(item, self.processed_folder)
+
+        latency = time.monotonic() - item['detected']
+        with self._lock:
+            self.stats['ingested'] += 1
+            self.stats['bytes'] += item['stat'][0]
+            self.stats['latency_total'] += latency
+            self.stats['latency_max'] = max(self.stats['latency_max'], latency)
+        return None
+
+    def _finish(self, item, subfolder):
+        """Move the original out of the drop folder (originals are never deleted)"""
+        folder = os.path.join(os.path.dirname(item['source']), subfolder)
+        os.makedirs(folder, exist_ok=True)
+
+        name = os.path.basename(item['source'])
+        target = os.path.join(folder, name)
+        if os.path.exists(target):
+            stem, ext = os.path.splitext(name)
+            target = os.path.join(folder, f"{stem}.{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}{ext}")
+
+        try:
+            move_file(item['source'], target, self.throttle)
+        except OSError as e:
+            print(f"⚠️  Could not move {item['source']} to {subfolder}/: {e}")
+
+        with self._lock:
+            self._release(item)
+
+    def _fail(self, item, error):
+        """Record a failure; the file is retried only once it changes"""
+        print(f"❌ Failed to ingest {item['source']}: {error}")
+        self.organizer.log(f"Ingest failed: {item['source']} ({error})")
+
+        with self._lock:
+            self._failed[item['source']] = item['stat']
+            self._release(item)
+            self.stats['failed'] += 1
+        return None
+
+    def _release(self, item):
+        """Forget a finished item and wake files waiting on its content (caller holds the lock)"""
+        self._in_flight.discard(item['source'])
+        if item['hash'] and self._hashing.get(item['hash']) == item['source']:
+            del self._hashing[item['hash']]
+            self._hash_released.notify_all()
+
+    def summary(self):
+        """Counters plus average latency and per-stage busy time"""
+        with self._lock:
+            summary = dict(self.stats)
+
+        done = summary['ingested']
+        summary['latency_avg'] = summary['latency_total'] / done if done else 0.0
+        summary['stages'] = {stage.name: {'processed': stage.processed,
+                                          'busy_seconds': stage.busy_seconds,
+                                          'queued': stage.inbox.qsize()}
+                             for stage in self.stages}
+        summary['io'] = self.throttle.throughput()
+        return summary
+
+    def shutdown(self):
+        """
+        Drain the pipeline and release inotify and the wake pipe
+
+        run() does this when it returns; call it directly only if run()
+        was interrupted (e.g. by KeyboardInterrupt).
+        """
+        for _ in range(self.stages[0].workers):
+            self.stages[0].inbox.put(None)
+        for stage in self.stages:
+            stage.join()
+
+        if self.inotify:
+            self.inotify.close()
+            self.inotify = None
+
+        if self._wake_w is not None:
+            os.close(self._wake_r)
+            os.close(self._wake_w)
+            self._wake_r = self._wake_w = None
+
+
+def main():
+    """Run the ingest daemon until interrupted"""
+    print("=" * 80)
+    print("DocuFlow - Ingest Daemon")
+    print("=" * 80)
+
+    daemon = IngestDaemon()
+    if not daemon.drop_folders:
+        print("❌ No drop folders configured (ingest.drop_folders in config.json)")
+        return
+
+    daemon.start()
+    for department, folder in daemon.drop_folders.items():
+        print(f"📥 {folder} → {department}/{daemon.category}")
+    print(f"   Quiet period: {daemon.quiet_seconds}s (Press Ctrl+C to stop)")
+
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        print("\n✋ Stopping, finishing files in progress...")
+        daemon.shutdown()
+
+    summary = daemon.summary()
+    print(f"\n📊 Ingested: {summary['ingested']}, duplicates: {summary['duplicates']}, "
+          f"failed: {summary['failed']}")
+    print(f"   Average latency: {summary['latency_avg']:.2f}s (max {summary['latency_max']:.2f}s)")
+    print(f"   {daemon.throttle.describe()}")
+
+
+if __name__ == "__main__":
+    main()
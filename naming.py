@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+DocuFlow - Naming Module
+Compiled naming-convention templates and per-folder version slots
+"""
+
+import re
+import string
+import threading
+from datetime import datetime
+from file_scanner import scan_files
+
+
+# Regex fragments for strftime directives used in date formats
+DATE_DIRECTIVES = {
+    'Y': r'\d{4}', 'y': r'\d{2}', 'm': r'\d{2}', 'd': r'\d{2}',
+    'H': r'\d{2}', 'M': r'\d{2}', 'S': r'\d{2}', 'j': r'\d{3}',
+    'b': r'[A-Za-z]{3}', 'B': r'[A-Za-z]+', 'a': r'[A-Za-z]{3}', 'A': r'[A-Za-z]+',
+    '%': '%'
+}
+
+
+class NameTemplate:
+    """Naming-convention pattern that can both build and parse filenames"""
+
+    def __init__(self, pattern, date_format="%Y%m%d", fixed=None):
+        """
+        Compile a naming pattern
+
+        Args:
+            pattern: Pattern such as "{client}_{project}_{date}_v{version}.{ext}"
+            date_format: strftime format used for {date}
+            fixed: Optional {field: value} for fields that are constant
+                   (e.g. the client name), which makes parsing unambiguous
+        """
+        self.pattern = pattern
+        self.date_format = date_format
+        self.fixed = fixed or {}
+        self.fields = []
+        self.regex = re.compile(self._build_regex())
+
+    @classmethod
+    def from_config(cls, config):
+        """Template for config['naming_convention'], with the client name fixed"""
+        naming = config['naming_convention']
+        return cls(naming['pattern'], naming['date_format'],
+                   fixed={'client': config['client_name'].replace(' ', '_')})
+
+    def _build_regex(self):
+        """Translate the pattern into a regex with one named group per field"""
+        parts = []
+
+        for literal, field, _, _ in string.Formatter().parse(self.pattern):
+            parts.append(re.escape(literal))
+            if field is None:
+                continue
+
+            if field in self.fields:
+                # Repeated field must match the same text again
+                parts.append(f"(?P={field})")
+                continue
+
+            self.fields.append(field)
+            parts.append(f"(?P<{field}>{self._field_regex(field)})")
+
+        return "^" + "".join(parts) + "$"
+
+    def _field_regex(self, field):
+        """Regex fragment for a single field"""
+        if field in self.fixed:
+            return re.escape(str(self.fixed[field]))
+        if field == 'version':
+            return r'\d+'
+        if field == 'ext':
+            return r'[^.]*'
+        if field == 'date':
+            return self._date_regex()
+        return r'.+'
+
+    def _date_regex(self):
+        """Regex equivalent of the strftime date format"""
+        parts = []
+        i = 0
+
+        while i < len(self.date_format):
+            char = self.date_format[i]
+            if char == '%' and i + 1 < len(self.date_format):
+                parts.append(DATE_DIRECTIVES.get(self.date_format[i + 1], r'.+?'))
+                i += 2
+            else:
+                parts.append(re.escape(char))
+                i += 1
+
+        return "".join(parts)
+
+    def format(self, **fields):
+        """Build a filename from field values"""
+        return self.pattern.format(**fields)
+
+    def parse(self, filename):
+        """
+        Extract field values from a filename
+
+        Args:
+            filename: Name produced by this pattern
+
+        Returns:
+            Dictionary of fields (version as int), or None if it does not match
+        """
+        match = self.regex.match(filename)
+        if not match:
+            return None
+
+        fields = match.groupdict()
+        if 'version' in fields:
+            fields['version'] = int(fields['version'])
+
+        return fields
+
+    @property
+    def has_version(self):
+        """Whether the pattern contains a {version} field"""
+        return 'version' in self.fields
+
+    def version_key(self, fields):
+        """Identity of a document across versions: every field but version"""
+        return tuple(str(fields.get(field, '')) for field in self.fields if field != 'version')
+
+    def parse_date(self, text):
+        """
+        Read a {date} value back into a datetime
+
+        Returns:
+            datetime, or None if the text does not fit the date format
+        """
+        try:
+            return datetime.strptime(text, self.date_format)
+        except (TypeError, ValueError):
+            return None
+
+
+class VersionIndex:
+    """Highest version seen per (client, project, date, ext) in each folder"""
+
+    def __init__(self, template, catalog=None):
+        """
+        Args:
+            template: NameTemplate used to parse existing filenames
+            catalog: Optional FileCatalog; folders are then loaded from its
+                     parsed-name columns instead of being listed
+        """
+        self.template = template
+        self.catalog = catalog
+        self.folders = {}
+        self.lock = threading.Lock()
+
+    def _load_folder(self, folder):
+        """Parse every filename in a folder once (no stat calls)"""
+        if self.catalog and self.catalog.name_template:
+            return self.catalog.highest_versions(folder)
+
+        highest = {}
+
+        for entry in scan_files(folder):
+            fields = self.template.parse(entry.name)
+            if fields is None:
+                continue
+
+            key = self.template.version_key(fields)
+            if fields['version'] > highest.get(key, 0):
+                highest[key] = fields['version']
+
+        return highest
+
+    def next_version(self, folder, fields):
+        """
+        Claim the next version number for a document in a folder
+
+        Args:
+            folder: Destination folder
+            fields: Filename fields without version
+
+        Returns:
+            Next unused version (1 if the document is new to the folder)
+        """
+        key = self.template.version_key(fields)
+
+        with self.lock:
+            if folder not in self.folders:
+                self.folders[folder] = self._load_folder(folder)
+
+            highest = self.folders[folder]
+            version = highest.get(key, 0) + 1
+            highest[key] = version
+
+            return version
+
+    def record(self, folder, fields, version):
+        """Note that a version exists (e.g. one found by a collision)"""
+        key = self.template.version_key(fields)
+
+        with self.lock:
+            # Unloaded folders will pick the file up from disk when first used
+            highest = self.folders.get(folder)
+            if highest is not None and version > highest.get(key, 0):
+                highest[key] = version
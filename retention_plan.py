@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+DocuFlow - Retention Plan Module
+Serialized retention plans (JSONL) and the write-ahead journal used to apply them
+"""
+
+import os
+import json
+import threading
+from datetime import datetime
+
+
+def plan_actions(plan):
+    """
+    Flatten a retention plan into its actions, in the order they are applied
+
+    The order is fixed (legacy marker adoption, then per department:
+    partition drops, archives, deletions), so an action's index
+    identifies it in both the plan file and the journal.
+
+    Yields:
+        Action dictionaries with an 'op' of adopt, drop, archive or delete
+    """
+    if plan['markers']:
+        yield {'op': 'adopt', 'paths': sorted(plan['markers'])}
+
+    for dept in plan['departments']:
+        for folder in plan['drop'][dept]:
+            yield {'op': 'drop', 'department': dept, 'path': folder}
+        for file_name, file_path, mtime in plan['archive'][dept]:
+            yield {'op': 'archive', 'department': dept, 'name': file_name,
+                   'path': file_path, 'mtime': mtime}
+        for file_name, file_path, mtime in plan['delete'][dept]:
+            yield {'op': 'delete', 'department': dept, 'name': file_name,
+                   'path': file_path, 'mtime': mtime}
+
+
+def write_plan(plan, plan_path):
+    """
+    Save a plan as JSONL: a header line, then one line per action
+
+    Returns:
+        Number of actions written
+    """
+    header = {
+        'type': 'retention_plan',
+        'id': datetime.now().isoformat(),
+        'now': plan['now'].isoformat(),
+        'departments': plan['departments'],
+        'scanned': plan['scanned'],
+        'stat_calls': plan['io']['stat_calls']
+    }
+    count = 0
+
+    tmp_path = f"{plan_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(json.dumps(header) + "\n")
+        for action in plan_actions(plan):
+            f.write(json.dumps(action) + "\n")
+            count += 1
+    os.replace(tmp_path, plan_path)
+
+    plan['id'] = header['id']
+    return count
+
+
+def read_plan(plan_path):
+    """
+    Load a plan saved by write_plan
+
+    Returns:
+        Plan dictionary in the shape RetentionPolicy.scan() returns
+        (without the expiring list and report)
+    """
+    with open(plan_path, 'r') as f:
+        header = json.loads(f.readline())
+        if header.get('type') != 'retention_plan':
+            raise ValueError(f"Not a retention plan: {plan_path}")
+
+        departments = header['departments']
+        plan = {
+            'id': header['id'],
+            'now': datetime.fromisoformat(header['now']),
+            'departments': departments,
+            'scanned': header['scanned'],
+            'io': {'stat_calls': header['stat_calls']},
+            'archive': {dept: [] for dept in departments},
+            'delete': {dept: [] for dept in departments},
+            'drop': {dept: [] for dept in departments},
+            'markers': set()
+        }
+
+        for line in f:
+            action = json.loads(line)
+            if action['op'] == 'adopt':
+                plan['markers'].update(action['paths'])
+            elif action['op'] == 'drop':
+                plan['drop'][action['department']].append(action['path'])
+            else:
+                plan[action['op']][action['department']].append(
+                    (action['name'], action['path'], action['mtime']))
+
+    return plan
+
+
+class Journal:
+    """
+    Write-ahead log of a plan being applied
+
+    Each action is logged as begun (durably, before it touches any file)
+    and as done after it finished, so a crashed run can skip what was
+    done and repair the actions that were in flight. An action that
+    failed is logged as such but never as done, so a resumed run tries
+    it again. Safe to share between workers.
+    """
+
+    def __init__(self, journal_path, plan_id):
+        """
+        Open the journal for a plan, continuing it if it belongs to that plan
+
+        Args:
+            journal_path: JSONL journal file
+            plan_id: Plan the journal must belong to (anything else is discarded)
+        """
+        self.journal_path = journal_path
+        self.plan_id = plan_id
+        self.done = set()
+        self.failed = set()
+        self.pending = {}       # seq → begin record of actions in flight
+        self.complete = False
+        self.lock = threading.Lock()
+
+        records = _read_records(journal_path)
+        if records and records[0].get('plan') == plan_id:
+            for record in records[1:]:
+                if record.get('state') == 'begin':
+                    self.pending[record['seq']] = record
+                elif record.get('state') == 'done':
+                    self.done.add(record['seq'])
+                    self.failed.discard(record['seq'])
+                    self.pending.pop(record['seq'], None)
+                elif record.get('state') == 'failed':
+                    self.failed.add(record['seq'])
+                elif record.get('state') == 'complete':
+                    self.complete = True
+            self.file = open(journal_path, 'a')
+            if self.file.tell() and not _ends_with_newline(journal_path):
+                self.file.write("\n")     # after a torn last record
+        else:
+            self.file = open(journal_path, 'w')
+            self._write({'plan': plan_id, 'started': datetime.now().isoformat()}, sync=True)
+
+    @property
+    def resumed(self):
+        """True if an earlier run had already made progress"""
+        return bool(self.done or self.pending)
+
+    def begin(self, seq, **info):
+        """Record that an action is about to run (flushed to disk first)"""
+        with self.lock:
+            self._write(dict(info, seq=seq, state='begin'))
+        # Outside the lock, so workers on other devices are not held up
+        os.fsync(self.file.fileno())
+
+    def commit(self, seq):
+        """Record that an action finished"""
+        with self.lock:
+            self._write({'seq': seq, 'state': 'done'})
+            self.done.add(seq)
+            self.failed.discard(seq)
+            self.pending.pop(seq, None)
+
+    def fail(self, seq, error):
+        """Record that an action failed; it stays open for a resumed run to retry"""
+        with self.lock:
+            self._write({'seq': seq, 'state': 'failed', 'error': str(error)})
+            self.failed.add(seq)
+
+    def finish(self):
+        """Mark the whole plan as applied and close the journal"""
+        with self.lock:
+            self._write({'state': 'complete', 'finished': datetime.now().isoformat()}, sync=True)
+            self.complete = True
+        self.close()
+
+    def close(self):
+        """Close the journal file"""
+        if not self.file.closed:
+            self.file.close()
+
+    def _write(self, record, sync=False):
+        """Append one record (caller holds the lock, except in __init__)"""
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+        if sync:
+            os.fsync(self.file.fileno())
+
+
+def plan_status(plan_path):
+    """
+    State of a saved plan
+
+    Returns:
+        None if there is no plan, else 'ready' (never applied),
+        'interrupted' (applying stopped part way) or 'applied'
+    """
+    try:
+        with open(plan_path, 'r') as f:
+            plan_id = json.loads(f.readline()).get('id')
+    except (OSError, ValueError):
+        return None
+
+    journal = _read_records(f"{plan_path}.journal")
+    if not journal or journal[0].get('plan') != plan_id:
+        return 'ready'
+    if any(record.get('state') == 'complete' for record in journal):
+        return 'applied'
+    return 'interrupted'
+
+
+def _read_records(path):
+    """Parse a JSONL file, skipping torn lines; [] if missing"""
+    records = []
+
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        pass
+
+    return records
+
+
+def _ends_with_newline(path):
+    """True if a non-empty file's last byte is a newline"""
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
@@ -5,10 +5,18 @@ Automated document archiving and deletion based on age
 """
 
 import os
-import shutil
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
+from archive_layout import ArchiveLayout, scan_category, subfolder_of, unique_path
+from file_catalog import FileCatalog
+from file_ops import IOThrottle, move_file, remove_empty_dirs, remove_empty_parents, remove_file
+from file_scanner import scan_stats, walk_files
+from fulltext_index import FullTextIndex
+from retention_plan import Journal, plan_actions, plan_status, read_plan, write_plan
+from retention_rules import ExclusionMatcher, HoldRegistry, KEEP_SUFFIX
 
 
 class RetentionPolicy:
@@ -24,115 +32,566 @@ class RetentionPolicy:
         self.archive_days = self.policy['archive_after_days']
         self.delete_days = self.policy['delete_after_days']
         self.log_file = "retention_log.txt"
-
-    def enforce_retention(self, department=None, dry_run=False):
+        self.log_lock = threading.Lock()
+        self.catalog = FileCatalog.from_config(self.config)
+        self.fulltext = FullTextIndex.from_config(self.config)
+        self.layout = ArchiveLayout.from_config(self.config)
+        self.migration_batch = self.policy.get('archive_migration_batch', 1000)
+        self.exclusions = ExclusionMatcher.from_config(self.config)
+        self.excluded_folders = ExclusionMatcher.folders_from_config(self.config)
+        self.holds = HoldRegistry.from_config(self.config)
+        self.plan_file = self.policy.get('plan_file', "retention_plan.jsonl")
+        self.throttle = IOThrottle.from_config(self.config, 'retention')
+        self._held = set()
+
+    def enforce_retention(self, department=None, dry_run=False, plan=None):
         """
         Enforce retention policy across all or specific department
 
+        The plan from a fresh scan is saved to retention_policy.plan_file
+        (JSONL) before anything is touched. Live runs log every action to
+        a journal beside it, and a live run after an interrupted one
+        resumes the saved plan instead of scanning again.
+
         Args:
             department: Specific department or None for all
             dry_run: If True, only report what would be done
+            plan: Result of scan(), or the path of a saved plan file,
+                  to apply instead of scanning again
 
         Returns:
             Dictionary with enforcement statistics
         """
+        plan_path = self.plan_file
+        self.throttle.reset()
+
+        if plan is None and plan_status(self.plan_file) == 'interrupted':
+            if dry_run:
+                print("⚠️  An interrupted retention run is pending; "
+                      "the next live run resumes it")
+            else:
+                print("↩️  Resuming interrupted retention run")
+                plan = self.plan_file
+
+        if isinstance(plan, str):
+            plan_path = plan
+            plan = read_plan(plan_path)
+        else:
+            if plan is None:
+                if not dry_run:
+                    self.migrate_archive(department)
+                plan = self.scan(department)
+            if not (dry_run and plan_status(plan_path) == 'interrupted'):
+                write_plan(plan, plan_path)
+
+        journal = None if dry_run else Journal(f"{plan_path}.journal", plan['id'])
+        try:
+            stats = self._apply_plan(plan, dry_run, journal)
+        finally:
+            if journal:
+                journal.close()
+
+        stats['io'] = self.throttle.throughput()
+        self._log_enforcement(stats, dry_run)
+
+        return stats
+
+    def run_maintenance(self, days_until_deletion=7, dry_run=False):
+        """
+        Daily maintenance from a single pass over the department folders
+
+        An interrupted live run is finished first, in place of the scan.
+
+        Args:
+            days_until_deletion: Warning window for the expiring list
+            dry_run: If True, only report what would be done
+
+        Returns:
+            Dictionary with 'stats', 'expiring' and 'report'
+        """
+        if not dry_run and plan_status(self.plan_file) == 'interrupted':
+            stats = self.enforce_retention()
+            return {
+                'stats': stats,
+                'expiring': self.get_expiring_soon(days_until_deletion),
+                'report': self.get_retention_report()
+            }
+
+        if not dry_run:
+            self.migrate_archive()
+        plan = self.scan(days_until_deletion=days_until_deletion)
+        stats = self.enforce_retention(dry_run=dry_run, plan=plan)
+
+        return {
+            'stats': stats,
+            'expiring': plan['expiring'],
+            'report': plan['report']
+        }
+
+    def saved_plan(self):
+        """
+        State of the saved plan: None, 'ready' (from a dry run, not yet
+        applied), 'interrupted' or 'applied'
+        """
+        return plan_status(self.plan_file)
+
+    def scan(self, department=None, days_until_deletion=7):
+        """
+        Walk the department folders once and classify every file,
+        project subfolders included (exclusions.folders are skipped)
+
+        Args:
+            department: Specific department or None for all
+            days_until_deletion: Warning window for the expiring list
+
+        Archive partitions (Archive/YYYY/MM) whose whole month is past
+        delete_after_days are planned for dropping as a unit; their files
+        are not stat'ed or counted in the report. Held files (see
+        mark_for_retention) are never planned for deletion.
+
+        Returns:
+            Dictionary with the archive plan, delete plan, partitions to
+            drop, expiring files and report aggregates, all taken from
+            the same pass
+        """
         departments = [department] if department else self.config['folder_structure']['departments']
 
+        now = datetime.now()
+        archive_threshold = now - timedelta(days=self.archive_days)
+        delete_threshold = now - timedelta(days=self.delete_days)
+        warning_threshold = now - timedelta(days=self.delete_days - days_until_deletion)
+        io_before = scan_stats.snapshot()
+
+        plan = {
+            'now': now,
+            'departments': departments,
+            'scanned': 0,
+            'archive': {},
+            'delete': {},
+            'drop': {},
+            'markers': set(),
+            'expiring': [],
+            'report': self._new_report(now)
+        }
+
+        # Holds are read once; legacy .keep markers found below are added
+        self._held = self.holds.paths()
+        unheld_expiring = {}
+
+        for dept in departments:
+            plan['archive'][dept] = []
+            plan['delete'][dept] = []
+            # Partitions left holding only held or excluded files are not
+            # planned again; their files are checked one by one below
+            plan['drop'][dept] = [folder for folder
+                                  in self.layout.expired_partitions(dept, delete_threshold)
+                                  if self._partition_contents(folder)[2]]
+            dropped = {os.path.abspath(folder) for folder in plan['drop'][dept]}
+            dept_stats = self._new_dept_stats()
+            expiring_paths = []
+
+            for category in ['Working', 'Archive', 'Final']:
+                cat_key = category.lower()
+
+                if self.catalog:
+                    # Files saved straight into the folders are planned too
+                    self.catalog.refresh(self.base_path, dept, category,
+                                         self.excluded_folders, dropped)
+
+                for file_name, file_path, file_size, mtime in self._iter_files(
+                        dept, category, skip_folders=dropped):
+                    if file_name.endswith(KEEP_SUFFIX):
+                        plan['markers'].add(os.path.abspath(file_path[:-len(KEEP_SUFFIX)]))
+                        continue
+
+                    file_mtime = datetime.fromtimestamp(mtime)
+                    file_age = (now - file_mtime).days
+
+                    plan['scanned'] += 1
+                    dept_stats[cat_key]['count'] += 1
+                    dept_stats[cat_key]['total_size'] += file_size
+
+                    if category == 'Working':
+                        # Check if file should be archived
+                        if file_age > self.archive_days:
+                            dept_stats[cat_key]['old_files'] += 1
+
+                        if file_mtime < archive_threshold and not self._is_excluded(file_name):
+                            plan['archive'][dept].append((file_name, file_path, mtime))
+
+                    elif category == 'Archive':
+                        # Check if file will expire soon (counted once holds are known)
+                        if file_age > (self.delete_days - 7):
+                            expiring_paths.append(os.path.abspath(file_path))
+
+                        if file_mtime < delete_threshold:
+                            if not self._is_excluded(file_name):
+                                plan['delete'][dept].append((file_name, file_path, mtime))
+
+                        # Check if file is in warning window
+                        elif file_mtime < warning_threshold:
+                            plan['expiring'].append({
+                                'path': file_path,
+                                'name': file_name,
+                                'department': dept,
+                                'modified': file_mtime,
+                                'days_until_deletion': (file_mtime - delete_threshold).days
+                            })
+
+            plan['report']['departments'][dept] = dept_stats
+            unheld_expiring[dept] = expiring_paths
+
+        self._held |= plan['markers']
+        for dept, paths in unheld_expiring.items():
+            plan['report']['departments'][dept]['archive']['expiring'] = sum(
+                path not in self._held for path in paths)
+        for dept in departments:
+            plan['delete'][dept] = [candidate for candidate in plan['delete'][dept]
+                                    if os.path.abspath(candidate[1]) not in self._held]
+        plan['expiring'] = [info for info in plan['expiring']
+                            if os.path.abspath(info['path']) not in self._held]
+
+        plan['expiring'].sort(key=lambda x: x['days_until_deletion'])
+        plan['io'] = scan_stats.since(io_before)
+
+        return plan
+
+    def _apply_plan(self, plan, dry_run, journal=None):
+        """
+        Carry out a plan's actions
+
+        Departments on different filesystems (by st_dev) are worked on in
+        parallel, one worker per device; each department's actions still
+        run in plan order, so its log lines stay in order too.
+
+        With a journal, each action is logged before it touches anything
+        and again when it is done. Actions a previous run finished are
+        skipped; an archive move that was in flight is completed from the
+        destination it recorded. Failed actions are never logged as done,
+        so resuming an interrupted run retries them (and the next scan
+        plans them again once a run completes).
+
+        Returns:
+            Dictionary with enforcement statistics
+        """
         stats = {
             'archived': 0,
             'deleted': 0,
-            'scanned': 0,
-            'errors': 0
+            'scanned': plan['scanned'],
+            'errors': 0,
+            'stat_calls': plan['io']['stat_calls'],
+            'resumed': 0,
+            'devices': 0
         }
 
-        now = datetime.now()
+        now = plan['now']
+
+        # Holds placed since the plan was made are honored too
+        self._held = self.holds.paths() | plan['markers']
+
+        actions = {dept: [] for dept in plan['departments']}
+        for seq, action in enumerate(plan_actions(plan)):
+            if journal and seq in journal.done:
+                stats['resumed'] += 1
+            elif action['op'] == 'adopt':
+                # Holds must be in place before any department is touched
+                self._apply_action(seq, action, now, dry_run, journal, stats)
+            else:
+                actions[action['department']].append((seq, action))
+
+        def run(departments):
+            counts = {'archived': 0, 'deleted': 0, 'errors': 0}
+            for dept in departments:
+                for seq, action in actions[dept]:
+                    self._apply_action(seq, action, now, dry_run, journal, counts)
+            return counts
+
+        groups = self._device_groups([dept for dept in plan['departments'] if actions[dept]])
+        stats['devices'] = len(groups)
+
+        if len(groups) > 1:
+            with ThreadPoolExecutor(max_workers=len(groups)) as pool:
+                results = list(pool.map(run, groups))
+        else:
+            results = [run(departments) for departments in groups]
 
-        for dept in departments:
-            # Archive old files from Working
-            working_folder = os.path.join(self.base_path, dept, "Working")
-            if os.path.exists(working_folder):
-                archived = self._archive_old_files(working_folder, dept, now, dry_run)
-                stats['archived'] += archived
-
-            # Delete expired files from Archive
-            archive_folder = os.path.join(self.base_path, dept, "Archive")
-            if os.path.exists(archive_folder):
-                deleted = self._delete_expired_files(archive_folder, now, dry_run)
-                stats['deleted'] += deleted
+        # Each worker counted on its own; merge once they are done
+        for counts in results:
+            for key, value in counts.items():
+                stats[key] += value
 
-        self._log_enforcement(stats, dry_run)
+        if journal:
+            journal.finish()
 
         return stats
 
-    def _archive_old_files(self, working_folder, department, now, dry_run):
-        """Move files older than archive_days to Archive"""
-        archive_folder = os.path.join(self.base_path, department, "Archive")
-        os.makedirs(archive_folder, exist_ok=True)
+    def _apply_action(self, seq, action, now, dry_run, journal, counts):
+        """Carry out one plan action, adding to counts (archived, deleted, errors)"""
+        try:
+            if action['op'] == 'adopt':
+                if not dry_run:
+                    journal.begin(seq)
+                    targets = [path for path in action['paths'] if os.path.exists(path)]
+                    self.holds.adopt_markers(targets)
+                    if self.catalog:
+                        for target in targets:
+                            self.catalog.remove_file(f"{target}{KEEP_SUFFIX}")
+
+            elif action['op'] == 'drop':
+                # Drop a whole archive partition past retention
+                if journal:
+                    journal.begin(seq)
+                counts['deleted'] += self._drop_partitions([action['path']],
+                                                           action['department'], dry_run)
+
+            elif action['op'] == 'archive':
+                counts['archived'] += self._archive_file(
+                    action, now, dry_run, journal, seq,
+                    journal.pending.get(seq) if journal else None)
+
+            else:
+                counts['deleted'] += self._delete_file(action, now, dry_run, journal, seq)
+
+        except OSError as e:
+            counts['errors'] += 1
+            self._log(f"Error ({action['op']}): {action.get('path')}: {e}")
+            print(f"  ❌ Could not {action['op']} {action.get('path')}: {e}")
+            if journal:
+                journal.fail(seq, e)
+            return
+
+        if journal:
+            journal.commit(seq)
+
+    def _device_groups(self, departments):
+        """
+        Group departments by the filesystem their folder is on
 
-        archived_count = 0
-        archive_threshold = now - timedelta(days=self.archive_days)
+        Returns:
+            List of department lists, one per device (st_dev), in plan order
+        """
+        groups = {}
 
-        for file_name in os.listdir(working_folder):
-            file_path = os.path.join(working_folder, file_name)
+        for dept in departments:
+            try:
+                device = os.stat(os.path.join(self.base_path, dept)).st_dev
+            except OSError:
+                device = None
+            groups.setdefault(device, []).append(dept)
 
-            if not os.path.isfile(file_path):
-                continue
+        return list(groups.values())
 
-            # Check if excluded
-            if self._is_excluded(file_name):
-                continue
+    def _archive_file(self, action, now, dry_run, journal=None, seq=None, recovered=None):
+        """
+        Move a planned file older than archive_days to Archive (or its month partition)
 
-            # Get file modification time
-            file_mtime = datetime.fromtimestamp(os.path.getmtime(file_path))
+        Args:
+            action: Archive action from the plan
+            recovered: Journal record of this move if an interrupted run began it
 
-            if file_mtime < archive_threshold:
-                dest_path = os.path.join(archive_folder, file_name)
+        Returns:
+            1 if the file was (or would be) archived, else 0
+        """
+        file_path = action['path']
+        department = action['department']
 
-                if dry_run:
-                    print(f"  [DRY RUN] Would archive: {file_path}")
-                else:
-                    # Handle duplicate names in archive
-                    if os.path.exists(dest_path):
-                        base, ext = os.path.splitext(file_name)
-                        dest_path = os.path.join(archive_folder, f"{base}_archived_{now.strftime('%Y%m%d')}{ext}")
+        if (recovered and recovered.get('dest') and not os.path.exists(file_path)
+                and os.path.exists(recovered['dest'])):
+            # Moved before the interruption; only the bookkeeping is left
+            dest_path = recovered['dest']
+        else:
+            archive_threshold = now - timedelta(days=self.archive_days)
+            if not self._verify_candidate(file_path, department, "Working", archive_threshold):
+                return 0
+
+            if dry_run:
+                print(f"  [DRY RUN] Would archive: {file_path}")
+                return 1
+
+            # Project subfolders under Working are kept inside the archive
+            working_root = os.path.join(self.base_path, department, "Working")
+            archive_folder = self.layout.folder_for(department, action['mtime'],
+                                                    subfolder_of(file_path, working_root))
+            os.makedirs(archive_folder, exist_ok=True)
+
+            # Handle duplicate names in archive
+            dest_path = unique_path(archive_folder, action['name'],
+                                    f"_archived_{now.strftime('%Y%m%d')}")
+
+            if journal:
+                journal.begin(seq, dest=dest_path)
+            move_file(file_path, dest_path, self.throttle)
+
+        if os.path.abspath(file_path) in self._held:
+            self.holds.move(file_path, dest_path)
+        if self.catalog:
+            self.catalog.move_file(file_path, dest_path, department, "Archive")
+        if self.fulltext:
+            self.fulltext.move_file(file_path, dest_path, department, "Archive")
+        self._log(f"Archived: {file_path} → {dest_path}")
+        print(f"  📦 Archived: {action['name']}")
+
+        return 1
+
+    def _delete_file(self, action, now, dry_run, journal=None, seq=None):
+        """
+        Delete a planned file older than delete_days from Archive
 
-                    shutil.move(file_path, dest_path)
-                    self._log(f"Archived: {file_path} → {dest_path}")
-                    print(f"  📦 Archived: {file_name}")
+        Returns:
+            1 if the file was (or would be) deleted, else 0
+        """
+        file_path = action['path']
+        delete_threshold = now - timedelta(days=self.delete_days)
 
-                archived_count += 1
+        if not self._verify_candidate(file_path, action['department'], "Archive", delete_threshold):
+            return 0
+        if os.path.abspath(file_path) in self._held:
+            return 0
+
+        if dry_run:
+            print(f"  [DRY RUN] Would delete: {file_path}")
+            return 1
+
+        if journal:
+            journal.begin(seq)
+        remove_file(file_path, self.throttle)
+        remove_empty_parents(os.path.dirname(file_path), self.layout.root(action['department']),
+                             self.throttle)
+        if self.catalog:
+            self.catalog.remove_file(file_path)
+        if self.fulltext:
+            self.fulltext.remove_file(file_path)
+        self._log(f"Deleted (retention expired): {file_path}")
+        print(f"  🗑️  Deleted: {action['name']}")
+
+        return 1
+
+    def _drop_partitions(self, partitions, department, dry_run):
+        """
+        Delete archive partitions that are entirely past retention
 
-        return archived_count
+        Files (including those in project subfolders) are removed by path
+        from the listing, without a stat each; excluded files, files in
+        excluded folders and held files are left in place.
 
-    def _delete_expired_files(self, archive_folder, now, dry_run):
-        """Delete files older than delete_days from Archive"""
+        Returns:
+            Number of files deleted
+        """
         deleted_count = 0
-        delete_threshold = now - timedelta(days=self.delete_days)
 
-        for file_name in os.listdir(archive_folder):
-            file_path = os.path.join(archive_folder, file_name)
-
-            if not os.path.isfile(file_path):
+        for folder in partitions:
+            names, markers, doomed = self._partition_contents(folder)
+
+            # Legacy markers hold their file; convert them on a live run
+            if markers and not dry_run:
+                self.holds.adopt_markers([os.path.join(folder, name[:-len(KEEP_SUFFIX)])
+                                          for name in markers])
+                self._held.update(os.path.abspath(os.path.join(folder, name[:-len(KEEP_SUFFIX)]))
+                                  for name in markers)
+                names = [name for name in names if name not in markers]
+                if self.catalog:
+                    for name in markers:
+                        self.catalog.remove_file(os.path.join(folder, name))
+
+            label = os.path.relpath(folder, self.base_path)
+            if not doomed:
+                continue    # only excluded or held files left
+
+            if dry_run:
+                print(f"  [DRY RUN] Would drop partition: {label} ({len(doomed)} files)")
+                deleted_count += len(doomed)
                 continue
 
-            # Check if excluded
-            if self._is_excluded(file_name):
-                continue
+            for name in doomed:
+                try:
+                    remove_file(os.path.join(folder, name), self.throttle)
+                except FileNotFoundError:
+                    continue
+                deleted_count += 1
+                if self.fulltext:
+                    self.fulltext.remove_file(os.path.join(folder, name))
+
+            # Remove the emptied folders, the month (and year) included
+            if remove_empty_dirs(folder, self.throttle):
+                try:
+                    os.rmdir(os.path.dirname(folder))
+                except OSError:
+                    pass
+
+            if self.catalog:
+                self.catalog.remove_folder(folder)
+                for name in names:
+                    # Files in excluded folders are not catalogued in the first place
+                    if name not in doomed and not self._in_excluded_folder(name):
+                        self.catalog.add_file(os.path.join(folder, name), department, "Archive")
+
+            self._log(f"Dropped partition (retention expired): {folder} ({len(doomed)} files)")
+            print(f"  🗑️  Dropped partition: {label} ({len(doomed)} files)")
 
-            # Get file modification time
-            file_mtime = datetime.fromtimestamp(os.path.getmtime(file_path))
+        return deleted_count
 
-            if file_mtime < delete_threshold:
-                if dry_run:
-                    print(f"  [DRY RUN] Would delete: {file_path}")
-                else:
-                    os.remove(file_path)
-                    self._log(f"Deleted (retention expired): {file_path}")
-                    print(f"  🗑️  Deleted: {file_name}")
+    def _partition_contents(self, folder):
+        """
+        List an archive partition by name, without a stat per file
 
-                deleted_count += 1
+        Returns:
+            (relative paths of its files, legacy .keep markers among them,
+            files to delete: neither excluded, held nor marked)
+        """
+        names = [os.path.relpath(entry.path, folder) for entry in walk_files(folder)]
+        present = set(names)
+        markers = {name for name in names
+                   if name.endswith(KEEP_SUFFIX) and name[:-len(KEEP_SUFFIX)] in present}
 
-        return deleted_count
+        doomed = [name for name in names
+                  if not (self._is_excluded(os.path.basename(name))
+                          or self._in_excluded_folder(name)
+                          or os.path.abspath(os.path.join(folder, name)) in self._held
+                          or f"{name}{KEEP_SUFFIX}" in markers
+                          or name in markers)]
+
+        return names, markers, doomed
+
+    def migrate_archive(self, department=None, limit=None):
+        """
+        Move flat archive files into Archive/YYYY/MM partitions
+
+        Runs in batches (retention_policy.archive_migration_batch files per
+        department by default) as part of live enforcement, so a large flat
+        archive converts gradually while staying in use.
+
+        Args:
+            department: Specific department or None for all
+            limit: Max files per department (default: the configured batch)
+
+        Returns:
+            Number of files moved
+        """
+        if not self.layout.partitioned:
+            return 0
+
+        departments = [department] if department else self.config['folder_structure']['departments']
+        limit = self.migration_batch if limit is None else limit
+        moved = 0
+
+        held = self.holds.paths()
+
+        for dept in departments:
+            def record(old_path, new_path, dept=dept):
+                if os.path.abspath(old_path) in held:
+                    self.holds.move(old_path, new_path)
+                if self.catalog:
+                    self.catalog.move_file(old_path, new_path, dept, "Archive")
+                if self.fulltext:
+                    self.fulltext.move_file(old_path, new_path, dept, "Archive")
+                self._log(f"Partitioned: {old_path} → {new_path}")
+
+            moved += self.layout.migrate(dept, limit, record, self.throttle)
+
+        if moved:
+            print(f"  🗂️  Moved {moved} archived file(s) into date partitions")
+
+        return moved
 
     def get_expiring_soon(self, days_until_deletion=7, department=None):
         """
@@ -145,37 +604,44 @@ class RetentionPolicy:
         Returns:
             List of files nearing deletion
         """
-        departments = [department] if department else self.config['folder_structure']['departments']
+        if not self.catalog:
+            return self.scan(department, days_until_deletion)['expiring']
 
         expiring_files = []
         now = datetime.now()
         warning_threshold = now - timedelta(days=self.delete_days - days_until_deletion)
         delete_threshold = now - timedelta(days=self.delete_days)
 
-        for dept in departments:
-            archive_folder = os.path.join(self.base_path, dept, "Archive")
+        # Only the day buckets of the expiry index spanning the window are read;
+        # the exact mtime check trims the partial days at either end
+        rows = self.catalog.get_expiring(now.date(), warning_threshold.date()
+                                         + timedelta(days=self.delete_days),
+                                         [department] if department else None)
 
-            if not os.path.exists(archive_folder):
-                continue
+        held = self.holds.paths()
 
-            for file_name in os.listdir(archive_folder):
-                file_path = os.path.join(archive_folder, file_name)
+        for row in rows:
+            if row['path'] in held or row['name'].endswith(KEEP_SUFFIX):
+                continue
+            # A legacy .keep marker beside the file holds it just as well
+            if self.catalog.get_file(f"{row['path']}{KEEP_SUFFIX}") is not None:
+                continue
 
-                if not os.path.isfile(file_path):
-                    continue
+            archive_root = os.path.join(os.path.abspath(self.layout.root(row['department'])), '')
+            if (row['path'].startswith(archive_root)
+                    and self._in_excluded_folder(row['path'][len(archive_root):])):
+                continue
 
-                file_mtime = datetime.fromtimestamp(os.path.getmtime(file_path))
+            file_mtime = datetime.fromtimestamp(row['mtime_ns'] / 1e9)
 
-                # Check if file is in warning window
-                if warning_threshold <= file_mtime < delete_threshold:
-                    days_until = (file_mtime - delete_threshold).days
-                    expiring_files.append({
-                        'path': file_path,
-                        'name': file_name,
-                        'department': dept,
-                        'modified': file_mtime,
-                        'days_until_deletion': abs(days_until)
-                    })
+            if delete_threshold <= file_mtime < warning_threshold:
+                expiring_files.append({
+                    'path': row['path'],
+                    'name': row['name'],
+                    'department': row['department'],
+                    'modified': file_mtime,
+                    'days_until_deletion': (file_mtime - delete_threshold).days
+                })
 
         return sorted(expiring_files, key=lambda x: x['days_until_deletion'])
 
@@ -186,26 +652,37 @@ class RetentionPolicy:
         Args:
             file_path: Path to file to keep
 
-        Note: This creates a .keep marker file
+        Note: The hold is recorded in the hold registry
+              (retention_policy.holds_file) and follows the file when
+              retention archives it
         """
         if not os.path.exists(file_path):
             print(f"❌ File not found: {file_path}")
             return False
 
-        keep_marker = f"{file_path}.keep"
-
-        with open(keep_marker, 'w') as f:
-            f.write(json.dumps({
-                'marked_by': os.getenv('USER', 'unknown'),
-                'marked_at': datetime.now().isoformat(),
-                'reason': 'Manual retention'
-            }, indent=2))
+        self.holds.add(file_path)
 
         self._log(f"Marked for retention: {file_path}")
         print(f"✅ Marked for retention: {os.path.basename(file_path)}")
 
         return True
 
+    def release_retention(self, file_path):
+        """
+        Remove a file's retention hold, so normal deletion applies again
+
+        Returns:
+            True if the file was held
+        """
+        if not self.holds.remove(file_path):
+            print(f"⚠️  No retention hold on: {file_path}")
+            return False
+
+        self._log(f"Released retention hold: {file_path}")
+        print(f"✅ Released retention hold: {os.path.basename(file_path)}")
+
+        return True
+
     def get_retention_report(self, department=None):
         """
         Generate retention policy compliance report
@@ -216,10 +693,24 @@ class RetentionPolicy:
         Returns:
             Dictionary with report data
         """
+        if not self.catalog:
+            return self.scan(department)['report']
+
         departments = [department] if department else self.config['folder_structure']['departments']
+        now = datetime.now()
+        report = self._new_report(now)
+
+        for dept in departments:
+            dept_stats = self._new_dept_stats()
+            self._report_from_catalog(dept, dept_stats, now)
+            report['departments'][dept] = dept_stats
 
-        report = {
-            'generated_at': datetime.now().isoformat(),
+        return report
+
+    def _new_report(self, now):
+        """Empty retention report skeleton"""
+        return {
+            'generated_at': now.isoformat(),
             'policy': {
                 'archive_after_days': self.archive_days,
                 'delete_after_days': self.delete_days
@@ -227,68 +718,129 @@ class RetentionPolicy:
             'departments': {}
         }
 
-        now = datetime.now()
+    def _new_dept_stats(self):
+        """Empty per-department report counters"""
+        return {
+            'working': {'count': 0, 'total_size': 0, 'old_files': 0},
+            'archive': {'count': 0, 'total_size': 0, 'expiring': 0},
+            'final': {'count': 0, 'total_size': 0}
+        }
 
-        for dept in departments:
-            dept_stats = {
-                'working': {'count': 0, 'total_size': 0, 'old_files': 0},
-                'archive': {'count': 0, 'total_size': 0, 'expiring': 0},
-                'final': {'count': 0, 'total_size': 0}
-            }
+    def _report_from_catalog(self, department, dept_stats, now):
+        """Fill report counters from catalog aggregates"""
+        by_category = self.catalog.get_stats(department, now, self.archive_days, self.delete_days)
 
-            # Scan each category
-            for category in ['Working', 'Archive', 'Final']:
-                folder = os.path.join(self.base_path, dept, category)
-                if not os.path.exists(folder):
-                    continue
+        for category, cat_key in [('Working', 'working'), ('Archive', 'archive'), ('Final', 'final')]:
+            row = by_category.get(category)
+            if row is None:
+                continue
 
-                cat_key = category.lower()
+            dept_stats[cat_key]['count'] = row['count']
+            dept_stats[cat_key]['total_size'] = row['total_size']
 
-                for file_name in os.listdir(folder):
-                    file_path = os.path.join(folder, file_name)
+            if cat_key == 'working':
+                dept_stats[cat_key]['old_files'] = row['old_files']
+            elif cat_key == 'archive' and row['expiring']:
+                dept_stats[cat_key]['expiring'] = self._count_expiring(department, now)
 
-                    if not os.path.isfile(file_path):
-                        continue
+    def _count_expiring(self, department, now):
+        """
+        Count archived files within a week of deletion (or past it) from the catalog
 
-                    file_size = os.path.getsize(file_path)
-                    file_age = (now - datetime.fromtimestamp(os.path.getmtime(file_path))).days
+        Files covered by a hold or a legacy .keep marker, the markers
+        themselves and files in excluded folders are not counted. Only
+        the files past the cutoff are read, not the whole archive.
+        """
+        held = self.holds.paths()
+        cutoff = now - timedelta(days=self.delete_days - 7)
+        count = 0
 
-                    dept_stats[cat_key]['count'] += 1
-                    dept_stats[cat_key]['total_size'] += file_size
+        for name, path, _, _ in self._iter_files(department, 'Archive', modified_before=cutoff):
+            if name.endswith(KEEP_SUFFIX) or path in held:
+                continue
+            if self.catalog.get_file(f"{path}{KEEP_SUFFIX}") is not None:
+                continue
+            count += 1
 
-                    # Check if file should be archived
-                    if category == 'Working' and file_age > self.archive_days:
-                        dept_stats[cat_key]['old_files'] += 1
+        return count
 
-                    # Check if file will expire soon
-                    if category == 'Archive' and file_age > (self.delete_days - 7):
-                        dept_stats[cat_key]['expiring'] += 1
+    def _iter_files(self, department, category, modified_before=None, modified_after=None,
+                    skip_folders=()):
+        """
+        Yield (name, path, size, mtime) for files in a department folder
 
-            report['departments'][dept] = dept_stats
+        Answers from the file catalog when enabled, otherwise walks the
+        disk (project subfolders and archive partitions included). Files
+        in exclusions.folders are left out either way. The modified_*
+        bounds are only a prefilter; callers still compare mtimes. Files
+        under skip_folders (absolute paths) are left out.
+        """
+        if self.catalog:
+            root = os.path.join(os.path.abspath(os.path.join(self.base_path, department, category)), '')
+            skipped = tuple(os.path.join(folder, '') for folder in skip_folders)
+
+            for row in self.catalog.get_files(department, category,
+                                              modified_before, modified_after):
+                path = row['path']
+                if skipped and path.startswith(skipped):
+                    continue
+                if path.startswith(root) and self._in_excluded_folder(path[len(root):]):
+                    continue
+                yield row['name'], path, row['size'], row['mtime_ns'] / 1e9
+            return
 
-        return report
+        for entry in scan_category(self.base_path, department, category,
+                                   self.excluded_folders, skip_folders):
+            yield entry.name, entry.path, entry.size, entry.mtime
 
-    def _is_excluded(self, filename):
-        """Check if file should be excluded from retention"""
-        exclusions = self.config.get('exclusions', {}).get('files', [])
+    def _in_excluded_folder(self, relative_path):
+        """True if a path (relative to its category folder) runs through an excluded folder"""
+        return any(self.excluded_folders(part)
+                   for part in relative_path.split(os.sep)[:-1])
 
-        for pattern in exclusions:
-            if filename == pattern or filename.endswith(pattern):
-                return True
+    def _verify_candidate(self, file_path, department, category, threshold):
+        """
+        Re-check a planned candidate against the disk before acting on it
 
-        # Check for .keep marker
-        return False
+        The catalog, and a plan saved earlier, can lag behind edits made
+        outside DocuFlow, so a file is only archived or deleted if it still
+        exists and is still old enough.
+        """
+        try:
+            mtime = os.path.getmtime(file_path)
+        except OSError:
+            if self.catalog:
+                self.catalog.remove_file(file_path)
+            if self.fulltext:
+                self.fulltext.remove_file(file_path)
+            return False
+
+        if datetime.fromtimestamp(mtime) >= threshold:
+            if self.catalog:
+                self.catalog.add_file(file_path, department, category)
+            return False
+
+        return True
+
+    def _is_excluded(self, filename):
+        """Check if file should be excluded from retention"""
+        return self.exclusions(filename)
 
     def _log(self, message):
-        """Write to retention log"""
-        with open(self.log_file, 'a') as log:
-            timestamp = datetime.now().isoformat()
-            log.write(f"{timestamp} | {message}\n")
+        """Write to retention log (one whole line at a time, safe across workers)"""
+        line = f"{datetime.now().isoformat()} | {message}\n"
+        with self.log_lock, open(self.log_file, 'a') as log:
+            log.write(line)
 
     def _log_enforcement(self, stats, dry_run):
         """Log retention enforcement run"""
         mode = "DRY RUN" if dry_run else "ENFORCED"
-        message = f"Retention {mode}: Archived={stats['archived']}, Deleted={stats['deleted']}"
+        message = (f"Retention {mode}: Archived={stats['archived']}, Deleted={stats['deleted']}, "
+                   f"Scanned={stats['scanned']}, StatCalls={stats['stat_calls']}")
+        if not dry_run:
+            message += (f", MBps={stats['io']['mb_per_sec']:.1f}, "
+                        f"OpsPerSec={stats['io']['ops_per_sec']:.1f}, "
+                        f"Throttled={stats['io']['throttled_seconds']:.1f}s")
         self._log(message)
 
 
@@ -310,8 +862,9 @@ def main():
     print("3. Find files expiring soon")
     print("4. Mark file for retention")
     print("5. Generate retention report")
+    print("6. Release retention hold")
 
-    choice = input("\nEnter choice (1-5): ").strip()
+    choice = input("\nEnter choice (1-6): ").strip()
 
     if choice == "1":
         print("\n🔍 Running dry run...")
@@ -321,8 +874,14 @@ def main():
     elif choice == "2":
         confirm = input("\n⚠️  This will archive and delete files. Continue? (yes/no): ").strip().lower()
         if confirm == 'yes':
-            stats = rp.enforce_retention(dry_run=False)
+            plan = None
+            if rp.saved_plan() == 'ready':
+                reuse = input("Apply the plan from the last dry run instead of rescanning? (y/n): ")
+                if reuse.strip().lower() == 'y':
+                    plan = rp.plan_file
+            stats = rp.enforce_retention(dry_run=False, plan=plan)
             print(f"\n✅ Archived {stats['archived']} and deleted {stats['deleted']} files")
+            print(f"   {rp.throttle.describe()}")
         else:
             print("Cancelled")
 
@@ -356,6 +915,10 @@ def main():
             print(f"    - {stats['archive']['expiring']} expiring soon")
             print(f"  Final: {stats['final']['count']} files ({stats['final']['total_size']:,} bytes)")
 
+    elif choice == "6":
+        file_path = input("File path: ").strip()
+        rp.release_retention(file_path)
+
 
 if __name__ == "__main__":
     main()
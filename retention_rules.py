@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+DocuFlow - Retention Rules Module
+Compiled file and folder exclusion patterns and the registry of retention holds
+"""
+
+import os
+import re
+import json
+import fnmatch
+import threading
+from datetime import datetime
+
+
+# Suffix of the per-file hold markers written by older versions
+KEEP_SUFFIX = ".keep"
+
+GLOB_CHARS = re.compile(r'[*?\[]')
+
+
+class ExclusionMatcher:
+    """File or folder name exclusion patterns compiled into a single regex"""
+
+    def __init__(self, patterns, suffixes=True):
+        """
+        Args:
+            patterns: Filenames or suffixes (".DS_Store", "Thumbs.db") and
+                      glob patterns ("~$*", "*.tmp", "draft_??.docx")
+            suffixes: Let plain entries match the end of a name; off for
+                      folder names, which must match whole
+        """
+        self.patterns = list(patterns)
+        parts = []
+
+        for pattern in self.patterns:
+            if GLOB_CHARS.search(pattern):
+                # fnmatch.translate yields "(?s:...)\Z"; keep the group only
+                parts.append(fnmatch.translate(pattern)[:-2])
+            else:
+                # Plain entries match the whole name (or its ending)
+                parts.append((".*" if suffixes else "") + re.escape(pattern))
+
+        self.regex = re.compile("|".join(parts), re.DOTALL) if parts else None
+
+    @classmethod
+    def from_config(cls, config):
+        """Matcher for config['exclusions']['files']"""
+        return cls(config.get('exclusions', {}).get('files', []))
+
+    @classmethod
+    def folders_from_config(cls, config):
+        """Matcher for config['exclusions']['folders'] (whole folder names or globs)"""
+        return cls(config.get('exclusions', {}).get('folders', []), suffixes=False)
+
+    def __call__(self, name):
+        """True if a name is excluded"""
+        return self.regex is not None and self.regex.fullmatch(name) is not None
+
+
+class HoldRegistry:
+    """
+    Files exempt from deletion, kept in one JSON file
+
+    Holds are keyed by absolute path and follow files that DocuFlow
+    moves; paths() gives a set for O(1) checks during a scan.
+    """
+
+    def __init__(self, registry_path="docuflow_holds.json"):
+        """
+        Args:
+            registry_path: JSON file mapping held paths to who/when/why
+        """
+        self.registry_path = registry_path
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """Registry at config['retention_policy']['holds_file']"""
+        return cls(config.get('retention_policy', {}).get('holds_file', "docuflow_holds.json"))
+
+    def load(self):
+        """Read the registry: {absolute path: hold info}"""
+        try:
+            with open(self.registry_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def paths(self):
+        """Set of held absolute paths, for membership checks during one scan"""
+        return set(self.load())
+
+    def add(self, file_path, reason="Manual retention"):
+        """Place a hold on a file"""
+        with self.lock:
+            holds = self.load()
+            holds[os.path.abspath(file_path)] = {
+                'marked_by': os.getenv('USER', 'unknown'),
+                'marked_at': datetime.now().isoformat(),
+                'reason': reason
+            }
+            self._save(holds)
+
+    def remove(self, file_path):
+        """
+        Release the hold on a file
+
+        Returns:
+            True if the file was held
+        """
+        with self.lock:
+            holds = self.load()
+            if holds.pop(os.path.abspath(file_path), None) is None:
+                return False
+            self._save(holds)
+            return True
+
+    def move(self, old_path, new_path):
+        """Carry a hold over to a file's new location"""
+        with self.lock:
+            holds = self.load()
+            info = holds.pop(os.path.abspath(old_path), None)
+            if info is None:
+                return
+            holds[os.path.abspath(new_path)] = info
+            self._save(holds)
+
+    def adopt_markers(self, targets):
+        """
+        Convert legacy <file>.keep markers into registry holds
+
+        Args:
+            targets: Paths of held files (each marker is the path plus .keep)
+
+        Returns:
+            Number of markers converted
+        """
+        if not targets:
+            return 0
+
+        with self.lock:
+            holds = self.load()
+
+            for target in targets:
+                marker = f"{target}{KEEP_SUFFIX}"
+                try:
+                    with open(marker, 'r') as f:
+                        info = json.load(f)
+                except (OSError, ValueError):
+                    info = {'reason': 'Manual retention'}
+                holds.setdefault(os.path.abspath(target), info)
+
+            # Save before removing markers so no hold is lost on a crash
+            self._save(holds)
+
+        for target in targets:
+            try:
+                os.remove(f"{target}{KEEP_SUFFIX}")
+            except OSError:
+                pass
+
+        return len(targets)
+
+    def _save(self, holds):
+        """Write the registry atomically (caller holds the lock)"""
+        tmp_path = f"{self.registry_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(holds, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.registry_path)
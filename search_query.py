@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+DocuFlow - Search Query Module
+Parse search queries like  dept:Finance ext:pdf size>10MB modified<30d "invoice"
+and compile them into SQL over the file catalog
+"""
+
+import re
+from datetime import datetime, timedelta
+
+
+FIELDS = {
+    'dept': 'departments', 'department': 'departments',
+    'cat': 'categories', 'category': 'categories',
+    'ext': 'extensions', 'type': 'extensions',
+    'client': 'clients', 'project': 'projects',
+}
+
+SIZE_UNITS = {'': 1, 'b': 1, 'k': 1024, 'kb': 1024, 'm': 1024 ** 2, 'mb': 1024 ** 2,
+              'g': 1024 ** 3, 'gb': 1024 ** 3, 't': 1024 ** 4, 'tb': 1024 ** 4}
+
+AGE_UNITS = {'h': 3600, 'd': 86400, 'w': 7 * 86400, 'y': 365 * 86400}
+
+TOKEN = re.compile(r'"([^"]*)"|(\S+)')
+FIELD_TERM = re.compile(r'^(\w+):(.+)$')
+COMPARISON = re.compile(r'^(size|modified)(<=|>=|<|>|=)(.+)$', re.IGNORECASE)
+SIZE_VALUE = re.compile(r'^(\d+(?:\.\d+)?)\s*([a-z]*)$', re.IGNORECASE)
+AGE_VALUE = re.compile(r'^(\d+(?:\.\d+)?)([hdwy])$', re.IGNORECASE)
+
+# Comparison operators with their sides swapped (age < 30d means mtime > now - 30d)
+FLIPPED = {'<': '>', '<=': '>=', '>': '<', '>=': '<=', '=': '='}
+
+
+class SearchQuery:
+    """A parsed search query"""
+
+    def __init__(self):
+        """Start with no filters"""
+        self.departments = []
+        self.categories = []
+        self.extensions = []
+        self.clients = []
+        self.projects = []
+        self.size = []          # (operator, bytes)
+        self.modified = []      # (operator, datetime or timedelta)
+        self.terms = []         # filename substrings, all required
+
+    @property
+    def has_filters(self):
+        """True if the query uses anything beyond plain filename words"""
+        return bool(self.departments or self.categories or self.extensions
+                    or self.clients or self.projects or self.size or self.modified)
+
+
+def parse_query(text):
+    """
+    Parse a search query
+
+    Syntax (terms combine with AND):
+        dept:Finance,HR      department (also department:)
+        cat:Archive          category (also category:)
+        ext:pdf              file extension (also type:)
+        project:Budget       project parsed from the naming convention
+        client:Acme_Corp     client parsed from the naming convention
+        size>10MB            size with <, <=, >, >=, = and B/KB/MB/GB/TB
+        modified<30d         modified within the last 30 days (h, d, w, y)
+        modified>1y          modified more than a year ago
+        modified<2025-01-01  modified before a date (YYYY-MM-DD)
+        invoice  "q3 plan"   filename contains the word or quoted text
+
+    A word with an unknown field prefix (e.g. 12:30 or re:invoice) is
+    searched for as ordinary filename text.
+
+    Raises:
+        ValueError: On a malformed size or date value
+    """
+    query = SearchQuery()
+
+    for quoted, word in TOKEN.findall(text):
+        if quoted:
+            query.terms.append(quoted.lower())
+            continue
+
+        comparison = COMPARISON.match(word)
+        if comparison:
+            field, operator, value = comparison.groups()
+            if field.lower() == 'size':
+                query.size.append((operator, _parse_size(value)))
+            else:
+                query.modified.append((operator, _parse_moment(value)))
+            continue
+
+        field_term = FIELD_TERM.match(word)
+        if field_term and field_term.group(1).lower() in FIELDS:
+            field, value = field_term.groups()
+            values = [v for v in value.split(',') if v]
+            if FIELDS[field.lower()] == 'extensions':
+                values = [v.lower().lstrip('.') for v in values]
+            getattr(query, FIELDS[field.lower()]).extend(values)
+            continue
+
+        query.terms.append(word.lower())
+
+    return query
+
+
+def compile_query(query, now=None, name_index=True):
+    """
+    Turn a parsed query into a WHERE clause over the catalog's files table
+
+    Each filter maps onto an indexed column: department/category/mtime_ns
+    share the location index, ext, size, client and project have their own,
+    and filename terms of 3+ characters go through the trigram name index.
+
+    Args:
+        query: SearchQuery from parse_query
+        now: Reference time for relative ages (default: now)
+        name_index: Whether the catalog has the trigram name index
+
+    Returns:
+        (where SQL, parameter list); the SQL is "1" when nothing is filtered
+    """
+    now = now or datetime.now()
+    clauses = []
+    params = []
+
+    for column, values in (('department', query.departments),
+                           ('category', query.categories),
+                           ('ext', query.extensions),
+                           ('client', query.clients),
+                           ('project', query.projects)):
+        if values:
+            clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+
+    for operator, size in query.size:
+        clauses.append(f"size {operator} ?")
+        params.append(size)
+
+    for operator, moment in query.modified:
+        if isinstance(moment, timedelta):
+            # An age: older means a smaller mtime
+            if operator == '=':
+                raise ValueError("Use < or > with relative ages (e.g. modified<30d)")
+            clauses.append(f"mtime_ns {FLIPPED[operator]} ?")
+            params.append(_to_ns(now - moment))
+        elif operator == '=':
+            clauses.append("mtime_ns >= ? AND mtime_ns < ?")
+            params.extend([_to_ns(moment), _to_ns(moment + timedelta(days=1))])
+        else:
+            clauses.append(f"mtime_ns {operator} ?")
+            params.append(_to_ns(moment))
+
+    indexed = [term for term in query.terms if name_index and len(term) >= 3]
+    if indexed:
+        clauses.append("rowid IN (SELECT rowid FROM name_index WHERE name_index MATCH ?)")
+        params.append(" ".join('"' + term.replace('"', '""') + '"' for term in indexed))
+
+    for term in query.terms:
+        if term not in indexed:
+            escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            clauses.append("lower(name) LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
+
+    return " AND ".join(clauses) or "1", params
+
+
+def _parse_size(value):
+    """'10MB' → bytes"""
+    match = SIZE_VALUE.match(value)
+    if not match or match.group(2).lower() not in SIZE_UNITS:
+        raise ValueError(f"Bad size '{value}' (e.g. 500KB, 10MB, 1.5GB)")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).lower()])
+
+
+def _parse_moment(value):
+    """'30d' → timedelta; '2025-01-31' → datetime"""
+    match = AGE_VALUE.match(value)
+    if match:
+        return timedelta(seconds=float(match.group(1)) * AGE_UNITS[match.group(2).lower()])
+
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise ValueError(f"Bad date '{value}' (e.g. 30d, 6w, 1y or 2025-01-31)")
+
+
+def _to_ns(moment):
+    """Convert a datetime to epoch nanoseconds"""
+    return int(moment.timestamp() * 10**9)
@@ -5,11 +5,15 @@ Automatic file versioning with metadata tracking
 """
 
 import os
-import shutil
 import json
-import hashlib
+import threading
 from datetime import datetime
 from pathlib import Path
+from file_scanner import scan_dirs, scan_files
+from chunk_store import ChunkStore, read_manifest, write_manifest
+from version_manifest import STORE_DIRS, VersionManifest, parse_version_name
+from file_ops import IOThrottle, copy_and_hash, fast_copy, remove_file
+from hash_cache import HashCache
 
 
 class VersionControl:
@@ -24,41 +28,112 @@ class VersionControl:
         self.version_dir = self.vc_config['version_dir']
         self.max_versions = self.vc_config['max_versions']
         self.track_metadata = self.vc_config['track_metadata']
+        self.storage = self.vc_config.get('storage', 'full')
+        self.skip_unchanged = self.vc_config.get('skip_unchanged', False)
+        self.blob_dir = os.path.join(self.version_dir, 'blobs')
+        self.chunk_dir = os.path.join(self.version_dir, 'chunks')
+        self._chunk_store = None
+        self.throttle = IOThrottle.from_config(self.config, 'versioning')
 
         os.makedirs(self.version_dir, exist_ok=True)
+        self.manifest = VersionManifest(self.version_dir)
+        self.hash_cache = HashCache(os.path.join(self.version_dir, "hash_cache.db"))
 
-    def create_version(self, file_path, comment=""):
+    def create_version(self, file_path, comment="", skip_unchanged=None, key=None):
         """
         Create a new version of a file
 
         Args:
             file_path: Path to file to version
             comment: Optional comment describing the changes
+            skip_unchanged: If True, return the newest version instead of making
+                a new one when the content is identical (default from config)
+            key: Name the file's versions are filed under (default: its
+                filename); a relative path such as HR/Working/notes.docx
+                keeps same-named files in different folders apart
 
         Returns:
             Path to versioned file
+
+        Raises:
+            ValueError: If key is absolute or leads out of the versions directory
         """
         if not os.path.exists(file_path):
             print(f"❌ File not found: {file_path}")
             return None
 
+        base_name = os.path.basename(file_path)
+        if key:
+            base_name = os.path.normpath(key)
+            if os.path.isabs(base_name) or base_name.split(os.sep)[0] in ('..', *STORE_DIRS):
+                raise ValueError(f"Bad version key: {key}")
+        source_stat = os.stat(file_path)
+
+        if skip_unchanged is None:
+            skip_unchanged = self.skip_unchanged
+        if skip_unchanged:
+            existing = self._unchanged_version(file_path, base_name, source_stat)
+            if existing:
+                print(f"ℹ️  Unchanged since {os.path.basename(existing)}, no new version")
+                return existing
+
         # Generate version info
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        base_name = os.path.basename(file_path)
-        version_name = f"{base_name}.{timestamp}"
-        version_path = os.path.join(self.version_dir, version_name)
+
+        # Several versions within one second get an increasing counter suffix
+        counter = 1
+        latest = self.manifest.get_versions(base_name, 1)
+        if latest:
+            latest_created = parse_version_name(latest[0]['version_name'])[1]
+            if latest_created.strftime("%Y%m%d_%H%M%S") == timestamp:
+                counter = latest_created.microsecond + 1
+
+        while True:
+            version_name = f"{base_name}.{timestamp}" + (f"_{counter}" if counter > 1 else "")
+            version_path = os.path.join(self.version_dir, version_name)
+            if not os.path.exists(version_path):
+                break
+            counter += 1
+
+        if os.path.dirname(version_name):
+            os.makedirs(os.path.dirname(version_path), exist_ok=True)
 
         # Copy file to versions folder
-        shutil.copyfile(file_path, version_path)
+        file_hash = None
+        file_size = None
+        if self.storage == 'chunks':
+            manifest = self._get_chunk_store().store(file_path)
+            write_manifest(manifest, version_path)
+            file_hash = manifest['hash']
+            file_size = manifest['size']
+            self.hash_cache.record_copy(source_stat, file_path, file_hash)
+        elif self.storage == 'blobs':
+            file_hash = self._store_blob(file_path, version_path, source_stat)
+        elif self.track_metadata:
+            # Hash while copying so metadata never re-reads the version
+            file_hash = copy_and_hash(file_path, version_path, throttle=self.throttle)
+            self.hash_cache.record_copy(source_stat, file_path, file_hash)
+        else:
+            fast_copy(file_path, version_path, self.throttle)
 
         # Create metadata
         if self.track_metadata:
-            metadata = self._generate_metadata(file_path, version_path, comment)
+            metadata = self._generate_metadata(file_path, version_path, comment,
+                                               file_hash, file_size)
+            if self.storage == 'blobs':
+                metadata['blob'] = file_hash
+            elif self.storage == 'chunks':
+                metadata['new_bytes'] = manifest['new_bytes']
             meta_path = f"{version_path}.json"
 
             with open(meta_path, 'w') as f:
                 json.dump(metadata, f, indent=2)
 
+        if file_size is None:
+            file_size = os.path.getsize(version_path)
+        self.manifest.add(version_path, base_name, parse_version_name(version_name)[1],
+                          file_size, file_hash, self.storage)
+
         print(f"✅ Version created: {version_name}")
 
         # Clean up old versions
@@ -66,38 +141,38 @@ class VersionControl:
 
         return version_path
 
-    def list_versions(self, base_filename):
+    def list_versions(self, base_filename, limit=None):
         """
         List all versions of a file
 
         Args:
-            base_filename: Original filename (without version suffix)
+            base_filename: Original filename or version key (without version suffix)
+            limit: Max number of versions to return
 
         Returns:
-            List of version info dictionaries
+            List of version info dictionaries, newest first
         """
         versions = []
 
-        # Find all versions of this file
-        for file_name in sorted(os.listdir(self.version_dir), reverse=True):
-            if file_name.startswith(base_filename) and not file_name.endswith('.json'):
-                version_path = os.path.join(self.version_dir, file_name)
-                meta_path = f"{version_path}.json"
+        # Versions of exactly this file, from the manifest index
+        for row in self.manifest.get_versions(base_filename, limit):
+            version_path = row['path']
+            meta_path = f"{version_path}.json"
 
-                version_info = {
-                    'filename': file_name,
-                    'path': version_path,
-                    'created': datetime.fromtimestamp(os.path.getctime(version_path)),
-                    'size': os.path.getsize(version_path)
-                }
+            version_info = {
+                'filename': row['version_name'],
+                'path': version_path,
+                'created': datetime.fromtimestamp(row['created']),
+                'size': row['size']
+            }
 
-                # Load metadata if available
-                if os.path.exists(meta_path):
-                    with open(meta_path, 'r') as f:
-                        metadata = json.load(f)
-                        version_info.update(metadata)
+            # Load metadata if available
+            if os.path.exists(meta_path):
+                with open(meta_path, 'r') as f:
+                    metadata = json.load(f)
+                    version_info.update(metadata)
 
-                versions.append(version_info)
+            versions.append(version_info)
 
         return versions
 
@@ -122,7 +197,11 @@ class VersionControl:
             self.create_version(destination, backup_comment)
 
         # Restore version
-        shutil.copyfile(version_path, destination)
+        manifest = read_manifest(version_path)
+        if manifest:
+            self._get_chunk_store().restore(manifest, destination)
+        else:
+            fast_copy(version_path, destination, self.throttle)
         print(f"✅ Restored version: {os.path.basename(version_path)} → {destination}")
 
         return destination
@@ -142,11 +221,14 @@ class VersionControl:
             print("❌ One or both versions not found")
             return None
 
+        size1, hash1 = self._version_content(version1_path)
+        size2, hash2 = self._version_content(version2_path)
+
         comparison = {
             'version1': os.path.basename(version1_path),
             'version2': os.path.basename(version2_path),
-            'size_diff': os.path.getsize(version2_path) - os.path.getsize(version1_path),
-            'identical': self._get_file_hash(version1_path) == self._get_file_hash(version2_path)
+            'size_diff': size2 - size1,
+            'identical': hash1 == hash2
         }
 
         # Get metadata if available
@@ -169,12 +251,7 @@ class VersionControl:
         Returns:
             List of versions sorted by date (newest first)
         """
-        versions = self.list_versions(base_filename)
-
-        if limit:
-            versions = versions[:limit]
-
-        return versions
+        return self.list_versions(base_filename, limit or None)
 
     def auto_version_on_change(self, file_path, check_interval=60):
         """
@@ -184,8 +261,8 @@ class VersionControl:
             file_path: File to monitor
             check_interval: Seconds between checks
 
-        Note: This is a blocking operation for demonstration.
-        In production, use a file watcher library like watchdog.
+        Note: This is a blocking operation for a single file.
+        To auto-version whole Working folders, use file_watcher.FileWatcher.
         """
         import time
 
@@ -196,7 +273,8 @@ class VersionControl:
         print(f"👁️  Monitoring {file_path} for changes...")
         print(f"   (Press Ctrl+C to stop)")
 
-        last_hash = self._get_file_hash(file_path)
+        # The hash cache only re-reads the file when its stat changes
+        last_hash = self.hash_cache.hash(file_path)
         last_version_time = datetime.now()
 
         try:
@@ -207,7 +285,7 @@ class VersionControl:
                     print("⚠️  File no longer exists")
                     break
 
-                current_hash = self._get_file_hash(file_path)
+                current_hash = self.hash_cache.hash(file_path)
 
                 if current_hash != last_hash:
                     # File changed
@@ -216,59 +294,171 @@ class VersionControl:
                     # Only version if enough time has passed (avoid too frequent versions)
                     if time_since_last > check_interval:
                         comment = f"Auto-version (file changed)"
-                        self.create_version(file_path, comment)
+                        self.create_version(file_path, comment, skip_unchanged=True)
                         last_hash = current_hash
                         last_version_time = datetime.now()
 
         except KeyboardInterrupt:
             print("\n✋ Monitoring stopped")
 
-    def _generate_metadata(self, original_path, version_path, comment):
+    def _generate_metadata(self, original_path, version_path, comment,
+                           file_hash=None, file_size=None):
         """Generate metadata for a version"""
         return {
             'original_file': os.path.basename(original_path),
             'original_path': original_path,
             'version_path': version_path,
             'version_timestamp': datetime.now().isoformat(),
-            'file_size': os.path.getsize(version_path),
-            'file_hash': self._get_file_hash(version_path),
+            'file_size': file_size if file_size is not None else os.path.getsize(version_path),
+            'file_hash': file_hash or self._get_file_hash(version_path),
             'comment': comment,
             'modified_by': os.getenv('USER', 'unknown')
         }
 
-    def _get_file_hash(self, file_path):
-        """Calculate SHA256 hash of file"""
-        sha256 = hashlib.sha256()
+    def _unchanged_version(self, file_path, base_name, source_stat):
+        """
+        Return the newest version's path if it holds the same content as a file
 
-        with open(file_path, 'rb') as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                sha256.update(chunk)
+        The file is only read when the hash cache has no entry for its
+        current stat; a version without a recorded hash never matches.
+        """
+        latest = self.manifest.get_versions(base_name, 1)
+        if not latest or not latest[0]['hash'] or latest[0]['size'] != source_stat.st_size:
+            return None
 
-        return sha256.hexdigest()
+        if not os.path.exists(latest[0]['path']):
+            return None
 
-    def _cleanup_old_versions(self, base_filename):
-        """Keep only the most recent N versions"""
-        versions = []
+        if self.hash_cache.hash(file_path, source_stat) != latest[0]['hash']:
+            return None
+
+        return latest[0]['path']
 
-        # Find all versions
-        for file_name in os.listdir(self.version_dir):
-            if file_name.startswith(base_filename) and not file_name.endswith('.json'):
-                file_path = os.path.join(self.version_dir, file_name)
-                versions.append((file_name, os.path.getctime(file_path)))
+    def _version_content(self, version_path):
+        """Return (size, SHA256) of the content a version holds"""
+        manifest = read_manifest(version_path, with_chunks=False)
+        if manifest:
+            return manifest['size'], manifest['hash']
 
-        # Sort by creation time (newest first)
-        versions.sort(key=lambda x: x[1], reverse=True)
+        return os.path.getsize(version_path), self._get_file_hash(version_path)
 
-        # Delete old versions
-        for file_name, _ in versions[self.max_versions:]:
-            version_path = os.path.join(self.version_dir, file_name)
+    def _get_chunk_store(self):
+        """Open the chunk store on first use"""
+        if self._chunk_store is None:
+            self._chunk_store = ChunkStore(self.chunk_dir, self.throttle)
+        return self._chunk_store
+
+    def _blob_path(self, file_hash):
+        """Location of a content-addressed blob"""
+        return os.path.join(self.blob_dir, file_hash[:2], file_hash)
+
+    def _store_blob(self, file_path, version_path, source_stat=None):
+        """
+        Store file content once per SHA256 and link the version to it
+
+        The version file is a hard link to the blob, so listings and
+        restores read it like any other version while identical content
+        shares one copy on disk. A file the hash cache knows, whose blob
+        exists, is not read at all; otherwise it is read once, hashing
+        while it is copied into a temporary blob.
+
+        Returns:
+            SHA256 of the stored content
+        """
+        source_stat = source_stat or os.stat(file_path)
+        file_hash = self.hash_cache.get(file_path, source_stat)
+
+        if file_hash is None or not os.path.exists(self._blob_path(file_hash)):
+            os.makedirs(self.blob_dir, exist_ok=True)
+            tmp_path = os.path.join(self.blob_dir, f"{os.getpid()}.{threading.get_ident()}.tmp")
+
+            try:
+                file_hash = copy_and_hash(file_path, tmp_path, throttle=self.throttle)
+                self.hash_cache.record_copy(source_stat, file_path, file_hash)
+
+                blob_path = self._blob_path(file_hash)
+                if os.path.exists(blob_path):
+                    os.remove(tmp_path)
+                else:
+                    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                    os.chmod(tmp_path, 0o444)
+                    os.replace(tmp_path, blob_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+        blob_path = self._blob_path(file_hash)
+
+        link_path = f"{version_path}.link"
+        try:
+            os.link(blob_path, link_path)
+            os.replace(link_path, version_path)
+        except OSError:
+            # Filesystem without hard links: fall back to a full copy
+            fast_copy(blob_path, version_path, self.throttle)
+
+        return file_hash
+
+    def _release_blob(self, file_hash):
+        """Delete a blob once no version links to it any more"""
+        blob_path = self._blob_path(file_hash)
+
+        try:
+            if os.stat(blob_path).st_nlink <= 1:
+                remove_file(blob_path, self.throttle)
+        except FileNotFoundError:
+            pass
+
+    def gc_blobs(self):
+        """
+        Remove blobs that no version references
+
+        Returns:
+            Number of blobs removed
+        """
+        removed = 0
+
+        for prefix in scan_dirs(self.blob_dir):
+            for entry in scan_files(prefix):
+                if entry.stat().st_nlink <= 1:
+                    remove_file(entry.path, self.throttle)
+                    removed += 1
+
+        return removed
+
+    def _get_file_hash(self, file_path):
+        """Calculate SHA256 hash of file"""
+        return self.hash_cache.hash(file_path)
+
+    def _cleanup_old_versions(self, base_filename):
+        """Keep only the most recent N versions"""
+        # Delete everything past the newest max_versions
+        for row in self.manifest.get_versions(base_filename, offset=self.max_versions):
+            version_path = row['path']
             meta_path = f"{version_path}.json"
+            blob_hash = row['hash'] if row['storage'] == 'blobs' else None
+
+            if os.path.exists(version_path):
+                manifest = read_manifest(version_path)
+                if manifest:
+                    self._get_chunk_store().release(manifest)
+                elif blob_hash is None and 'blobs' in (row['storage'], self.storage):
+                    # Indexed without its blob (e.g. rebuilt with no metadata):
+                    # a version sharing its inode is a blob link, so find which
+                    st = os.stat(version_path)
+                    if st.st_nlink > 1:
+                        blob_hash = self.hash_cache.hash(version_path, st)
+                remove_file(version_path, self.throttle)
 
-            os.remove(version_path)
             if os.path.exists(meta_path):
-                os.remove(meta_path)
+                remove_file(meta_path, self.throttle)
+
+            if blob_hash:
+                self._release_blob(blob_hash)
 
-            print(f"🗑️  Removed old version: {file_name}")
+            self.manifest.remove(row['version_name'])
+            print(f"🗑️  Removed old version: {row['version_name']}")
 
 
 def main():
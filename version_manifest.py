@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+DocuFlow - Version Manifest Module
+SQLite index of versions per base file, replacing directory scans
+"""
+
+import os
+import re
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from file_scanner import walk_files
+from chunk_store import read_manifest
+
+
+# <base name>.<YYYYmmdd_HHMMSS>[_<counter>] as written by create_version
+VERSION_NAME = re.compile(r'^(?P<base>.+)\.(?P<stamp>\d{8}_\d{6})(?:_(?P<counter>\d+))?$')
+
+# Subfolders of the versions directory holding content stores, not versions
+STORE_DIRS = ('blobs', 'chunks')
+
+
+def version_files(version_dir):
+    """
+    Yield a FileEntry for every file in the versions directory
+
+    Versions filed under a key with folders (e.g. HR/Working/notes.docx)
+    live in matching subfolders; the content stores are left out.
+    """
+    stores = {os.path.abspath(os.path.join(version_dir, name)) for name in STORE_DIRS}
+    return walk_files(version_dir, skip_paths=stores)
+
+
+def parse_version_name(version_name):
+    """
+    Split a version name into its base name (key) and creation time
+
+    Returns:
+        (base_name, created datetime), or None if the name is not a version
+    """
+    match = VERSION_NAME.match(version_name)
+    if not match:
+        return None
+
+    created = datetime.strptime(match.group('stamp'), "%Y%m%d_%H%M%S")
+    counter = int(match.group('counter') or 1)
+
+    return match.group('base'), created + timedelta(microseconds=counter)
+
+
+class VersionManifest:
+    """Per-base-file index of versions stored in the versions directory"""
+
+    def __init__(self, version_dir):
+        """
+        Open the manifest, indexing existing versions on first use
+
+        Args:
+            version_dir: DocuFlow versions directory
+        """
+        self.version_dir = version_dir
+        self.conn = sqlite3.connect(os.path.join(version_dir, "versions.db"),
+                                    check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.RLock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS versions (
+                version_name TEXT PRIMARY KEY,
+                base_name TEXT NOT NULL,
+                path TEXT NOT NULL,
+                created REAL NOT NULL,
+                size INTEGER NOT NULL,
+                hash TEXT,
+                storage TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_versions_base
+                ON versions (base_name, created);
+            CREATE TABLE IF NOT EXISTS manifest_info (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+        self.conn.commit()
+
+        with self.lock:
+            built = self.conn.execute(
+                "SELECT value FROM manifest_info WHERE key = 'built_at'").fetchone()
+        if built is None:
+            self.rebuild()
+
+    def add(self, version_path, base_name, created, size, file_hash=None, storage='full'):
+        """
+        Record a new version
+
+        Args:
+            version_path: Path of the version file (inside the versions directory)
+            base_name: Original filename, or the key the version is filed under
+            created: Creation datetime
+            size: Size of the versioned content in bytes
+            file_hash: SHA256 of the content, if known
+            storage: full, blobs, or chunks
+        """
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO versions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (os.path.relpath(version_path, self.version_dir), base_name, version_path,
+                 created.timestamp(), size, file_hash, storage))
+
+    def remove(self, version_name):
+        """Forget a deleted version"""
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM versions WHERE version_name = ?", (version_name,))
+
+    def get_versions(self, base_name, limit=None, offset=0):
+        """
+        Versions of one file, newest first
+
+        Args:
+            base_name: Exact original filename or key
+            limit: Max rows to return, or None for all
+            offset: Rows to skip
+
+        Returns:
+            List of rows
+        """
+        with self.lock:
+            return self.conn.execute(
+                "SELECT * FROM versions WHERE base_name = ? "
+                "ORDER BY created DESC LIMIT ? OFFSET ?",
+                (base_name, -1 if limit is None else limit, offset)).fetchall()
+
+    def get_version(self, version_name):
+        """Return the row for a version name (relative to the versions directory), or None"""
+        with self.lock:
+            return self.conn.execute("SELECT * FROM versions WHERE version_name = ?",
+                                     (version_name,)).fetchone()
+
+    def rebuild(self):
+        """
+        Re-index the versions directory from disk
+
+        Returns:
+            Number of versions indexed
+        """
+        rows = []
+
+        for entry in version_files(self.version_dir):
+            version_name = os.path.relpath(entry.path, self.version_dir)
+            parsed = parse_version_name(version_name)
+            if parsed is None:
+                continue
+
+            base_name, created = parsed
+            size, file_hash, storage = entry.size, None, 'full'
+
+            manifest = read_manifest(entry.path, with_chunks=False)
+            if manifest:
+                size, file_hash, storage = manifest['size'], manifest['hash'], 'chunks'
+            elif os.path.exists(f"{entry.path}.json"):
+                with open(f"{entry.path}.json", 'r') as f:
+                    metadata = json.load(f)
+                file_hash = metadata.get('file_hash')
+                if metadata.get('blob'):
+                    storage = 'blobs'
+
+            rows.append((version_name, base_name, entry.path, created.timestamp(),
+                         size, file_hash, storage))
+
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM versions")
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO versions VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO manifest_info VALUES ('built_at', ?)",
+                (datetime.now().isoformat(),))
+
+        return len(rows)